@@ -0,0 +1,148 @@
+"""pack game state
+
+Revision ID: 42308a009767
+Revises: ef0558e8250b
+Create Date: 2026-10-18 09:12:41.305127
+
+"""
+
+import json
+import struct
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "42308a009767"
+down_revision = "ef0558e8250b"
+branch_labels = None
+depends_on = None
+
+# The game state format as of this revision, frozen here rather than imported
+# from app.core.game_state, which keeps changing (all integers little-endian):
+#
+#   version (uint8) | card count (uint16) | pending position (-1 = none)
+#   | [version 2: matched pairs (uint16)] | layout (card count * uint16)
+#   | revealed mask | seen mask
+#
+# Version 1 (pending as an int16) is written, versions 1 and 2 (pending as a
+# uint16, 0xFFFF = none) are read back by the downgrade.
+HEADERS = {1: struct.Struct("<BHh"), 2: struct.Struct("<BHHH")}
+NO_PENDING = -1
+NO_PENDING_V2 = 0xFFFF
+
+# Rows read and written at a time
+BATCH_SIZE = 1000
+
+
+def _batches(conn, query):
+    # Rows of `query` (selecting the id first) by ascending id
+    after = 0
+    while True:
+        rows = conn.execute(sa.text(query), after=after, limit=BATCH_SIZE).fetchall()
+        if not rows:
+            return
+        yield rows
+        after = rows[-1][0]
+
+
+def _encode(game_info):
+    displays = [int(display) for display in game_info["display_by_position"]]
+    total_card = len(displays)
+    sequence = game_info["answer_as_position_in_sequence"]
+    pending = NO_PENDING
+    if len(sequence) % 2 == 1:
+        pending = sequence[-1]
+        sequence = sequence[:-1]
+    revealed = 0
+    for position in sequence:
+        revealed |= 1 << position
+    seen = revealed
+    for position in game_info["display_by_answer"]:
+        seen |= 1 << int(position)
+    if pending != NO_PENDING:
+        seen |= 1 << pending
+    mask_size = (total_card + 7) // 8
+    return b"".join(
+        (
+            HEADERS[1].pack(1, total_card, pending),
+            struct.pack(f"<{total_card}H", *displays),
+            revealed.to_bytes(mask_size, "little"),
+            seen.to_bytes(mask_size, "little"),
+        )
+    )
+
+
+def _decode(state):
+    header = HEADERS.get(state[0])
+    if header is None:
+        raise ValueError(f"Unsupported game state version {state[0]}")
+    total_card, pending = header.unpack_from(state)[1:3]
+    if state[0] == 2 and pending == NO_PENDING_V2:
+        pending = NO_PENDING
+    mask_size = (total_card + 7) // 8
+    layout_end = header.size + total_card * 2
+    revealed_end = layout_end + mask_size
+    seen_end = revealed_end + mask_size
+    layout = struct.unpack_from(f"<{total_card}H", state, header.size)
+    revealed = int.from_bytes(state[layout_end:revealed_end], "little")
+    seen = int.from_bytes(state[revealed_end:seen_end], "little")
+    sequence = []
+    partner = {}
+    for position, display in enumerate(layout):
+        if not revealed >> position & 1:
+            continue
+        first = partner.pop(display, None)
+        if first is None:
+            partner[display] = position
+        else:
+            sequence += [first, position]
+    if pending != NO_PENDING:
+        sequence.append(pending)
+    return {
+        "display_by_position": [str(display) for display in layout],
+        "answer_as_position_in_sequence": sequence,
+        "display_by_answer": {
+            position: str(display)
+            for position, display in enumerate(layout)
+            if seen >> position & 1
+        },
+    }
+
+
+def upgrade():
+    op.add_column("cardgame", sa.Column("state", sa.LargeBinary(), nullable=True))
+    conn = op.get_bind()
+    for rows in _batches(
+        conn,
+        "SELECT id, game_info FROM cardgame"
+        " WHERE game_info IS NOT NULL AND id > :after ORDER BY id LIMIT :limit",
+    ):
+        states = []
+        for game_id, game_info in rows:
+            if isinstance(game_info, str):
+                game_info = json.loads(game_info)
+            states.append({"state": _encode(game_info), "id": game_id})
+        conn.execute(
+            sa.text("UPDATE cardgame SET state = :state WHERE id = :id"), states
+        )
+    op.drop_column("cardgame", "game_info")
+
+
+def downgrade():
+    op.add_column("cardgame", sa.Column("game_info", sa.JSON(), nullable=True))
+    conn = op.get_bind()
+    for rows in _batches(
+        conn,
+        "SELECT id, state FROM cardgame"
+        " WHERE state IS NOT NULL AND id > :after ORDER BY id LIMIT :limit",
+    ):
+        conn.execute(
+            sa.text("UPDATE cardgame SET game_info = :game_info WHERE id = :id"),
+            [
+                {"game_info": json.dumps(_decode(bytes(state))), "id": game_id}
+                for game_id, state in rows
+            ],
+        )
+    op.drop_column("cardgame", "state")
@@ -0,0 +1,43 @@
+"""add card move log
+
+Revision ID: a7d3e1c9b2f4
+Revises: e5b2d9a4c1f7
+Create Date: 2026-10-18 18:21:09.310457
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a7d3e1c9b2f4"
+down_revision = "e5b2d9a4c1f7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "cardmove",
+        sa.Column("game_id", sa.Integer(), nullable=False),
+        sa.Column("seq", sa.Integer(), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("result", sa.SmallInteger(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["game_id"], ["cardgame.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("game_id", "seq"),
+    )
+    op.create_table(
+        "cardgamesnapshot",
+        sa.Column("game_id", sa.Integer(), nullable=False),
+        sa.Column("seq", sa.Integer(), nullable=False),
+        sa.Column("state", sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(["game_id"], ["cardgame.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("game_id", "seq"),
+    )
+
+
+def downgrade():
+    op.drop_table("cardgamesnapshot")
+    op.drop_table("cardmove")
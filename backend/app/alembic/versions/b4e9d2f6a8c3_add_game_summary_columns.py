@@ -0,0 +1,92 @@
+"""add game summary columns
+
+Revision ID: b4e9d2f6a8c3
+Revises: f7c2a8e1d3b6
+Create Date: 2026-10-18 17:21:09.184552
+
+"""
+
+import struct
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b4e9d2f6a8c3"
+down_revision = "f7c2a8e1d3b6"
+branch_labels = None
+depends_on = None
+
+# Header of the game state formats as of this revision, frozen here rather
+# than imported from app.core.game_state: version (uint8) | card count
+# (uint16) | pending position | [version 2: matched pairs], followed by the
+# layout (card count * uint16) and the revealed mask
+HEADERS = {1: struct.Struct("<BHh"), 2: struct.Struct("<BHHH")}
+
+# Rows read and written at a time
+BATCH_SIZE = 1000
+
+
+def _is_game_end(state):
+    # Every card is in the revealed mask
+    header = HEADERS.get(state[0])
+    if header is None:
+        raise ValueError(f"Unsupported game state version {state[0]}")
+    total_card = header.unpack_from(state)[1]
+    layout_end = header.size + total_card * 2
+    revealed_end = layout_end + (total_card + 7) // 8
+    revealed = int.from_bytes(state[layout_end:revealed_end], "little")
+    return revealed == (1 << total_card) - 1
+
+
+def upgrade():
+    op.add_column(
+        "cardgame",
+        sa.Column(
+            "is_finished", sa.Boolean(), nullable=False, server_default=sa.false()
+        ),
+    )
+    # Games created before are dated at the migration
+    op.add_column(
+        "cardgame",
+        sa.Column(
+            "created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()
+        ),
+    )
+    conn = op.get_bind()
+    after = 0
+    while True:
+        rows = conn.execute(
+            sa.text(
+                "SELECT id, state FROM cardgame"
+                " WHERE state IS NOT NULL AND id > :after ORDER BY id LIMIT :limit"
+            ),
+            after=after,
+            limit=BATCH_SIZE,
+        ).fetchall()
+        if not rows:
+            break
+        after = rows[-1][0]
+        finished_ids = [
+            game_id for game_id, state in rows if _is_game_end(bytes(state))
+        ]
+        if finished_ids:
+            conn.execute(
+                sa.text("UPDATE cardgame SET is_finished = true WHERE id = ANY(:ids)"),
+                ids=finished_ids,
+            )
+    op.alter_column("cardgame", "is_finished", server_default=None)
+    op.alter_column("cardgame", "created_at", server_default=None)
+    op.create_index(
+        "ix_cardgame_owner_id_is_finished_id",
+        "cardgame",
+        ["owner_id", "is_finished", "id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_cardgame_owner_id_is_finished_id", table_name="cardgame")
+    op.drop_column("cardgame", "created_at")
+    op.drop_column("cardgame", "is_finished")
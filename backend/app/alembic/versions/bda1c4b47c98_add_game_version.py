@@ -0,0 +1,27 @@
+"""add game version
+
+Revision ID: bda1c4b47c98
+Revises: 42308a009767
+Create Date: 2026-10-18 10:03:17.482911
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "bda1c4b47c98"
+down_revision = "42308a009767"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "cardgame",
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+    )
+
+
+def downgrade():
+    op.drop_column("cardgame", "version")
@@ -0,0 +1,28 @@
+"""index best score order
+
+Revision ID: c3a1f0d2e7b4
+Revises: bda1c4b47c98
+Create Date: 2026-10-18 11:24:52.918374
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c3a1f0d2e7b4"
+down_revision = "bda1c4b47c98"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_bestscore_min_open_count_id",
+        "bestscore",
+        ["min_open_count", "id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_bestscore_min_open_count_id", table_name="bestscore")
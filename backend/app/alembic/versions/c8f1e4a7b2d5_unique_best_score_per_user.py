@@ -0,0 +1,40 @@
+"""unique best score per user
+
+Revision ID: c8f1e4a7b2d5
+Revises: b4e9d2f6a8c3
+Create Date: 2026-10-18 18:05:44.730219
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c8f1e4a7b2d5"
+down_revision = "b4e9d2f6a8c3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("cardgame", sa.Column("end_open_count", sa.Integer(), nullable=True))
+    # Moves after the end of earlier games were not told apart, their score
+    # is taken as their open_count
+    op.execute("UPDATE cardgame SET end_open_count = open_count WHERE is_finished")
+    # Keep each user's best row
+    op.execute(
+        "DELETE FROM bestscore WHERE id IN ("
+        " SELECT id FROM ("
+        "  SELECT id, row_number() OVER ("
+        "   PARTITION BY user_id ORDER BY min_open_count NULLS LAST, id"
+        "  ) AS n FROM bestscore"
+        " ) ranked WHERE n > 1"
+        ")"
+    )
+    op.create_index(op.f("ix_bestscore_user_id"), "bestscore", ["user_id"], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f("ix_bestscore_user_id"), table_name="bestscore")
+    op.drop_column("cardgame", "end_open_count")
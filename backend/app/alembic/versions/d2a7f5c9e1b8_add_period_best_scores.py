@@ -0,0 +1,66 @@
+"""add period best scores
+
+Revision ID: d2a7f5c9e1b8
+Revises: c8f1e4a7b2d5
+Create Date: 2026-10-18 19:12:31.508624
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d2a7f5c9e1b8"
+down_revision = "c8f1e4a7b2d5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("cardgame", sa.Column("finished_at", sa.DateTime(), nullable=True))
+    # Dated by their logged end move where there is one, games without one stay
+    # out of the periodic leaderboards. `app.recompute_best_scores` fills them.
+    op.execute(
+        "UPDATE cardgame SET finished_at = cardmove.created_at FROM cardmove"
+        " WHERE cardmove.game_id = cardgame.id"
+        " AND cardmove.seq = cardgame.end_open_count"
+    )
+    op.create_table(
+        "periodbestscore",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("period", sa.String(length=8), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("min_open_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_periodbestscore_id"), "periodbestscore", ["id"], unique=False
+    )
+    op.create_index(
+        "ix_periodbestscore_period_bucket_start_user_id",
+        "periodbestscore",
+        ["period", "bucket_start", "user_id"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_periodbestscore_period_bucket_start_min_open_count_id",
+        "periodbestscore",
+        ["period", "bucket_start", "min_open_count", "id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(
+        "ix_periodbestscore_period_bucket_start_min_open_count_id",
+        table_name="periodbestscore",
+    )
+    op.drop_index(
+        "ix_periodbestscore_period_bucket_start_user_id", table_name="periodbestscore"
+    )
+    op.drop_index(op.f("ix_periodbestscore_id"), table_name="periodbestscore")
+    op.drop_table("periodbestscore")
+    op.drop_column("cardgame", "finished_at")
@@ -0,0 +1,31 @@
+"""add game pair count
+
+Revision ID: e5b2d9a4c1f7
+Revises: c3a1f0d2e7b4
+Create Date: 2026-10-18 13:02:37.604185
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e5b2d9a4c1f7"
+down_revision = "c3a1f0d2e7b4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("cardgame", sa.Column("pair_count", sa.Integer(), nullable=True))
+    # Card count is the little-endian uint16 after the version byte of the state
+    op.execute(
+        "UPDATE cardgame"
+        " SET pair_count = (get_byte(state, 1) + get_byte(state, 2) * 256) / 2"
+    )
+    op.alter_column("cardgame", "pair_count", nullable=False)
+
+
+def downgrade():
+    op.drop_column("cardgame", "pair_count")
@@ -0,0 +1,27 @@
+"""index owner pages
+
+Revision ID: f7c2a8e1d3b6
+Revises: a7d3e1c9b2f4
+Create Date: 2026-10-18 16:02:37.441025
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f7c2a8e1d3b6"
+down_revision = "a7d3e1c9b2f4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_item_owner_id_id", "item", ["owner_id", "id"], unique=False)
+    op.create_index(
+        "ix_cardgame_owner_id_id", "cardgame", ["owner_id", "id"], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index("ix_cardgame_owner_id_id", table_name="cardgame")
+    op.drop_index("ix_item_owner_id_id", table_name="item")
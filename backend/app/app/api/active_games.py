@@ -0,0 +1,325 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from databases import Database
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app import crud, schemas
+from app.api import conditional, game_checks, responses
+from app.core.active_games import active_games
+from app.core.config import settings
+from app.core.game_session import GameSession, SessionSnapshot
+from app.core.move_journal import Move, MoveJournal, claim_journal, orphaned_journals
+from app.db.async_session import get_database
+from app.db.session import SessionLocal
+
+# Loading and saving the `active_games` sessions with either database layer.
+# The `*_sync` and `*_async` functions run in endpoints of that layer, the
+# others pick the layer from `settings.ASYNC_DB_ENABLED`. On the event loop,
+# whatever writes the move journal runs in the threadpool.
+
+logger = logging.getLogger(__name__)
+
+
+async def journaled(fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Call an `active_games` method from the event loop, in the threadpool if
+    it writes to the journal, as the write (and fsync) blocks.
+    """
+    if active_games.journal is None:
+        return fn(*args)
+    return await run_in_threadpool(fn, *args)
+
+
+def _checked_session(
+    card_game: Optional[Any], current_user: Optional[schemas.UserPrincipal]
+) -> Optional[GameSession]:
+    # Checked before the game is kept, a rejected user leaves nothing behind
+    if not card_game:
+        return None
+    if current_user is not None:
+        game_checks.check_owner(current_user, card_game.owner_id)
+    return active_games.add(GameSession.from_model(card_game))
+
+
+def load_session_sync(
+    db: Session, id: int, *, current_user: Optional[schemas.UserPrincipal] = None
+) -> Optional[GameSession]:
+    """
+    The session of game `id`, from `active_games` or loaded into it, `None`
+    if there is no such game. With `current_user`, only if they may play it.
+    """
+    session = active_games.get(id)
+    if session is not None:
+        if current_user is not None:
+            game_checks.check_owner(current_user, session.owner_id)
+        return session
+    return _checked_session(crud.game.get(db, id=id), current_user)
+
+
+async def load_session_async(
+    db: Database, id: int, *, current_user: Optional[schemas.UserPrincipal] = None
+) -> Optional[GameSession]:
+    session = active_games.get(id)
+    if session is not None:
+        if current_user is not None:
+            game_checks.check_owner(current_user, session.owner_id)
+        return session
+    return _checked_session(await crud.async_game.get(db, id=id), current_user)
+
+
+def save_session_sync(
+    db: Session, session: GameSession, snapshot: Optional[SessionSnapshot]
+) -> None:
+    """
+    Run the save claimed by `snapshot` and the ones claimed meanwhile. A
+    conflicting save discards the session and raises `StaleDataError`.
+    """
+    while snapshot is not None:
+        try:
+            crud.game.save_session(db, snapshot=snapshot)
+        except StaleDataError:
+            active_games.discard(session)
+            raise
+        except BaseException:
+            active_games.abort_save(session)
+            raise
+        snapshot = active_games.saved(session, snapshot)
+
+
+async def save_session_async(
+    db: Database, session: GameSession, snapshot: Optional[SessionSnapshot]
+) -> None:
+    while snapshot is not None:
+        try:
+            await crud.async_game.save_session(db, snapshot=snapshot)
+        except StaleDataError:
+            await journaled(active_games.discard, session)
+            raise
+        except BaseException:
+            active_games.abort_save(session)
+            raise
+        snapshot = active_games.saved(session, snapshot)
+
+
+def flush_session_sync(
+    db: Session, id: int, *, current_user: schemas.UserPrincipal
+) -> None:
+    """
+    Save the unsaved moves of game `id` if it is kept in `active_games`, so
+    the table and the move log hold all of them. A save already in flight is
+    not waited for. Only a user who may play the game can have it saved.
+    """
+    session = active_games.get(id)
+    if session is None:
+        return
+    game_checks.check_owner(current_user, session.owner_id)
+    try:
+        save_session_sync(db, session, active_games.claim_save(session))
+    except StaleDataError:
+        # Discarded, the table holds the game as it was changed meanwhile
+        pass
+
+
+async def flush_session_async(
+    db: Database, id: int, *, current_user: schemas.UserPrincipal
+) -> None:
+    session = active_games.get(id)
+    if session is None:
+        return
+    game_checks.check_owner(current_user, session.owner_id)
+    try:
+        await save_session_async(db, session, active_games.claim_save(session))
+    except StaleDataError:
+        pass
+
+
+def _with_session_local(fn: Any, *args: Any, **kwargs: Any) -> Any:
+    db = SessionLocal()
+    try:
+        return fn(db, *args, **kwargs)
+    finally:
+        db.close()
+
+
+def _move_response(
+    session: GameSession, game_delta: Dict[str, Any], *, delta: bool
+) -> Any:
+    if delta:
+        return responses.card_game_delta(game_delta)
+    return responses.active_card_game(session)
+
+
+def read_game_in_memory(
+    request: Request, session: GameSession, *, current_user: schemas.UserPrincipal
+) -> Response:
+    """
+    The `read_game` endpoint for a game kept in `active_games`.
+    """
+    game_checks.check_owner(current_user, session.owner_id)
+    # Read before rendering, so the body is never older than the ETag
+    version = session.version
+    not_modified = conditional.game_not_modified(
+        request, id=session.id, version=version
+    )
+    if not_modified is not None:
+        return not_modified
+    return conditional.with_game_validators(
+        responses.active_card_game(session), id=session.id, version=version
+    )
+
+
+def open_card_in_memory_sync(
+    db: Session,
+    *,
+    id: int,
+    card_position: int,
+    version: Optional[int],
+    delta: bool,
+    current_user: schemas.UserPrincipal,
+) -> Any:
+    """
+    The `open_card` endpoint for a game kept in `active_games`.
+    """
+    session = game_checks.check_game(
+        load_session_sync(db, id, current_user=current_user), current_user
+    )
+    game_checks.check_version(session, version)
+    with game_checks.move_errors():
+        game_delta, snapshot = active_games.open_card(session, card_position)
+        save_session_sync(db, session, snapshot)
+    return _move_response(session, game_delta, delta=delta)
+
+
+async def open_card_in_memory_async(
+    db: Database,
+    *,
+    id: int,
+    card_position: int,
+    version: Optional[int],
+    delta: bool,
+    current_user: schemas.UserPrincipal,
+) -> Any:
+    session = game_checks.check_game(
+        await load_session_async(db, id, current_user=current_user), current_user
+    )
+    game_checks.check_version(session, version)
+    with game_checks.move_errors():
+        game_delta, snapshot = await journaled(
+            active_games.open_card, session, card_position
+        )
+        await save_session_async(db, session, snapshot)
+    return _move_response(session, game_delta, delta=delta)
+
+
+async def load_session(
+    id: int, *, current_user: Optional[schemas.UserPrincipal] = None
+) -> Optional[GameSession]:
+    if settings.ASYNC_DB_ENABLED:
+        return await load_session_async(get_database(), id, current_user=current_user)
+    return await run_in_threadpool(
+        _with_session_local, load_session_sync, id, current_user=current_user
+    )
+
+
+async def save_session(
+    session: GameSession, snapshot: Optional[SessionSnapshot]
+) -> None:
+    if snapshot is None:
+        return
+    if settings.ASYNC_DB_ENABLED:
+        await save_session_async(get_database(), session, snapshot)
+    else:
+        await run_in_threadpool(
+            _with_session_local, save_session_sync, session, snapshot
+        )
+
+
+async def save_idle_sessions(*, idle_seconds: Optional[float] = None) -> None:
+    for session, snapshot in active_games.claim_idle(idle_seconds=idle_seconds):
+        try:
+            await save_session(session, snapshot)
+        except StaleDataError:
+            logger.warning(
+                "Dropped the unsaved moves of CardGame %s, modified concurrently",
+                session.id,
+            )
+    await journaled(active_games.compact_journal)
+
+
+async def save_idle_sessions_forever() -> None:
+    while True:
+        await asyncio.sleep(active_games.idle_seconds / 2)
+        try:
+            await save_idle_sessions()
+        except Exception:
+            logger.exception("Saving idle game sessions failed")
+
+
+def _claim_journals(path: str) -> List[MoveJournal]:
+    """
+    This worker's journal, made `active_games.journal`, then the orphaned
+    ones it recovers.
+    """
+    active_games.journal = claim_journal(path, fsync=settings.GAME_JOURNAL_FSYNC)
+    return [
+        active_games.journal,
+        *orphaned_journals(path, fsync=settings.GAME_JOURNAL_FSYNC),
+    ]
+
+
+def _replay(journals: List[MoveJournal]) -> Dict[int, List[Move]]:
+    moves: Dict[int, List[Move]] = {}
+    for journal in journals:
+        for id, game_moves in journal.replay().items():
+            moves.setdefault(id, []).extend(game_moves)
+    # A game may have moves in several journals, played by several workers
+    for game_moves in moves.values():
+        game_moves.sort(key=lambda move: move[0])
+    return moves
+
+
+def _compact_recovered(orphans: List[MoveJournal]) -> None:
+    active_games.compact_journal(force=True)
+    # Moves left unsaved stay in their orphan for the next recovery
+    saved_versions = active_games.saved_versions()
+    for orphan in orphans:
+        orphan.compact(saved_versions)
+        orphan.close()
+
+
+async def recover_sessions() -> None:
+    """
+    Claim this worker's journal, rebuild the games with journaled moves past
+    their stored version, after a crash, and save them. The journals left by
+    workers gone for good are recovered too.
+    """
+    if not settings.GAME_JOURNAL_PATH:
+        return
+    journals = await run_in_threadpool(_claim_journals, settings.GAME_JOURNAL_PATH)
+    moves = await run_in_threadpool(_replay, journals)
+    for id, game_moves in moves.items():
+        session = await load_session(id)
+        if session is None:
+            continue
+        for version, position in game_moves:
+            # Versions are contiguous, a gap means the game changed elsewhere
+            if version == session.version + 1:
+                session.open_card(position)
+            elif version > session.version:
+                break
+        if session.unsaved_moves:
+            logger.info("Recovered %s moves of CardGame %s", session.unsaved_moves, id)
+    await save_idle_sessions(idle_seconds=0)
+    await run_in_threadpool(_compact_recovered, journals[1:])
+
+
+def close_journal() -> None:
+    if active_games.journal is not None:
+        active_games.journal.close()
+        active_games.journal = None
@@ -1,13 +1,36 @@
 from fastapi import APIRouter
 
-from app.api.api_v1.endpoints import best_scores, games, items, login, users, utils
+from app.api.api_v1.endpoints import (
+    best_scores_stream,
+    game_sessions,
+    items,
+    login,
+    users,
+    utils,
+)
+from app.core.config import settings
+
+# Only the endpoints of the database layer in use are imported, the async
+# ones need asyncpg
+if settings.ASYNC_DB_ENABLED:
+    from app.api.api_v1.endpoints import best_scores_async, games_async
+
+    games_router, best_scores_router = games_async.router, best_scores_async.router
+else:
+    from app.api.api_v1.endpoints import best_scores, games
+
+    games_router, best_scores_router = games.router, best_scores.router
 
 api_router = APIRouter()
 api_router.include_router(login.router, tags=["login"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
-api_router.include_router(games.router, prefix="/games", tags=["games"])
+api_router.include_router(games_router, prefix="/games", tags=["games"])
+api_router.include_router(game_sessions.router, prefix="/games", tags=["games"])
+api_router.include_router(
+    best_scores_router, prefix="/best_scores", tags=["best_scores"]
+)
 api_router.include_router(
-    best_scores.router, prefix="/best_scores", tags=["best_scores"]
+    best_scores_stream.router, prefix="/best_scores", tags=["best_scores"]
 )
 api_router.include_router(utils.router, prefix="/utils", tags=["utils"])
 api_router.include_router(items.router, prefix="/items", tags=["items"])
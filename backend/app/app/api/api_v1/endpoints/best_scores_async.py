@@ -0,0 +1,91 @@
+from typing import Any, List, Optional
+
+from databases import Database
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+from app import crud, schemas
+from app.api import conditional, deps, responses
+from app.core.leaderboard import Cursor, leaderboards
+
+# Event loop versions of the `best_scores` endpoints, mounted instead of them
+# when `settings.ASYNC_DB_ENABLED` is set.
+router = APIRouter()
+
+
+@router.get("/", response_model=List[schemas.RankedBestScore])
+async def read_best_scores(
+    request: Request,
+    db: Database = Depends(deps.get_async_db),
+    cursor: Optional[Cursor] = Depends(deps.get_leaderboard_cursor),
+    limit: int = Query(1, ge=1, le=1000),
+    user_id: Optional[int] = None,
+    period: str = Query("all", regex="^(all|day|week)$"),
+) -> Any:
+    """
+    Retrieve best score order by min_open_count asc
+
+    A full page comes with an `X-Next-Cursor` header, pass it as `cursor` to
+    get the next one. `period` is `all`, or `day` or `week` for the scores of
+    the games finished since the start of the current UTC day or week.
+
+    Responses carry an ETag and a Last-Modified date, a conditional request
+    for an unchanged leaderboard gets 304 Not Modified.
+    """
+    await crud.async_best_score.load_leaderboard(db, period=period)
+    leaderboard = leaderboards[period]
+    etag, modified_at = leaderboard.validators()
+    if conditional.is_fresh(request, etag=etag, last_modified=modified_at):
+        return conditional.not_modified(etag=etag, last_modified=modified_at)
+    if user_id is not None:
+        entry = leaderboard.get(user_id)
+        response = responses.ranked_best_scores([entry] if entry else [])
+    else:
+        response = responses.leaderboard_page(leaderboard, after=cursor, limit=limit)
+    return conditional.with_validators(response, etag=etag, last_modified=modified_at)
+
+
+@router.get("/rank/{user_id}", response_model=schemas.RankedBestScore)
+async def read_rank(
+    request: Request,
+    user_id: int,
+    db: Database = Depends(deps.get_async_db),
+    period: str = Query("all", regex="^(all|day|week)$"),
+) -> Any:
+    """
+    Leaderboard rank of a user, all-time or in the current day or week.
+    """
+    await crud.async_best_score.load_leaderboard(db, period=period)
+    leaderboard = leaderboards[period]
+    etag, modified_at = leaderboard.validators()
+    if conditional.is_fresh(request, etag=etag, last_modified=modified_at):
+        return conditional.not_modified(etag=etag, last_modified=modified_at)
+    entry = leaderboard.get(user_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="BestScore not found")
+    return conditional.with_validators(
+        responses.ranked_best_score(entry), etag=etag, last_modified=modified_at
+    )
+
+
+@router.get("/neighbors/{user_id}", response_model=List[schemas.RankedBestScore])
+async def read_neighbors(
+    request: Request,
+    user_id: int,
+    db: Database = Depends(deps.get_async_db),
+    size: int = Query(5, ge=0, le=100),
+    period: str = Query("all", regex="^(all|day|week)$"),
+) -> Any:
+    """
+    Up to `size` best scores on either side of a user's, and the user's own.
+    """
+    await crud.async_best_score.load_leaderboard(db, period=period)
+    leaderboard = leaderboards[period]
+    etag, modified_at = leaderboard.validators()
+    if conditional.is_fresh(request, etag=etag, last_modified=modified_at):
+        return conditional.not_modified(etag=etag, last_modified=modified_at)
+    entries = leaderboard.neighbors(user_id, size=size)
+    if not entries:
+        raise HTTPException(status_code=404, detail="BestScore not found")
+    return conditional.with_validators(
+        responses.ranked_best_scores(entries), etag=etag, last_modified=modified_at
+    )
@@ -0,0 +1,34 @@
+from typing import Any, Optional
+
+from fastapi import APIRouter, Query, Request
+from starlette.responses import StreamingResponse
+
+from app.api import leaderboard_events
+
+# Mounted with either database layer, the stream reads the in-memory
+# leaderboards only
+router = APIRouter()
+
+
+@router.get("/stream", response_class=StreamingResponse)
+async def stream_best_scores(
+    request: Request,
+    period: str = Query("all", regex="^(all|day|week)$"),
+    top: int = Query(10, ge=1, le=100),
+    user_id: Optional[int] = None,
+) -> Any:
+    """
+    Server-sent events of the leaderboard of `period`. A `top` event carries
+    the first `top` best scores, and with `user_id` a `rank` event carries
+    that user's best score and rank, or `null`. Both are sent on connect,
+    then whenever they change, at most once per
+    `LEADERBOARD_EVENTS_INTERVAL` seconds.
+    """
+    await leaderboard_events.load_leaderboard(period)
+    return StreamingResponse(
+        leaderboard_events.stream_events(
+            request, period=period, top=top, user_id=user_id
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
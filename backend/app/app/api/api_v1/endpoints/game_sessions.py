@@ -0,0 +1,118 @@
+import json
+import logging
+from typing import Any, Optional
+
+from fastapi import APIRouter, HTTPException, Query, WebSocket
+from sqlalchemy.orm.exc import StaleDataError
+from starlette.concurrency import run_in_threadpool
+from starlette.websockets import WebSocketDisconnect
+
+from app import crud, schemas
+from app.api import deps, game_checks
+from app.api.active_games import journaled, load_session, save_session
+from app.core.active_games import SessionClosed, active_games
+from app.core.cache import CacheUnavailable
+from app.core.config import settings
+from app.db.async_session import get_database
+from app.db.session import SessionLocal
+
+# WebSocket close codes of failures, 4000 + the status the HTTP endpoints
+# answer them with
+CLOSE_CODE_BASE = 4000
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def _check_principal(
+    principal: Optional[schemas.UserPrincipal],
+) -> schemas.UserPrincipal:
+    if not principal:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not crud.user.is_active(principal):
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return principal
+
+
+def _get_principal_sync(user_id: Any) -> Optional[schemas.UserPrincipal]:
+    db = SessionLocal()
+    try:
+        return crud.user.get_principal(db, id=user_id)
+    finally:
+        db.close()
+
+
+async def get_principal(user_id: Any) -> Optional[schemas.UserPrincipal]:
+    if settings.ASYNC_DB_ENABLED:
+        return await crud.async_user.get_principal(get_database(), id=user_id)
+    return await run_in_threadpool(_get_principal_sync, user_id)
+
+
+def _read_position(text: str) -> int:
+    message = json.loads(text)
+    position = message["position"]
+    if not isinstance(position, int):
+        raise TypeError("position must be an integer")
+    return position
+
+
+@router.websocket("/{id}/session")
+async def game_session(websocket: WebSocket, id: int, token: str = Query(...)) -> None:
+    """
+    Play game `id` over one WebSocket, authenticated once by the `token`
+    query parameter.
+
+    Each `{"position": n}` message opens a card and is answered with a
+    `CardGameDelta`, or `{"detail": ...}` for an invalid move. Moves are
+    applied to the game kept in `active_games` and written every
+    `GAME_SESSION_SAVE_MOVES` moves, at the game end and on disconnect. A
+    game changed outside the session closes it with code 4409.
+    """
+    # Accepted first, a close before it is sent as an HTTP 403 without the code
+    await websocket.accept()
+    try:
+        claims = deps.verify_token(token)
+        principal = _check_principal(
+            deps.embedded_principal(claims) or await get_principal(claims.sub)
+        )
+        session = game_checks.check_game(
+            await load_session(id, current_user=principal), principal
+        )
+    except HTTPException as exc:
+        await websocket.close(code=CLOSE_CODE_BASE + exc.status_code)
+        return
+    except CacheUnavailable:
+        await websocket.close(code=CLOSE_CODE_BASE + 503)
+        return
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                position = _read_position(text)
+            except (ValueError, KeyError, TypeError):
+                await websocket.send_json({"detail": 'Expected {"position": int}'})
+                continue
+            try:
+                game_delta, snapshot = await journaled(
+                    active_games.open_card, session, position
+                )
+            except IndexError:
+                await websocket.send_json({"detail": "Card position out of range"})
+                continue
+            await save_session(session, snapshot)
+            # Already in the `CardGameDelta` shape, sent without validation
+            await websocket.send_json(game_delta)
+    except WebSocketDisconnect:
+        pass
+    except (SessionClosed, StaleDataError):
+        await websocket.send_json({"detail": "CardGame was modified concurrently"})
+        await websocket.close(code=CLOSE_CODE_BASE + 409)
+        return
+    try:
+        await save_session(session, active_games.claim_save(session))
+    except StaleDataError:
+        logger.warning(
+            "Dropped the unsaved moves of CardGame %s, modified concurrently",
+            session.id,
+        )
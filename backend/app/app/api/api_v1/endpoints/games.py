@@ -1,84 +1,234 @@
-from typing import Any
+from typing import Any, List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app import crud, models, schemas
-from app.api import deps
-from app.models.card_game import BestScore
+from app import crud, schemas
+from app.api import conditional, deps, game_checks, responses
+from app.api.active_games import (
+    flush_session_sync,
+    open_card_in_memory_sync,
+    read_game_in_memory,
+)
+from app.api.query_budget import query_budget
+from app.core.active_games import active_games
+from app.core.config import settings
+from app.crud.pagination import PageCursor
 
 router = APIRouter()
 
 
 @router.post("/", response_model=schemas.CardGame)
+@query_budget(2)
 def create_game(
     *,
     db: Session = Depends(deps.get_db),
     game_in: schemas.CardGameCreate,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: schemas.UserPrincipal = Depends(deps.get_current_active_principal),
 ) -> Any:
     """
     Create new game.
     """
     item = crud.game.create_with_owner(db=db, obj_in=game_in, owner_id=current_user.id)
-    return item
+    return responses.card_game(item)
 
 
-@router.post("/{id}/open_card/{card_position}", response_model=schemas.CardGame)
+@router.post("/batch", response_model=List[schemas.CardGame])
+@query_budget(2)
+def create_games(
+    *,
+    db: Session = Depends(deps.get_db),
+    batch_in: schemas.CardGameBatchCreate,
+    current_user: schemas.UserPrincipal = Depends(deps.get_current_active_principal),
+) -> Any:
+    """
+    Create `count` games for each of `owner_ids`, by default the current user.
+    Only superusers may create games for other users.
+    """
+    owner_ids = game_checks.batch_owner_ids(batch_in, current_user)
+    try:
+        games = crud.game.create_multi_with_owners(
+            db,
+            owner_ids=owner_ids,
+            pair_count=batch_in.pair_count,
+        )
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="User not found")
+    return responses.card_games(games)
+
+
+@router.get("/", response_model=schemas.Page[schemas.CardGameSummary])
+@query_budget(2)
+def read_games(
+    *,
+    db: Session = Depends(deps.get_db),
+    is_finished: Optional[bool] = None,
+    cursor: Optional[PageCursor] = Depends(deps.page_cursor(crud.game)),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: schemas.UserPrincipal = Depends(deps.get_current_active_principal),
+) -> Any:
+    """
+    Summaries of the current user's games by id, a page at a time, only the
+    finished or unfinished ones with `is_finished`. Games being played in
+    memory show their last saved move.
+    """
+    return crud.game.get_summaries(
+        db,
+        owner_id=current_user.id,
+        is_finished=is_finished,
+        cursor=cursor,
+        limit=limit,
+    )
+
+
+@router.get("/all", response_model=schemas.Page[schemas.CardGameSummary])
+@query_budget(2)
+def read_all_games(
+    *,
+    db: Session = Depends(deps.get_db),
+    owner_id: Optional[int] = None,
+    is_finished: Optional[bool] = None,
+    cursor: Optional[PageCursor] = Depends(deps.page_cursor(crud.game)),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: schemas.UserPrincipal = Depends(deps.get_current_active_principal),
+) -> Any:
+    """
+    Summaries of every game, or of `owner_id`'s, for superusers.
+    """
+    game_checks.check_superuser(current_user)
+    return crud.game.get_summaries(
+        db,
+        owner_id=owner_id,
+        is_finished=is_finished,
+        cursor=cursor,
+        limit=limit,
+    )
+
+
+# The principal, the game, its UPDATE, the logged move and its snapshot, and
+# the all-time and the daily and weekly best score upserts of a game end, with
+# the NOTIFY of its new scores
+@router.post(
+    "/{id}/open_card/{card_position}",
+    response_model=Union[schemas.CardGame, schemas.CardGameDelta],
+)
+@query_budget(8)
 def open_card(
     *,
     db: Session = Depends(deps.get_db),
     id: int,
     card_position: int,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    version: Optional[int] = None,
+    delta: bool = Depends(deps.get_delta_mode),
+    current_user: schemas.UserPrincipal = Depends(deps.get_current_active_principal),
 ) -> Any:
     """
-    try to open card with card position 0-11
-    """
-    card_game = crud.game.get(db=db, id=id)
-    if not card_game:
-        raise HTTPException(status_code=404, detail="CardGame not found")
-    if not crud.user.is_superuser(current_user) and (
-        card_game.owner_id != current_user.id
-    ):
-        raise HTTPException(status_code=400, detail="Not enough permissions")
-    game_info_json = card_game.game_info
-    game_info = schemas.game.GameInfoInDB(**game_info_json)
-    game_info.accept_answer_if_in_condition(card_position)
-    card_game.game_info = game_info.dict()
-    card_game.open_count += 1
-
-    # Update Best Score if need
-    if game_info.is_game_end():
-        best_score = (
-            db.query(BestScore).filter(BestScore.user_id == card_game.owner_id).first()
-        )
-        if best_score is None:
-            best_score = BestScore(
-                user_id=card_game.owner_id, min_open_count=card_game.open_count
-            )
-            db.add(best_score)
-        if best_score.min_open_count > card_game.open_count:
-            best_score.min_open_count = card_game.open_count
-    db.commit()
+    try to open card with card position 0 to total_card - 1
 
-    return card_game
+    Pass the `version` the client last saw to reject the move with 409 if the
+    game has changed since; concurrent moves on one game also answer 409.
 
+    With `?delta=true` or `Accept: application/vnd.cardgame.delta+json` only
+    the cards this move turned over come back, as a `CardGameDelta`.
 
+    With `GAME_WRITE_BEHIND_ENABLED`, or while the game is played over a
+    WebSocket session, the move is applied to the game kept in memory.
+    """
+    if settings.GAME_WRITE_BEHIND_ENABLED or active_games.get(id) is not None:
+        return open_card_in_memory_sync(
+            db,
+            id=id,
+            card_position=card_position,
+            version=version,
+            delta=delta,
+            current_user=current_user,
+        )
+    card_game = game_checks.check_game(crud.game.get(db=db, id=id), current_user)
+    game_checks.check_version(card_game, version)
+    before = card_game.game_state
+    with game_checks.move_errors():
+        card_game = crud.game.open_card(db=db, db_obj=card_game, position=card_position)
+    return responses.opened_card(card_game, before, card_position, delta=delta)
+
+
+# The principal, the owner and version of a conditional request, and the game
 @router.get("/{id}", response_model=schemas.CardGame)
+@query_budget(3)
 def read_game(
     *,
+    request: Request,
     db: Session = Depends(deps.get_db),
     id: int,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: schemas.UserPrincipal = Depends(deps.get_current_active_principal),
 ) -> Any:
     """
     Get Game by ID.
+
+    Responses carry the game version as ETag, a conditional request for an
+    unchanged game gets 304 Not Modified without decoding the game.
+    """
+    session = active_games.get(id)
+    if session is not None:
+        return read_game_in_memory(request, session, current_user=current_user)
+    if conditional.is_conditional(request):
+        # The state is only read and decoded once the game has changed
+        validators = game_checks.check_game(
+            crud.game.get_validators(db, id=id), current_user
+        )
+        not_modified = conditional.game_not_modified(
+            request, id=id, version=validators.version
+        )
+        if not_modified is not None:
+            return not_modified
+    item = game_checks.check_game(crud.game.get(db=db, id=id), current_user)
+    return conditional.with_game_validators(
+        responses.card_game(item), id=id, version=item.version
+    )
+
+
+# Up to 6 for saving the unsaved moves first, as in `open_card`
+@router.get("/{id}/moves", response_model=List[schemas.CardMove])
+@query_budget(9)
+def read_moves(
+    *,
+    db: Session = Depends(deps.get_db),
+    id: int,
+    after_seq: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: schemas.UserPrincipal = Depends(deps.get_current_active_principal),
+) -> Any:
     """
-    item = crud.game.get(db=db, id=id)
+    Logged moves of a game in order, starting after move `after_seq`.
+    """
+    flush_session_sync(db, id, current_user=current_user)
+    game_checks.check_game(crud.game.get(db=db, id=id), current_user)
+    return crud.card_move.get_multi_by_game(
+        db, game_id=id, after_seq=after_seq, limit=limit
+    )
+
 
-    if not item:
-        raise HTTPException(status_code=404, detail="CardGame not found")
-    if not crud.user.is_superuser(current_user) and (item.owner_id != current_user.id):
-        raise HTTPException(status_code=400, detail="Not enough permissions")
-    return item
+# Up to 6 for saving the unsaved moves first, as in `open_card`
+@router.get("/{id}/moves/{seq}/game_info", response_model=schemas.GameInfoInDB)
+@query_budget(10)
+def read_game_info_at(
+    *,
+    db: Session = Depends(deps.get_db),
+    id: int,
+    seq: int,
+    current_user: schemas.UserPrincipal = Depends(deps.get_current_active_principal),
+) -> Any:
+    """
+    The game as it was after move `seq` (0 for the deal), rebuilt from the
+    move log. It shows the whole layout, so players only get it for their
+    finished games.
+    """
+    flush_session_sync(db, id, current_user=current_user)
+    card_game = game_checks.check_replay(
+        crud.game.get(db=db, id=id), current_user, seq=seq
+    )
+    game_state = crud.card_move.get_state_at(db, game=card_game, seq=seq)
+    if game_state is None:
+        raise HTTPException(status_code=404, detail="Move history not available")
+    return game_state.to_game_info()
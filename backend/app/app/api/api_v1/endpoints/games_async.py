@@ -0,0 +1,257 @@
+from typing import Any, List, Optional, Union
+
+from asyncpg.exceptions import ForeignKeyViolationError
+from databases import Database
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+from app import crud, schemas
+from app.api import conditional, deps, game_checks, responses
+from app.api.active_games import (
+    flush_session_async,
+    open_card_in_memory_async,
+    read_game_in_memory,
+)
+from app.api.query_budget import query_budget
+from app.core.active_games import active_games
+from app.core.config import settings
+from app.crud.pagination import PageCursor
+
+# Event loop versions of the `games` endpoints, mounted instead of them when
+# `settings.ASYNC_DB_ENABLED` is set.
+router = APIRouter()
+
+
+@router.post("/", response_model=schemas.CardGame)
+@query_budget(2)
+async def create_game(
+    *,
+    db: Database = Depends(deps.get_async_db),
+    game_in: schemas.CardGameCreate,
+    current_user: schemas.UserPrincipal = Depends(
+        deps.get_current_active_principal_async
+    ),
+) -> Any:
+    """
+    Create new game.
+    """
+    item = await crud.async_game.create_with_owner(
+        db=db, obj_in=game_in, owner_id=current_user.id
+    )
+    return responses.card_game(item)
+
+
+@router.post("/batch", response_model=List[schemas.CardGame])
+@query_budget(2)
+async def create_games(
+    *,
+    db: Database = Depends(deps.get_async_db),
+    batch_in: schemas.CardGameBatchCreate,
+    current_user: schemas.UserPrincipal = Depends(
+        deps.get_current_active_principal_async
+    ),
+) -> Any:
+    """
+    Create `count` games for each of `owner_ids`, by default the current user.
+    Only superusers may create games for other users.
+    """
+    owner_ids = game_checks.batch_owner_ids(batch_in, current_user)
+    try:
+        games = await crud.async_game.create_multi_with_owners(
+            db,
+            owner_ids=owner_ids,
+            pair_count=batch_in.pair_count,
+        )
+    except ForeignKeyViolationError:
+        raise HTTPException(status_code=404, detail="User not found")
+    return responses.card_games(games)
+
+
+@router.get("/", response_model=schemas.Page[schemas.CardGameSummary])
+@query_budget(2)
+async def read_games(
+    *,
+    db: Database = Depends(deps.get_async_db),
+    is_finished: Optional[bool] = None,
+    cursor: Optional[PageCursor] = Depends(deps.page_cursor(crud.async_game)),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: schemas.UserPrincipal = Depends(
+        deps.get_current_active_principal_async
+    ),
+) -> Any:
+    """
+    Summaries of the current user's games by id, a page at a time, only the
+    finished or unfinished ones with `is_finished`. Games being played in
+    memory show their last saved move.
+    """
+    return await crud.async_game.get_summaries(
+        db,
+        owner_id=current_user.id,
+        is_finished=is_finished,
+        cursor=cursor,
+        limit=limit,
+    )
+
+
+@router.get("/all", response_model=schemas.Page[schemas.CardGameSummary])
+@query_budget(2)
+async def read_all_games(
+    *,
+    db: Database = Depends(deps.get_async_db),
+    owner_id: Optional[int] = None,
+    is_finished: Optional[bool] = None,
+    cursor: Optional[PageCursor] = Depends(deps.page_cursor(crud.async_game)),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: schemas.UserPrincipal = Depends(
+        deps.get_current_active_principal_async
+    ),
+) -> Any:
+    """
+    Summaries of every game, or of `owner_id`'s, for superusers.
+    """
+    game_checks.check_superuser(current_user)
+    return await crud.async_game.get_summaries(
+        db,
+        owner_id=owner_id,
+        is_finished=is_finished,
+        cursor=cursor,
+        limit=limit,
+    )
+
+
+# The principal, the game, its UPDATE, the logged move and its snapshot, and
+# the all-time and the daily and weekly best score upserts of a game end, with
+# the NOTIFY of its new scores
+@router.post(
+    "/{id}/open_card/{card_position}",
+    response_model=Union[schemas.CardGame, schemas.CardGameDelta],
+)
+@query_budget(8)
+async def open_card(
+    *,
+    db: Database = Depends(deps.get_async_db),
+    id: int,
+    card_position: int,
+    version: Optional[int] = None,
+    delta: bool = Depends(deps.get_delta_mode),
+    current_user: schemas.UserPrincipal = Depends(
+        deps.get_current_active_principal_async
+    ),
+) -> Any:
+    """
+    try to open card with card position 0 to total_card - 1
+
+    Pass the `version` the client last saw to reject the move with 409 if the
+    game has changed since; concurrent moves on one game also answer 409.
+
+    With `?delta=true` or `Accept: application/vnd.cardgame.delta+json` only
+    the cards this move turned over come back, as a `CardGameDelta`.
+
+    With `GAME_WRITE_BEHIND_ENABLED`, or while the game is played over a
+    WebSocket session, the move is applied to the game kept in memory.
+    """
+    if settings.GAME_WRITE_BEHIND_ENABLED or active_games.get(id) is not None:
+        return await open_card_in_memory_async(
+            db,
+            id=id,
+            card_position=card_position,
+            version=version,
+            delta=delta,
+            current_user=current_user,
+        )
+    card_game = game_checks.check_game(
+        await crud.async_game.get(db=db, id=id), current_user
+    )
+    game_checks.check_version(card_game, version)
+    before = card_game.game_state
+    with game_checks.move_errors():
+        card_game = await crud.async_game.open_card(
+            db=db, db_obj=card_game, position=card_position
+        )
+    return responses.opened_card(card_game, before, card_position, delta=delta)
+
+
+# The principal, the owner and version of a conditional request, and the game
+@router.get("/{id}", response_model=schemas.CardGame)
+@query_budget(3)
+async def read_game(
+    *,
+    request: Request,
+    db: Database = Depends(deps.get_async_db),
+    id: int,
+    current_user: schemas.UserPrincipal = Depends(
+        deps.get_current_active_principal_async
+    ),
+) -> Any:
+    """
+    Get Game by ID.
+
+    Responses carry the game version as ETag, a conditional request for an
+    unchanged game gets 304 Not Modified without decoding the game.
+    """
+    session = active_games.get(id)
+    if session is not None:
+        return read_game_in_memory(request, session, current_user=current_user)
+    if conditional.is_conditional(request):
+        # The state is only read and decoded once the game has changed
+        validators = game_checks.check_game(
+            await crud.async_game.get_validators(db, id=id), current_user
+        )
+        not_modified = conditional.game_not_modified(
+            request, id=id, version=validators.version
+        )
+        if not_modified is not None:
+            return not_modified
+    item = game_checks.check_game(await crud.async_game.get(db=db, id=id), current_user)
+    return conditional.with_game_validators(
+        responses.card_game(item), id=id, version=item.version
+    )
+
+
+# Up to 6 for saving the unsaved moves first, as in `open_card`
+@router.get("/{id}/moves", response_model=List[schemas.CardMove])
+@query_budget(9)
+async def read_moves(
+    *,
+    db: Database = Depends(deps.get_async_db),
+    id: int,
+    after_seq: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: schemas.UserPrincipal = Depends(
+        deps.get_current_active_principal_async
+    ),
+) -> Any:
+    """
+    Logged moves of a game in order, starting after move `after_seq`.
+    """
+    await flush_session_async(db, id, current_user=current_user)
+    game_checks.check_game(await crud.async_game.get(db=db, id=id), current_user)
+    return await crud.async_card_move.get_multi_by_game(
+        db, game_id=id, after_seq=after_seq, limit=limit
+    )
+
+
+# Up to 6 for saving the unsaved moves first, as in `open_card`
+@router.get("/{id}/moves/{seq}/game_info", response_model=schemas.GameInfoInDB)
+@query_budget(10)
+async def read_game_info_at(
+    *,
+    db: Database = Depends(deps.get_async_db),
+    id: int,
+    seq: int,
+    current_user: schemas.UserPrincipal = Depends(
+        deps.get_current_active_principal_async
+    ),
+) -> Any:
+    """
+    The game as it was after move `seq` (0 for the deal), rebuilt from the
+    move log. It shows the whole layout, so players only get it for their
+    finished games.
+    """
+    await flush_session_async(db, id, current_user=current_user)
+    card_game = game_checks.check_replay(
+        await crud.async_game.get(db=db, id=id), current_user, seq=seq
+    )
+    game_state = await crud.async_card_move.get_state_at(db, game=card_game, seq=seq)
+    if game_state is None:
+        raise HTTPException(status_code=404, detail="Move history not available")
+    return game_state.to_game_info()
@@ -1,39 +1,43 @@
-from typing import Any, List
+from typing import Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
-from app import crud, models, schemas
+from app import crud, schemas
 from app.api import deps
+from app.api.query_budget import query_budget
+from app.crud.pagination import PageCursor
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[schemas.Item])
+@router.get("/", response_model=schemas.Page[schemas.Item])
+@query_budget(2)
 def read_items(
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    cursor: Optional[PageCursor] = Depends(deps.page_cursor(crud.item)),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: schemas.UserPrincipal = Depends(deps.get_current_active_principal),
 ) -> Any:
     """
-    Retrieve items.
+    Retrieve items, a page at a time.
     """
     if crud.user.is_superuser(current_user):
-        items = crud.item.get_multi(db, skip=skip, limit=limit)
+        items = crud.item.get_multi(db, cursor=cursor, limit=limit)
     else:
         items = crud.item.get_multi_by_owner(
-            db=db, owner_id=current_user.id, skip=skip, limit=limit
+            db=db, owner_id=current_user.id, cursor=cursor, limit=limit
         )
     return items
 
 
 @router.post("/", response_model=schemas.Item)
+@query_budget(2)
 def create_item(
     *,
     db: Session = Depends(deps.get_db),
     item_in: schemas.ItemCreate,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: schemas.UserPrincipal = Depends(deps.get_current_active_principal),
 ) -> Any:
     """
     Create new item.
@@ -43,12 +47,13 @@ def create_item(
 
 
 @router.put("/{id}", response_model=schemas.Item)
+@query_budget(3)
 def update_item(
     *,
     db: Session = Depends(deps.get_db),
     id: int,
     item_in: schemas.ItemUpdate,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: schemas.UserPrincipal = Depends(deps.get_current_active_principal),
 ) -> Any:
     """
     Update an item.
@@ -59,15 +64,19 @@ def update_item(
     if not crud.user.is_superuser(current_user) and (item.owner_id != current_user.id):
         raise HTTPException(status_code=400, detail="Not enough permissions")
     item = crud.item.update(db=db, db_obj=item, obj_in=item_in)
+    if not item:
+        # Deleted since it was read
+        raise HTTPException(status_code=404, detail="Item not found")
     return item
 
 
 @router.get("/{id}", response_model=schemas.Item)
+@query_budget(2)
 def read_item(
     *,
     db: Session = Depends(deps.get_db),
     id: int,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: schemas.UserPrincipal = Depends(deps.get_current_active_principal),
 ) -> Any:
     """
     Get item by ID.
@@ -81,11 +90,12 @@ def read_item(
 
 
 @router.delete("/{id}", response_model=schemas.Item)
+@query_budget(3)
 def delete_item(
     *,
     db: Session = Depends(deps.get_db),
     id: int,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: schemas.UserPrincipal = Depends(deps.get_current_active_principal),
 ) -> Any:
     """
     Delete an item.
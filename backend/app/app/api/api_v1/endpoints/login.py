@@ -10,6 +10,7 @@ from app.api import deps
 from app.core import security
 from app.core.config import settings
 from app.core.security import get_password_hash
+from app.core.tokens import token_digest
 from app.utils import (
     generate_password_reset_token,
     send_reset_password_email,
@@ -20,13 +21,13 @@ router = APIRouter()
 
 
 @router.post("/login/access-token", response_model=schemas.Token)
-def login_access_token(
+async def login_access_token(
     db: Session = Depends(deps.get_db), form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = crud.user.authenticate(
+    user = await crud.user.authenticate_async(
         db, email=form_data.username, password=form_data.password
     )
     if not user:
@@ -34,12 +35,18 @@ def login_access_token(
     elif not crud.user.is_active(user):
         raise HTTPException(status_code=400, detail="Inactive user")
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    return {
-        "access_token": security.create_access_token(
+    if settings.ACCESS_TOKEN_EMBED_PRINCIPAL:
+        access_token = security.create_access_token(
+            user.id,
+            expires_delta=access_token_expires,
+            is_active=user.is_active,
+            is_superuser=user.is_superuser,
+        )
+    else:
+        access_token = security.create_access_token(
             user.id, expires_delta=access_token_expires
-        ),
-        "token_type": "bearer",
-    }
+        )
+    return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.post("/login/test-token", response_model=schemas.User)
@@ -50,6 +57,16 @@ def test_token(current_user: models.User = Depends(deps.get_current_user)) -> An
     return current_user
 
 
+@router.post("/login/revoke-token", response_model=schemas.Msg)
+def revoke_token(token: str = Depends(deps.reusable_oauth2)) -> Any:
+    """
+    Log out: revoke the access token of the request
+    """
+    claims = deps.verify_token(token)
+    security.token_denylist.revoke(token_digest(token), claims)
+    return {"msg": "Token revoked"}
+
+
 @router.post("/password-recovery/{email}", response_model=schemas.Msg)
 def recover_password(email: str, db: Session = Depends(deps.get_db)) -> Any:
     """
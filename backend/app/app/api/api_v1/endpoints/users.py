@@ -1,33 +1,39 @@
-from typing import Any, List
+from typing import Any, Optional
 
-from fastapi import APIRouter, Body, Depends, HTTPException
-from fastapi.encoders import jsonable_encoder
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
 from pydantic.networks import EmailStr
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
 from app.api import deps
+from app.api.query_budget import query_budget
+from app.core import security
 from app.core.config import settings
+from app.crud.pagination import PageCursor
 from app.utils import send_new_account_email
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[schemas.User])
+@router.get("/", response_model=schemas.Page[schemas.User])
+@query_budget(2)
 def read_users(
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[PageCursor] = Depends(deps.page_cursor(crud.user)),
+    limit: int = Query(100, ge=1, le=1000),
+    sort: str = Query("id", regex="^(id|email)$"),
     current_user: models.User = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
-    Retrieve users.
+    Retrieve users, a page at a time, by id or email. A cursor keeps the sort
+    of the page it came from.
     """
-    users = crud.user.get_multi(db, skip=skip, limit=limit)
+    users = crud.user.get_multi(db, cursor=cursor, limit=limit, sort=sort)
     return users
 
 
 @router.post("/", response_model=schemas.User)
+@query_budget(3)
 def create_user(
     *,
     db: Session = Depends(deps.get_db),
@@ -52,6 +58,7 @@ def create_user(
 
 
 @router.put("/me", response_model=schemas.User)
+@query_budget(2)
 def update_user_me(
     *,
     db: Session = Depends(deps.get_db),
@@ -63,19 +70,22 @@ def update_user_me(
     """
     Update own user.
     """
-    current_user_data = jsonable_encoder(current_user)
-    user_in = schemas.UserUpdate(**current_user_data)
-    if password is not None:
-        user_in.password = password
-    if full_name is not None:
-        user_in.full_name = full_name
-    if email is not None:
-        user_in.email = email
-    user = crud.user.update(db, db_obj=current_user, obj_in=user_in)
+    # Only the given fields, a single UPDATE ... RETURNING
+    update_data = {"password": password, "full_name": full_name, "email": email}
+    user = crud.user.update(
+        db,
+        db_obj=current_user,
+        obj_in={
+            field: value for field, value in update_data.items() if value is not None
+        },
+    )
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
 @router.get("/me", response_model=schemas.User)
+@query_budget(1)
 def read_user_me(
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_active_user),
@@ -87,6 +97,7 @@ def read_user_me(
 
 
 @router.post("/open", response_model=schemas.User)
+@query_budget(2)
 def create_user_open(
     *,
     db: Session = Depends(deps.get_db),
@@ -114,6 +125,7 @@ def create_user_open(
 
 
 @router.get("/{user_id}", response_model=schemas.User)
+@query_budget(2)
 def read_user_by_id(
     user_id: int,
     current_user: models.User = Depends(deps.get_current_active_user),
@@ -133,6 +145,7 @@ def read_user_by_id(
 
 
 @router.put("/{user_id}", response_model=schemas.User)
+@query_budget(3)
 def update_user(
     *,
     db: Session = Depends(deps.get_db),
@@ -150,4 +163,29 @@ def update_user(
             detail="The user with this username does not exist in the system",
         )
     user = crud.user.update(db, db_obj=user, obj_in=user_in)
+    if not user:
+        # Deleted since it was read
+        raise HTTPException(
+            status_code=404,
+            detail="The user with this username does not exist in the system",
+        )
     return user
+
+
+@router.post("/{user_id}/revoke-tokens", response_model=schemas.Msg)
+@query_budget(2)
+def revoke_user_tokens(
+    user_id: int,
+    current_user: models.User = Depends(deps.get_current_active_superuser),
+    db: Session = Depends(deps.get_db),
+) -> Any:
+    """
+    Revoke every access token issued to a user so far.
+    """
+    if not crud.user.get(db, id=user_id):
+        raise HTTPException(
+            status_code=404,
+            detail="The user with this username does not exist in the system",
+        )
+    security.token_denylist.revoke_user(user_id)
+    return {"msg": "Tokens revoked"}
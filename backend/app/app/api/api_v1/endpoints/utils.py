@@ -5,6 +5,8 @@ from pydantic.networks import EmailStr
 
 from app import models, schemas
 from app.api import deps
+from app.db.pool import pool_status
+from app.db.session import engine
 from app.utils import send_test_email
 
 router = APIRouter()
@@ -20,3 +22,13 @@ def test_email(
     """
     send_test_email(email_to=email_to)
     return {"msg": "Test email sent"}
+
+
+@router.get("/db-pool/", response_model=schemas.DBPoolStats)
+def read_db_pool_stats(
+    current_user: models.User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Connection pool statistics of the worker serving the request.
+    """
+    return pool_status(engine)
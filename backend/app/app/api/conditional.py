@@ -0,0 +1,100 @@
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Validators of the polled endpoints and the conditional GETs they answer with
+# 304 Not Modified. The validator is checked before anything is rendered, so
+# a poll that finds nothing new costs no game decoding and no serialization.
+
+# Cache-Control of responses for their user only, revalidated on every use
+PRIVATE = "private, no-cache"
+
+
+def game_etag(id: int, version: int) -> str:
+    """
+    ETag of a game, every move bumps its version.
+    """
+    return f'"game-{id}-{version}"'
+
+
+def game_not_modified(request: Request, *, id: int, version: int) -> Optional[Response]:
+    """
+    304 Not Modified if the client's copy of game `id` is of `version`.
+    """
+    etag = game_etag(id, version)
+    if is_fresh(request, etag=etag):
+        return not_modified(etag=etag, cache_control=PRIVATE)
+    return None
+
+
+def with_game_validators(response: Response, *, id: int, version: int) -> Response:
+    return with_validators(response, etag=game_etag(id, version), cache_control=PRIVATE)
+
+
+def _validators(
+    etag: str, last_modified: Optional[float], cache_control: str
+) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return headers
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison, as for GET
+    if if_none_match.strip() == "*":
+        return True
+    return etag in [
+        tag.strip()[2:] if tag.strip().startswith("W/") else tag.strip()
+        for tag in if_none_match.split(",")
+    ]
+
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def is_fresh(
+    request: Request, *, etag: Optional[str], last_modified: Optional[float] = None
+) -> bool:
+    """
+    Whether the client's copy is current, by If-None-Match. If-Modified-Since
+    is only compared without an `etag`: at the second, it can't tell apart
+    the changes made within one.
+    """
+    if etag is not None:
+        if_none_match = request.headers.get("if-none-match")
+        return if_none_match is not None and _matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(last_modified) <= since
+
+
+def not_modified(
+    *,
+    etag: str,
+    last_modified: Optional[float] = None,
+    cache_control: str = "no-cache",
+) -> Response:
+    return Response(
+        status_code=304, headers=_validators(etag, last_modified, cache_control)
+    )
+
+
+def with_validators(
+    response: Response,
+    *,
+    etag: str,
+    last_modified: Optional[float] = None,
+    cache_control: str = "no-cache",
+) -> Response:
+    for name, value in _validators(etag, last_modified, cache_control).items():
+        response.headers[name] = value
+    return response
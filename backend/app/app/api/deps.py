@@ -1,20 +1,27 @@
-from typing import Generator
+from typing import Any, AsyncGenerator, Callable, Generator, Optional
 
-from fastapi import Depends, HTTPException, status
+from databases import Database
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
-from app.core import security
+from app.core import profiling, security
 from app.core.config import settings
+from app.core.leaderboard import Cursor, decode_cursor
+from app.core.tokens import TokenClaims, token_digest
+from app.crud.pagination import PageCursor
+from app.db.async_session import get_database
 from app.db.session import SessionLocal
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
 )
 
+DELTA_MEDIA_TYPE = "application/vnd.cardgame.delta+json"
+
 
 def get_db() -> Generator:
     try:
@@ -24,20 +31,105 @@ def get_db() -> Generator:
         db.close()
 
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
-) -> models.User:
+async def get_async_db() -> AsyncGenerator:
+    yield get_database()
+
+
+def get_leaderboard_cursor(cursor: Optional[str] = None) -> Optional[Cursor]:
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def page_cursor(crud_object: Any) -> Callable[..., Optional[PageCursor]]:
+    """
+    Dependency reading the `cursor` query parameter of a list paged by
+    `crud_object`, answering 400 to one it didn't issue.
+    """
+
+    def get_page_cursor(cursor: Optional[str] = None) -> Optional[PageCursor]:
+        if cursor is None:
+            return None
+        try:
+            return crud_object.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return get_page_cursor
+
+
+def get_delta_mode(delta: bool = False, accept: Optional[str] = Header(None)) -> bool:
+    """
+    Whether the client asked for `schemas.CardGameDelta` responses, with
+    `?delta=true` or `Accept: application/vnd.cardgame.delta+json`.
+    """
+    return delta or (accept is not None and DELTA_MEDIA_TYPE in accept)
+
+
+def _credentials_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Could not validate credentials",
+    )
+
+
+def decode_token(token: str) -> TokenClaims:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
         )
         token_data = schemas.TokenPayload(**payload)
     except (jwt.JWTError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        )
-    user = crud.user.get(db, id=token_data.sub)
+        raise _credentials_error()
+    return TokenClaims(
+        token_data.sub,
+        token_data.exp,
+        token_data.iat,
+        token_data.is_active,
+        token_data.is_superuser,
+    )
+
+
+def verify_token(token: str) -> TokenClaims:
+    """
+    `decode_token` once per token through `security.verified_tokens`, then
+    checked against `security.token_denylist` on every use.
+    """
+    digest = token_digest(token)
+    claims = security.verified_tokens.get(digest)
+    if claims is None:
+        claims = decode_token(token)
+        security.verified_tokens.put(digest, claims)
+    if security.token_denylist.is_revoked(digest, claims):
+        raise _credentials_error()
+    return claims
+
+
+def embedded_principal(claims: TokenClaims) -> Optional[schemas.UserPrincipal]:
+    """
+    The principal carried by the token's claims, `None` if it has none or
+    `ACCESS_TOKEN_EMBED_PRINCIPAL` is off: flag changes only revoke tokens
+    while it is on, so older claims may be stale.
+    """
+    if (
+        not settings.ACCESS_TOKEN_EMBED_PRINCIPAL
+        or claims.sub is None
+        or claims.is_active is None
+        or claims.is_superuser is None
+    ):
+        return None
+    return schemas.UserPrincipal(claims.sub, claims.is_active, claims.is_superuser)
+
+
+def get_current_user(
+    db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
+) -> models.User:
+    with profiling.phase("auth"):
+        claims = verify_token(token)
+        user = crud.user.get(db, id=claims.sub)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -59,3 +151,50 @@ def get_current_active_superuser(
             status_code=400, detail="The user doesn't have enough privileges"
         )
     return current_user
+
+
+def get_current_principal(
+    db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
+) -> schemas.UserPrincipal:
+    with profiling.phase("auth"):
+        claims = verify_token(token)
+        principal = embedded_principal(claims) or crud.user.get_principal(
+            db, id=claims.sub
+        )
+    if not principal:
+        raise HTTPException(status_code=404, detail="User not found")
+    return principal
+
+
+def get_current_active_principal(
+    principal: schemas.UserPrincipal = Depends(get_current_principal),
+) -> schemas.UserPrincipal:
+    """
+    `get_current_active_user` for endpoints that only need the user's id and
+    flags: served from the token's claims or `crud.user.principal_cache`
+    without a user SELECT.
+    """
+    if not crud.user.is_active(principal):
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return principal
+
+
+async def get_current_principal_async(
+    db: Database = Depends(get_async_db), token: str = Depends(reusable_oauth2)
+) -> schemas.UserPrincipal:
+    with profiling.phase("auth"):
+        claims = verify_token(token)
+        principal = embedded_principal(claims) or await crud.async_user.get_principal(
+            db, id=claims.sub
+        )
+    if not principal:
+        raise HTTPException(status_code=404, detail="User not found")
+    return principal
+
+
+async def get_current_active_principal_async(
+    principal: schemas.UserPrincipal = Depends(get_current_principal_async),
+) -> schemas.UserPrincipal:
+    if not crud.user.is_active(principal):
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return principal
@@ -0,0 +1,94 @@
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm.exc import StaleDataError
+
+from app import crud, schemas
+from app.core.active_games import SessionClosed
+from app.core.config import settings
+
+# Checks of the `games` endpoints, shared by those of both database layers and
+# by the games kept in `active_games`. Each raises the HTTPException the
+# endpoint answers with; the endpoints keep only their data access.
+
+
+def check_superuser(principal: schemas.UserPrincipal) -> None:
+    if not crud.user.is_superuser(principal):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+
+
+def check_owner(principal: schemas.UserPrincipal, owner_id: int) -> None:
+    if not crud.user.is_superuser(principal) and owner_id != principal.id:
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+
+
+def check_game(game: Optional[Any], principal: schemas.UserPrincipal) -> Any:
+    """
+    `game`, a `models.CardGame` or a `GameSession`, if it exists and
+    `principal` may play it.
+    """
+    if not game:
+        raise HTTPException(status_code=404, detail="CardGame not found")
+    check_owner(principal, game.owner_id)
+    return game
+
+
+def check_version(game: Any, version: Optional[int]) -> None:
+    """
+    Reject a move made on a `version` of the game other than the current one.
+    """
+    if version is not None and version != game.version:
+        raise HTTPException(status_code=409, detail="CardGame was modified")
+
+
+def batch_owner_ids(
+    batch_in: schemas.CardGameBatchCreate, principal: schemas.UserPrincipal
+) -> List[int]:
+    """
+    The owner of each game of `batch_in`, by default `principal`. Only
+    superusers may create games for other users.
+    """
+    owner_ids = batch_in.owner_ids or [principal.id]
+    if not crud.user.is_superuser(principal) and set(owner_ids) != {principal.id}:
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    if batch_in.count * len(owner_ids) > settings.GAME_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.GAME_BATCH_MAX_SIZE} games per batch",
+        )
+    return [id for id in owner_ids for _ in range(batch_in.count)]
+
+
+def check_replay(
+    game: Optional[Any], principal: schemas.UserPrincipal, *, seq: int
+) -> Any:
+    """
+    `game` if its state after move `seq` may be shown to `principal`: it
+    shows the whole layout, so players only get it for their finished games.
+    """
+    if not game:
+        raise HTTPException(status_code=404, detail="CardGame not found")
+    if not crud.user.is_superuser(principal) and (
+        game.owner_id != principal.id or not game.game_state.is_game_end()
+    ):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    if not 0 <= seq <= game.open_count:
+        raise HTTPException(status_code=404, detail="Move not found")
+    return game
+
+
+@contextmanager
+def move_errors() -> Iterator[None]:
+    """
+    Answer a card position out of range with 400, and a move on a game
+    changed concurrently with 409.
+    """
+    try:
+        yield
+    except IndexError:
+        raise HTTPException(status_code=400, detail="Card position out of range")
+    except (SessionClosed, StaleDataError):
+        raise HTTPException(
+            status_code=409, detail="CardGame was modified concurrently"
+        )
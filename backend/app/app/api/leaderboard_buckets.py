@@ -0,0 +1,40 @@
+import asyncio
+import logging
+
+from starlette.concurrency import run_in_threadpool
+
+from app import crud
+from app.core.config import settings
+from app.db.async_session import get_database
+from app.db.session import SessionLocal
+
+# Dropping the expired daily and weekly leaderboard buckets in the background,
+# with the database layer picked by `settings.ASYNC_DB_ENABLED`.
+
+logger = logging.getLogger(__name__)
+
+
+def drop_expired_buckets_sync() -> int:
+    db = SessionLocal()
+    try:
+        return crud.best_score.drop_expired_buckets(db)
+    finally:
+        db.close()
+
+
+async def drop_expired_buckets() -> None:
+    if settings.ASYNC_DB_ENABLED:
+        dropped = await crud.async_best_score.drop_expired_buckets(get_database())
+    else:
+        dropped = await run_in_threadpool(drop_expired_buckets_sync)
+    if dropped:
+        logger.info("Dropped %s expired leaderboard scores", dropped)
+
+
+async def drop_expired_buckets_forever() -> None:
+    while True:
+        try:
+            await drop_expired_buckets()
+        except Exception:
+            logger.exception("Dropping expired leaderboard buckets failed")
+        await asyncio.sleep(settings.LEADERBOARD_COMPACT_SECONDS)
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+from typing import AsyncIterator, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from app import crud
+from app.core import serialize
+from app.core.broadcast import Broadcaster
+from app.core.config import settings
+from app.core.leaderboard import (
+    NOTIFY_CHANNEL,
+    PERIODS,
+    RELOAD_PAYLOAD,
+    decode_score_updates,
+    leaderboards,
+    publish_scores,
+    worker_id,
+)
+from app.db.async_session import get_database
+from app.db.listen import NotificationListener
+from app.db.session import SessionLocal
+
+# Server-sent events of the leaderboards. Each change of one of this worker's
+# leaderboards, by its own game ends or, with the "postgres"
+# `settings.LEADERBOARD_EVENTS_BACKEND`, by those NOTIFYed by other workers,
+# wakes the streams of that period through its broadcaster.
+
+logger = logging.getLogger(__name__)
+
+
+def _broadcaster(period: str) -> Broadcaster:
+    broadcaster = Broadcaster(interval=settings.LEADERBOARD_EVENTS_INTERVAL)
+    leaderboards[period].add_listener(broadcaster.notify)
+    return broadcaster
+
+
+broadcasters = {period: _broadcaster(period) for period in PERIODS}
+
+_tasks: List["asyncio.Future[None]"] = []
+_listener: Optional[NotificationListener] = None
+
+
+def _refresh_leaderboard_sync(period: str, *, load: bool) -> None:
+    db = SessionLocal()
+    try:
+        if load:
+            crud.best_score.load_leaderboard(db, period=period)
+        else:
+            crud.best_score.refresh_leaderboard(db, period=period)
+    finally:
+        db.close()
+
+
+async def load_leaderboard(period: str) -> None:
+    if settings.ASYNC_DB_ENABLED:
+        await crud.async_best_score.load_leaderboard(get_database(), period=period)
+    elif leaderboards[period].needs_load():
+        await run_in_threadpool(_refresh_leaderboard_sync, period, load=True)
+
+
+async def refresh_leaderboard(period: str) -> None:
+    if settings.ASYNC_DB_ENABLED:
+        await crud.async_best_score.refresh_leaderboard(get_database(), period=period)
+    elif leaderboards[period].needs_reload():
+        await run_in_threadpool(_refresh_leaderboard_sync, period, load=False)
+
+
+async def refresh_leaderboards() -> None:
+    """
+    Reload the leaderboards served since startup when they are due, so that
+    requests don't wait for it. While the NOTIFY listener is connected, the
+    other workers' game ends are applied as they come: only the leaderboards
+    of a past day or week, or expired by a reconnect or a recompute, are
+    reloaded. Otherwise each is also reloaded every
+    `settings.LEADERBOARD_RELOAD_SECONDS`.
+    """
+    listening = _listener is not None and _listener.listening
+    for period, board in leaderboards.items():
+        if not board.was_loaded():
+            continue
+        try:
+            if listening:
+                await load_leaderboard(period)
+            else:
+                await refresh_leaderboard(period)
+        except Exception:
+            logger.exception("Reloading the %s leaderboard failed", period)
+
+
+async def refresh_leaderboards_forever() -> None:
+    while True:
+        await asyncio.sleep(settings.LEADERBOARD_RELOAD_SECONDS / 2)
+        await refresh_leaderboards()
+
+
+def apply_notification(payload: str) -> None:
+    if payload == RELOAD_PAYLOAD:
+        _expire_leaderboards()
+        return
+    sender, updates = decode_score_updates(payload)
+    # This worker's own game ends were published on commit
+    if sender != worker_id():
+        publish_scores(updates)
+
+
+def _expire_leaderboards() -> None:
+    for board in leaderboards.values():
+        board.expire()
+
+
+def start_leaderboard_events() -> None:
+    global _listener
+    _tasks.extend(broadcaster.start() for broadcaster in broadcasters.values())
+    _tasks.append(asyncio.ensure_future(refresh_leaderboards_forever()))
+    if settings.LEADERBOARD_EVENTS_BACKEND == "postgres":
+        _listener = NotificationListener(
+            str(settings.SQLALCHEMY_DATABASE_URI),
+            NOTIFY_CHANNEL,
+            apply_notification,
+            on_listen=_expire_leaderboards,
+        )
+        _listener.start()
+
+
+def stop_leaderboard_events() -> None:
+    global _listener
+    for task in _tasks:
+        task.cancel()
+    _tasks.clear()
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _event(name: str, data: bytes) -> bytes:
+    return b"event: %s\ndata: %s\n\n" % (name.encode(), data)
+
+
+async def stream_events(
+    request: Request, *, period: str, top: int, user_id: Optional[int]
+) -> AsyncIterator[bytes]:
+    """
+    A `top` event with the first `top` scores of the `period` leaderboard
+    and, for a `user_id`, a `rank` event with that user's score (`null`
+    without one): first the current ones, then each time they change.
+    Comments keep an idle stream open.
+    """
+    board, broadcaster = leaderboards[period], broadcasters[period]
+    sent_top: Optional[bytes] = None
+    sent_rank: Optional[bytes] = None
+    broadcaster.subscribers += 1
+    try:
+        while not await request.is_disconnected():
+            # Taken before reading, a change made meanwhile wakes us up again
+            published = broadcaster.published
+            top_body = board.rendered_page(limit=top).body
+            if top_body != sent_top:
+                sent_top = top_body
+                yield _event("top", top_body)
+            if user_id is not None:
+                entry = board.get(user_id)
+                rank_body = b"null"
+                if entry is not None:
+                    rank_body = serialize.ranked_best_score(entry)
+                if rank_body != sent_rank:
+                    sent_rank = rank_body
+                    yield _event("rank", rank_body)
+            try:
+                await asyncio.wait_for(
+                    published.wait(), settings.LEADERBOARD_EVENTS_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+    finally:
+        broadcaster.subscribers -= 1
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import secrets
+import threading
+import time
+from typing import Any, Callable, Iterable, List, Optional
+
+from fastapi.routing import APIRoute
+from starlette.routing import request_response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.query_budget import get_query_budget
+from app.core.metrics import prometheus_histogram, prometheus_sample
+from app.core.profiling import (
+    RequestProfile,
+    RouteMetrics,
+    StackSampler,
+    current_profile,
+    start_profile,
+    stop_profile,
+)
+from app.db.pool import stats as pool_stats
+
+# Request instrumentation, only installed by `app.main` when
+# `settings.PROFILING_ENABLED` is set.
+
+logger = logging.getLogger(__name__)
+
+route_metrics = RouteMetrics()
+
+PROFILE_HEADER = b"x-profile"
+
+
+def _timed_endpoint(
+    route: str, query_budget: Optional[int], call: Callable
+) -> Callable:
+    # The `handler` phase, and its end from which `serialization` is timed
+    def started() -> Optional[RequestProfile]:
+        profile = current_profile()
+        if profile is not None:
+            profile.route = route
+            profile.query_budget = query_budget
+        return profile
+
+    def finished(profile: Optional[RequestProfile], start: float) -> None:
+        if profile is not None:
+            profile.handler_end = time.perf_counter()
+            profile.add("handler", profile.handler_end - start)
+
+    if asyncio.iscoroutinefunction(call):
+
+        async def timed_async(**values: Any) -> Any:
+            profile, start = started(), time.perf_counter()
+            try:
+                return await call(**values)
+            finally:
+                finished(profile, start)
+
+        return timed_async
+
+    def timed(**values: Any) -> Any:
+        profile, start = started(), time.perf_counter()
+        try:
+            return call(**values)
+        finally:
+            finished(profile, start)
+
+    return timed
+
+
+def instrument_routes(routes: Iterable[Any]) -> None:
+    """
+    Time the endpoints of `routes` and label their requests with the path
+    template. Call once all routers are included.
+    """
+    for route in routes:
+        if isinstance(route, APIRoute):
+            route.dependant.call = _timed_endpoint(
+                route.path, get_query_budget(route.endpoint), route.dependant.call
+            )
+            route.app = request_response(route.get_route_handler())
+
+
+def _server_timing(profile: RequestProfile) -> bytes:
+    timings = [
+        f"{name};dur={seconds * 1000:.3f}" for name, seconds in profile.phases.items()
+    ]
+    timings.append(f"total;dur={(time.perf_counter() - profile.start) * 1000:.3f}")
+    return ", ".join(timings).encode("latin-1")
+
+
+class ProfilingMiddleware:
+    """
+    Profile every HTTP request into `route_metrics` and return its phases in
+    a `Server-Timing` header. Requests running more statements than the
+    `query_budget` of their endpoint are logged.
+
+    A request with the header `X-Profile: <sampler_token>` is also sampled by
+    a `StackSampler` and answered with the folded stacks as text, its own
+    status in `X-Profile-Status`. Streamed responses are passed through
+    unsampled instead. One request per worker is sampled at a time, others
+    sent meanwhile are served as usual.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        sampler_token: Optional[str] = None,
+        sample_interval: float = 0.001,
+    ) -> None:
+        self.app = app
+        self.sampler_token = sampler_token
+        self.sample_interval = sample_interval
+        self._sampling = threading.Lock()
+
+    def _sample_requested(self, scope: Scope) -> bool:
+        if not self.sampler_token:
+            return False
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return secrets.compare_digest(
+                    value, self.sampler_token.encode("latin-1")
+                )
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        sampled = self._sample_requested(scope) and self._sampling.acquire(
+            blocking=False
+        )
+        profile, token = start_profile()
+        status = 500
+
+        async def send_timed(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profile.handler_end is not None:
+                    profile.add(
+                        "serialization", time.perf_counter() - profile.handler_end
+                    )
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"server-timing", _server_timing(profile)),
+                    ],
+                }
+            await send(message)
+
+        try:
+            if sampled:
+                await self._sample(scope, receive, send_timed)
+            else:
+                await self.app(scope, receive, send_timed)
+        finally:
+            if sampled:
+                self._sampling.release()
+            stop_profile(token)
+            route_metrics.record(
+                scope["method"], status, profile, time.perf_counter() - profile.start
+            )
+            if profile.over_budget:
+                logger.warning(
+                    "%s %s ran %s SQL statements, over its budget of %s",
+                    scope["method"],
+                    profile.route,
+                    profile.statements,
+                    profile.query_budget,
+                )
+
+    async def _sample(self, scope: Scope, receive: Receive, send: Send) -> None:
+        messages: List[Message] = []
+        streaming = False
+
+        async def buffer(message: Message) -> None:
+            nonlocal streaming
+            if message["type"] == "http.response.start" and _is_streamed(message):
+                # Sent as it comes instead of waiting for a stream to end
+                streaming = True
+                sampler.stop()
+            if streaming:
+                await send(message)
+            else:
+                messages.append(message)
+
+        with StackSampler(interval=self.sample_interval) as sampler:
+            await self.app(scope, receive, buffer)
+        if streaming:
+            return
+        start = messages[0]
+        headers = [
+            (name, value)
+            for name, value in start.get("headers", [])
+            if name == b"server-timing"
+        ]
+        body = sampler.folded().encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    *headers,
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"x-profile-status", str(start["status"]).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+def _is_streamed(start: Message) -> bool:
+    # Responses without a length (`StreamingResponse`) or event streams
+    headers = dict(start.get("headers", []))
+    return b"content-length" not in headers or headers.get(
+        b"content-type", b""
+    ).startswith(b"text/event-stream")
+
+
+def bearer_token_matches(authorization: Optional[str], token: str) -> bool:
+    """
+    Whether an `Authorization: Bearer <token>` header carries `token`.
+    """
+    if not authorization:
+        return False
+    scheme, _, credentials = authorization.partition(" ")
+    return scheme.lower() == "bearer" and secrets.compare_digest(
+        credentials.encode("latin-1"), token.encode("latin-1")
+    )
+
+
+def prometheus_text() -> str:
+    """
+    `route_metrics` and the connection pool statistics of this worker in the
+    Prometheus text format.
+    """
+    lines = route_metrics.prometheus()
+    lines.append("# TYPE db_pool_wait_seconds histogram")
+    lines += prometheus_histogram("db_pool_wait_seconds", pool_stats.wait_time, {})
+    lines.append("# TYPE db_pool_checkout_seconds histogram")
+    lines += prometheus_histogram(
+        "db_pool_checkout_seconds", pool_stats.checkout_latency, {}
+    )
+    lines.append("# TYPE db_pool_timeouts_total counter")
+    lines.append(prometheus_sample("db_pool_timeouts_total", pool_stats.timeouts, {}))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,66 @@
+from typing import Any, Callable, List, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+Endpoint = TypeVar("Endpoint", bound=Callable[..., Any])
+
+QUERY_BUDGET_ATTRIBUTE = "query_budget"
+
+
+def query_budget(statements: int) -> Callable[[Endpoint], Endpoint]:
+    """
+    Declare the most SQL statements one request to the decorated endpoint may
+    run, the auth lookup included. Goes below the route decorator:
+
+        @router.get("/{id}")
+        @query_budget(2)
+        def read_item(...): ...
+
+    The endpoint itself is left as is. The `query_budget` test fixture holds
+    it to the budget, and with `PROFILING_ENABLED` requests over it are
+    logged.
+    """
+
+    def declare(endpoint: Endpoint) -> Endpoint:
+        setattr(endpoint, QUERY_BUDGET_ATTRIBUTE, statements)
+        return endpoint
+
+    return declare
+
+
+def get_query_budget(endpoint: Callable[..., Any]) -> Optional[int]:
+    return getattr(endpoint, QUERY_BUDGET_ATTRIBUTE, None)
+
+
+class StatementCounter:
+    """
+    Records the statements `engine` runs while the counter is entered, from
+    any thread.
+    """
+
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _record(
+        self,
+        conn: Any,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        self.statements.append(statement)
+
+    def __enter__(self) -> "StatementCounter":
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._record)
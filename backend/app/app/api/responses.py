@@ -0,0 +1,93 @@
+from typing import Any, Iterable, Mapping, Optional
+
+from starlette.responses import Response
+
+from app.api.deps import DELTA_MEDIA_TYPE
+from app.core import profiling, serialize
+from app.core.active_games import active_games
+from app.core.game_session import GameSession
+from app.core.game_state import GameState
+from app.core.leaderboard import Cursor, Leaderboard, RankedEntry
+
+# Responses of the hot endpoints, rendered by `app.core.serialize`. Returning
+# a `Response` skips FastAPI's validation of the return value against the
+# route's `response_model`, which stays declared for the OpenAPI schema.
+
+
+class TrustedJSONResponse(Response):
+    """
+    JSON that is already rendered, sent as is.
+    """
+
+    media_type = "application/json"
+
+
+def card_game(game: Any) -> Response:
+    """
+    A `models.CardGame` row as `schemas.CardGame`.
+    """
+    with profiling.phase("serialization"):
+        return TrustedJSONResponse(serialize.card_game(game, game.game_state))
+
+
+def card_games(games: Iterable[Any]) -> Response:
+    with profiling.phase("serialization"):
+        return TrustedJSONResponse(serialize.card_games(games))
+
+
+def active_card_game(session: GameSession) -> Response:
+    """
+    A game kept in memory as `schemas.CardGame`.
+    """
+    with profiling.phase("serialization"):
+        return TrustedJSONResponse(active_games.render_card_game(session))
+
+
+def card_game_delta(delta: Mapping[str, Any]) -> Response:
+    with profiling.phase("serialization"):
+        return TrustedJSONResponse(
+            serialize.card_game_delta(delta), media_type=DELTA_MEDIA_TYPE
+        )
+
+
+def opened_card(
+    game: Any, before: GameState, position: int, *, delta: bool
+) -> Response:
+    """
+    The `open_card` response for a `models.CardGame` row after its move at
+    `position`, only the cards it turned over with `delta`.
+    """
+    if delta:
+        return card_game_delta(
+            {
+                "id": game.id,
+                "version": game.version,
+                "open_count": game.open_count,
+                **game.game_state.move_delta(before, position),
+            }
+        )
+    return card_game(game)
+
+
+def ranked_best_score(entry: RankedEntry) -> Response:
+    with profiling.phase("serialization"):
+        return TrustedJSONResponse(serialize.ranked_best_score(entry))
+
+
+def ranked_best_scores(entries: Iterable[RankedEntry]) -> Response:
+    with profiling.phase("serialization"):
+        return TrustedJSONResponse(serialize.ranked_best_scores(entries))
+
+
+def leaderboard_page(
+    board: Leaderboard, *, after: Optional[Cursor], limit: int
+) -> Response:
+    """
+    A page of `board`, with an `X-Next-Cursor` header if it is full.
+    """
+    with profiling.phase("serialization"):
+        page = board.rendered_page(after=after, limit=limit)
+        response = TrustedJSONResponse(page.body)
+    if page.next_cursor is not None:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return response
@@ -0,0 +1,191 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core import serialize
+from app.core.config import settings
+from app.core.game_session import GameSession, SessionSnapshot
+from app.core.move_journal import MoveJournal
+
+
+class SessionClosed(Exception):
+    """
+    The session was evicted or discarded, reload the game.
+    """
+
+
+class ActiveGameStore:
+    """
+    Games being played, kept in memory as `GameSession`s of this worker
+    process and written back to the database behind the moves.
+
+    A move claims a save (a `SessionSnapshot`) every `save_moves` moves and
+    at the game end; `claim_idle` claims the rest once a game has been idle
+    for `idle_seconds`, and evicts saved idle games. At most one save of a
+    session is in flight. Moves are appended to `journal` before they are
+    acknowledged, if there is one (claimed by the worker at startup).
+
+    Applying a move holds the store lock for a few microseconds, plus the
+    journal write; saves and journal compaction run without it. Async code
+    runs the journal I/O in a thread (`app.api.active_games`).
+    """
+
+    def __init__(
+        self,
+        *,
+        save_moves: int,
+        idle_seconds: float,
+        journal: Optional[MoveJournal] = None,
+        journal_compact_bytes: int = 1 << 20,
+    ) -> None:
+        self.save_moves = save_moves
+        self.idle_seconds = idle_seconds
+        self.journal = journal
+        self.journal_compact_bytes = journal_compact_bytes
+        self._sessions: Dict[int, GameSession] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, id: int) -> Optional[GameSession]:
+        return self._sessions.get(id)
+
+    def add(self, session: GameSession) -> GameSession:
+        """
+        Start keeping `session`, or return the one added meanwhile.
+        """
+        with self._lock:
+            return self._sessions.setdefault(session.id, session)
+
+    def _claim_save(
+        self, session: GameSession, *, force: bool = False
+    ) -> Optional[SessionSnapshot]:
+        if session.saving or session.closed or not session.unsaved_moves:
+            return None
+        if (
+            force
+            or session.end_open_count is not None
+            or session.unsaved_moves >= self.save_moves
+        ):
+            session.saving = True
+            return session.snapshot()
+        return None
+
+    def open_card(
+        self, session: GameSession, position: int
+    ) -> Tuple[Dict[str, Any], Optional[SessionSnapshot]]:
+        """
+        Apply a move, returning its `GameSession.open_card` delta and the
+        snapshot to save if the move claimed one.
+        """
+        with self._lock:
+            if session.closed:
+                raise SessionClosed()
+            game_delta = session.open_card(position)
+            if self.journal is not None:
+                self.journal.append(session.id, session.version, position)
+            session.touched_at = time.monotonic()
+            return game_delta, self._claim_save(session)
+
+    def render_card_game(self, session: GameSession) -> bytes:
+        """
+        `session` as `schemas.CardGame` JSON, rendered while no move is
+        applied to it.
+        """
+        with self._lock:
+            return serialize.card_game(session, session.state)
+
+    def claim_save(self, session: GameSession) -> Optional[SessionSnapshot]:
+        """
+        Claim a save of all unsaved moves, `None` if there are none or a save
+        is already in flight.
+        """
+        with self._lock:
+            return self._claim_save(session, force=True)
+
+    def saved(
+        self, session: GameSession, snapshot: SessionSnapshot
+    ) -> Optional[SessionSnapshot]:
+        """
+        Record a finished save, returning the next one to run if moves made
+        meanwhile already call for it.
+        """
+        with self._lock:
+            session.mark_saved(snapshot)
+            session.saving = False
+            return self._claim_save(session)
+
+    def abort_save(self, session: GameSession) -> None:
+        with self._lock:
+            session.saving = False
+
+    def discard(self, session: GameSession) -> None:
+        """
+        Drop a session whose game was changed elsewhere, with its unsaved
+        moves.
+        """
+        with self._lock:
+            session.closed = True
+            session.saving = False
+            if self._sessions.get(session.id) is session:
+                del self._sessions[session.id]
+            if self.journal is not None:
+                self.journal.discard(session.id, session.version)
+
+    def claim_idle(
+        self, *, idle_seconds: Optional[float] = None
+    ) -> List[Tuple[GameSession, SessionSnapshot]]:
+        """
+        Claim saves of the games idle for `idle_seconds` (default
+        `self.idle_seconds`), evicting those with nothing left to save.
+        """
+        idle_seconds = self.idle_seconds if idle_seconds is None else idle_seconds
+        idle_since = time.monotonic() - idle_seconds
+        claims = []
+        with self._lock:
+            for session in list(self._sessions.values()):
+                if session.touched_at > idle_since or session.saving:
+                    continue
+                snapshot = self._claim_save(session, force=True)
+                if snapshot is not None:
+                    claims.append((session, snapshot))
+                else:
+                    session.closed = True
+                    del self._sessions[session.id]
+        return claims
+
+    def saved_versions(self) -> Dict[int, int]:
+        """
+        Saved version of each game kept, the journaled moves up to it are
+        stored.
+        """
+        with self._lock:
+            return self._saved_versions()
+
+    def _saved_versions(self) -> Dict[int, int]:
+        return {id: session.saved_version for id, session in self._sessions.items()}
+
+    def compact_journal(self, *, force: bool = False) -> None:
+        """
+        Drop the saved moves from the journal once it outgrows
+        `journal_compact_bytes`, or at once with `force`.
+        """
+        if self.journal is None:
+            return
+        if not force and self.journal.size() < self.journal_compact_bytes:
+            return
+        # Moves are journaled under the store lock, so the saved versions hold
+        # for the journal up to its size read with them. The rewrite runs
+        # without the lock and keeps whatever is appended meanwhile
+        with self._lock:
+            saved_versions = self._saved_versions()
+            end = self.journal.size()
+        self.journal.compact(saved_versions, end=end)
+
+
+active_games = ActiveGameStore(
+    save_moves=settings.GAME_SESSION_SAVE_MOVES,
+    idle_seconds=settings.GAME_SESSION_IDLE_SECONDS,
+    journal_compact_bytes=settings.GAME_JOURNAL_COMPACT_BYTES,
+)
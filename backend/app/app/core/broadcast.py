@@ -0,0 +1,60 @@
+import asyncio
+from typing import Optional
+
+
+class Broadcaster:
+    """
+    Wakes any number of subscribers of one event loop after changes, at most
+    once per `interval` seconds: a burst of changes is coalesced into a single
+    wake-up, and subscribers then read the current state themselves.
+
+    `notify` may be called from any thread. A subscriber takes `published`,
+    reads the state, then waits for that event, so a change made in between
+    is never missed. Nothing is published until `start` is called from the
+    event loop.
+    """
+
+    def __init__(self, *, interval: float) -> None:
+        self.interval = interval
+        self.subscribers = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._published: Optional[asyncio.Event] = None
+
+    @property
+    def published(self) -> asyncio.Event:
+        """
+        Set by the next publication.
+        """
+        if self._published is None:
+            raise RuntimeError("Broadcaster is not started")
+        return self._published
+
+    def start(self) -> "asyncio.Future[None]":
+        self._loop = asyncio.get_event_loop()
+        self._changed = asyncio.Event()
+        self._published = asyncio.Event()
+        return asyncio.ensure_future(self._run())
+
+    def notify(self) -> None:
+        loop, changed = self._loop, self._changed
+        if loop is None or changed is None:
+            return
+        try:
+            loop.call_soon_threadsafe(changed.set)
+        except RuntimeError:
+            # The loop is closed, the worker is shutting down
+            pass
+
+    def _publish(self) -> None:
+        published, self._published = self._published, asyncio.Event()
+        if published is not None:
+            published.set()
+
+    async def _run(self) -> None:
+        assert self._changed is not None
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            self._publish()
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,189 @@
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - only needed for the "redis" backend
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class CacheUnavailable(Exception):
+    """
+    Raised by a strict cache when its server can't be reached.
+    """
+
+
+class Cache(ABC):
+    """
+    Small key/value cache interface shared by the in-process and Redis
+    backends. `get` returns `None` on a miss, values must be JSON-serializable.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Any: ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None: ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+
+class NullCache(Cache):
+    def get(self, key: str) -> Any:
+        return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        pass
+
+    def delete(self, key: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+class MemoryCache(Cache):
+    """
+    Thread-safe LRU cache of at most `max_size` entries, each expiring `ttl`
+    seconds after it was set. Entries are private to the worker process.
+
+    With no `max_size` nothing is evicted before it expires: expired entries
+    are swept whenever the cache has doubled since the last sweep.
+    """
+
+    def __init__(self, *, ttl: float, max_size: Optional[int]) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sweep_size = 1024
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            if self.max_size is None:
+                if len(self._data) >= self._sweep_size:
+                    self._sweep()
+                return
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def _sweep(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, (expires, _) in self._data.items() if expires <= now]:
+            del self._data[key]
+        self._sweep_size = max(1024, len(self._data) * 2)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache(Cache):
+    """
+    Cache shared by all workers through a Redis-compatible server at `url`.
+
+    Keys are prefixed with `namespace`, eviction is left to the server
+    (`maxmemory-policy allkeys-lru`). A server error is logged and behaves like
+    a miss, so requests fall back to the database instead of failing. A
+    `strict` cache raises `CacheUnavailable` instead, for data that must not
+    silently go missing.
+    """
+
+    def __init__(
+        self, url: str, *, namespace: str, ttl: float, strict: bool = False
+    ) -> None:
+        if redis is None:
+            raise RuntimeError("The redis cache backend needs the redis package")
+        self.namespace = namespace
+        self.ttl = ttl
+        self.strict = strict
+        self._client = redis.Redis.from_url(url)
+
+    def _failed(self, action: str, key: str) -> None:
+        if self.strict:
+            raise CacheUnavailable(f"Cache {action} of {key} failed")
+        logger.warning("Cache %s of %s failed", action, key, exc_info=True)
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str) -> Any:
+        try:
+            raw = self._client.get(self._key(key))
+        except redis.RedisError:
+            self._failed("read", key)
+            return None
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl_ms = int((self.ttl if ttl is None else ttl) * 1000)
+        try:
+            self._client.set(self._key(key), json.dumps(value), px=ttl_ms)
+        except redis.RedisError:
+            self._failed("write", key)
+
+    def delete(self, key: str) -> None:
+        try:
+            self._client.delete(self._key(key))
+        except redis.RedisError:
+            self._failed("delete", key)
+
+    def clear(self) -> None:
+        try:
+            keys = list(self._client.scan_iter(match=self._key("*")))
+            if keys:
+                self._client.delete(*keys)
+        except redis.RedisError:
+            self._failed("clear", "*")
+
+
+def build_cache(
+    backend: str,
+    *,
+    namespace: str,
+    ttl: float,
+    max_size: Optional[int],
+    url: Optional[str],
+    strict: bool = False,
+) -> Cache:
+    if backend == "none":
+        return NullCache()
+    if backend == "memory":
+        return MemoryCache(ttl=ttl, max_size=max_size)
+    if backend == "redis":
+        assert url, "The redis cache backend needs a url"
+        return RedisCache(url, namespace=namespace, ttl=ttl, strict=strict)
+    raise ValueError(f"Unknown cache backend {backend}")
@@ -1,3 +1,4 @@
+import os
 import secrets
 from typing import Any, Dict, List, Optional, Union
 
@@ -7,6 +8,34 @@ from pydantic import AnyHttpUrl, BaseSettings, EmailStr, HttpUrl, PostgresDsn, v
 class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     GAME_SIZE: int = 6
+    # Seed for reproducible decks; unset deals from the OS CSPRNG
+    GAME_SHUFFLE_SEED: Optional[int] = None
+    # Shuffled decks kept ready for new games (0 shuffles on each create)
+    DECK_POOL_SIZE: int = 1000
+    # Most games one POST /games/batch may create
+    GAME_BATCH_MAX_SIZE: int = 5000
+    # Games being played are kept in memory (app.core.active_games) and their
+    # moves written to the database every GAME_SESSION_SAVE_MOVES moves, at
+    # the game end and after GAME_SESSION_IDLE_SECONDS without a move.
+    # WebSocket sessions always play this way, GAME_WRITE_BEHIND_ENABLED does
+    # it for POST /open_card too. Games are kept per worker process, so
+    # write-behind needs one worker or requests of a game routed to one worker
+    GAME_SESSION_SAVE_MOVES: int = 16
+    GAME_SESSION_IDLE_SECONDS: float = 60.0
+    GAME_WRITE_BEHIND_ENABLED: bool = False
+    # Append-only journal of the moves kept in memory, replayed at startup to
+    # recover them after a crash; unset keeps them only in memory. Each worker
+    # process locks its own GAME_JOURNAL_PATH.<n> file. GAME_JOURNAL_FSYNC
+    # flushes each move to disk, which survives a power loss too. The saved
+    # moves are dropped from the file once it outgrows GAME_JOURNAL_COMPACT_BYTES
+    GAME_JOURNAL_PATH: Optional[str] = None
+    GAME_JOURNAL_FSYNC: bool = False
+    GAME_JOURNAL_COMPACT_BYTES: int = 1 << 20
+    # Log every move to the cardmove table, in the transaction that stores it,
+    # and keep the packed state every GAME_SNAPSHOT_MOVES moves so replaying
+    # a game to any move reads at most that many moves
+    GAME_MOVE_LOG_ENABLED: bool = True
+    GAME_SNAPSHOT_MOVES: int = 64
     SECRET_KEY: str = secrets.token_urlsafe(32)
     # 60 minutes * 24 hours * 8 days = 8 days
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
@@ -17,6 +46,13 @@ class Settings(BaseSettings):
     # "http://localhost:8080", "http://local.dockertoolbox.tiangolo.com"]'
     BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = []
 
+    @validator("GAME_SIZE")
+    def check_game_size(cls, v: int) -> int:
+        # Positions and displays are encoded as uint16 in the game state
+        if not 1 <= v <= 0xFFFF // 2:
+            raise ValueError("GAME_SIZE must be between 1 and 32767")
+        return v
+
     @validator("BACKEND_CORS_ORIGINS", pre=True)
     def assemble_cors_origins(cls, v: Union[str, List[str]]) -> Union[List[str], str]:
         if isinstance(v, str) and not v.startswith("["):
@@ -52,6 +88,152 @@ class Settings(BaseSettings):
             path=f"/{values.get('POSTGRES_DB') or ''}",
         )
 
+    # Connection pool of each worker process. Keep
+    # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) below Postgres max_connections
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    # Seconds before a connection is replaced, -1 keeps connections forever
+    DB_POOL_RECYCLE: int = 1800
+    # Liveness check on checkout: "always" pings every checkout, "idle" only
+    # connections unused for DB_POOL_PING_IDLE_SECONDS, "never" skips it
+    DB_POOL_PRE_PING: str = "idle"
+    DB_POOL_PING_IDLE_SECONDS: float = 30.0
+
+    @validator("DB_POOL_PRE_PING")
+    def check_pre_ping_strategy(cls, v: str) -> str:
+        if v not in ("always", "idle", "never"):
+            raise ValueError("DB_POOL_PRE_PING must be always, idle or never")
+        return v
+
+    # Serve the game and best score endpoints from the async database layer
+    # (app.db.async_session) instead of the threadpool and SessionLocal
+    ASYNC_DB_ENABLED: bool = False
+    ASYNC_DB_POOL_MIN_SIZE: int = 5
+    ASYNC_DB_POOL_MAX_SIZE: int = 20
+
+    # Cache of the (id, is_active, is_superuser) principal behind each token.
+    # "memory" is per worker process, so a change made through another worker
+    # is only seen after USER_CACHE_TTL_SECONDS; "redis" shares the cache
+    # through USER_CACHE_URL (e.g. redis://localhost:6379/0); "none" reads the
+    # user on every request
+    USER_CACHE_BACKEND: str = "memory"
+    USER_CACHE_URL: Optional[str] = None
+    USER_CACHE_TTL_SECONDS: float = 60.0
+    USER_CACHE_MAX_SIZE: int = 10000
+
+    @validator("USER_CACHE_BACKEND")
+    def check_user_cache_backend(cls, v: str) -> str:
+        if v not in ("memory", "redis", "none"):
+            raise ValueError("USER_CACHE_BACKEND must be memory, redis or none")
+        return v
+
+    @validator("USER_CACHE_URL")
+    def check_user_cache_url(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
+        if values.get("USER_CACHE_BACKEND") == "redis" and not v:
+            raise ValueError("USER_CACHE_URL is required by the redis backend")
+        return v
+
+    # Verified access tokens remembered by each worker, so the signature and
+    # claims of a reused token are checked once until it expires (0 checks
+    # them on every request)
+    ACCESS_TOKEN_CACHE_SIZE: int = 10000
+    # Revoked access tokens, until they expire. "memory" keeps them in the
+    # worker process only, lost on restart: for a single development worker;
+    # "redis" shares them through TOKEN_DENYLIST_URL, on a server that must
+    # not evict keys (maxmemory-policy noeviction). Requests are answered 503
+    # while the server is unreachable
+    TOKEN_DENYLIST_BACKEND: str = "memory"
+    TOKEN_DENYLIST_URL: Optional[str] = None
+
+    @validator("TOKEN_DENYLIST_BACKEND")
+    def check_token_denylist_backend(cls, v: str) -> str:
+        if v not in ("memory", "redis"):
+            raise ValueError("TOKEN_DENYLIST_BACKEND must be memory or redis")
+        return v
+
+    @validator("TOKEN_DENYLIST_URL")
+    def check_token_denylist_url(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
+        if values.get("TOKEN_DENYLIST_BACKEND") == "redis" and not v:
+            raise ValueError("TOKEN_DENYLIST_URL is required by the redis backend")
+        return v
+
+    # Issue access tokens carrying the user's is_active and is_superuser, so
+    # endpoints that only need those authorize without a user lookup. A change
+    # of either flag revokes the user's tokens, which every worker must see:
+    # this needs the redis TOKEN_DENYLIST_BACKEND
+    ACCESS_TOKEN_EMBED_PRINCIPAL: bool = False
+
+    @validator("ACCESS_TOKEN_EMBED_PRINCIPAL")
+    def check_embed_principal(cls, v: bool, values: Dict[str, Any]) -> bool:
+        if v and values.get("TOKEN_DENYLIST_BACKEND") != "redis":
+            raise ValueError(
+                "ACCESS_TOKEN_EMBED_PRINCIPAL needs TOKEN_DENYLIST_BACKEND=redis"
+            )
+        return v
+
+    # Seconds before a worker re-reads its in-memory leaderboard from the
+    # bestscore table, in the background, to pick up game ends served by
+    # other workers
+    LEADERBOARD_RELOAD_SECONDS: float = 30.0
+    # Days of daily and weekly leaderboards kept, each API worker drops older
+    # buckets every LEADERBOARD_COMPACT_SECONDS
+    LEADERBOARD_RETENTION_DAYS: int = 28
+    LEADERBOARD_COMPACT_SECONDS: float = 3600.0
+    # Pages of /best_scores/ within the first LEADERBOARD_CACHED_TOP entries
+    # are kept rendered until a score change reaches them
+    LEADERBOARD_CACHED_TOP: int = 1000
+
+    # Server-sent leaderboard events at /best_scores/stream, each stream gets
+    # at most one update every LEADERBOARD_EVENTS_INTERVAL seconds. "postgres"
+    # sends the scores of every game end to all workers with NOTIFY, "local"
+    # only reaches the streams of the worker that served it, the others see
+    # it after their next reload
+    LEADERBOARD_EVENTS_BACKEND: str = "local"
+    LEADERBOARD_EVENTS_INTERVAL: float = 1.0
+    LEADERBOARD_EVENTS_KEEPALIVE_SECONDS: float = 15.0
+
+    @validator("LEADERBOARD_EVENTS_BACKEND")
+    def check_leaderboard_events_backend(cls, v: str) -> str:
+        if v not in ("local", "postgres"):
+            raise ValueError("LEADERBOARD_EVENTS_BACKEND must be local or postgres")
+        return v
+
+    # Per-route latency histograms, an auth / db / commit / handler /
+    # serialization breakdown and SQL statement counts, exported in the
+    # Prometheus format at /metrics to requests with the header
+    # `Authorization: Bearer <PROFILING_METRICS_TOKEN>` (not served without
+    # it); nothing is instrumented when disabled.
+    # With PROFILING_SAMPLER_TOKEN set, a request with the header
+    # `X-Profile: <token>` is answered with the stacks sampled every
+    # PROFILING_SAMPLE_INTERVAL seconds while it ran, in the folded format of
+    # flamegraph.pl, instead of its response
+    PROFILING_ENABLED: bool = False
+    PROFILING_METRICS_TOKEN: Optional[str] = None
+    PROFILING_SAMPLER_TOKEN: Optional[str] = None
+    PROFILING_SAMPLE_INTERVAL: float = 0.001
+
+    # bcrypt work factor, stored hashes with fewer rounds are upgraded on login
+    BCRYPT_ROUNDS: int = 12
+    # Processes hashing passwords for each API worker (default: one per CPU,
+    # 0 hashes in the request thread). Beyond PASSWORD_HASH_QUEUE_DEPTH jobs in
+    # flight requests get 503 with Retry-After: PASSWORD_HASH_RETRY_AFTER
+    PASSWORD_HASH_WORKERS: Optional[int] = None
+    PASSWORD_HASH_QUEUE_DEPTH: int = 64
+    PASSWORD_HASH_RETRY_AFTER: int = 1
+
+    @validator("BCRYPT_ROUNDS")
+    def check_bcrypt_rounds(cls, v: int) -> int:
+        if not 4 <= v <= 31:
+            raise ValueError("BCRYPT_ROUNDS must be between 4 and 31")
+        return v
+
+    @validator("PASSWORD_HASH_WORKERS", pre=True, always=True)
+    def default_password_hash_workers(cls, v: Optional[int]) -> int:
+        if v is None or v == "":
+            return os.cpu_count() or 1
+        return v
+
     SMTP_TLS: bool = True
     SMTP_PORT: Optional[int] = None
     SMTP_HOST: Optional[str] = None
@@ -0,0 +1,87 @@
+import random
+import threading
+from collections import deque
+from typing import Deque, List, Optional
+
+from app.core.config import settings
+from app.core.game_state import GameState
+from app.core.shuffle import default_rng, shuffled_deck
+
+REFILL_BATCH_SIZE = 256
+
+
+def build_decks(
+    count: int, *, game_size: int, rng: random.Random = default_rng
+) -> List[bytes]:
+    """
+    Encoded states of `count` new games with freshly shuffled decks.
+    """
+    return [GameState(shuffled_deck(game_size, rng)).encode() for _ in range(count)]
+
+
+class DeckPool:
+    """
+    Pre-shuffled decks, so creating a game doesn't pay for shuffling.
+
+    A daemon thread tops the pool up to `size` decks whenever `take` leaves
+    it below half full. A `take` larger than the pool builds the missing
+    decks in the calling thread. `size=0` disables the pool.
+    """
+
+    def __init__(
+        self, *, size: int, game_size: int, rng: random.Random = default_rng
+    ) -> None:
+        self.size = size
+        self.game_size = game_size
+        self.rng = rng
+        self._decks: Deque[bytes] = deque()
+        self._lock = threading.Lock()
+        self._refill_needed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._decks)
+
+    def take(self, count: int, *, game_size: Optional[int] = None) -> List[bytes]:
+        """
+        `count` decks of `game_size` pairs. Only decks of the pool's own
+        `game_size` are pooled, other sizes are built in the calling thread.
+        """
+        if game_size is not None and game_size != self.game_size:
+            return build_decks(count, game_size=game_size, rng=self.rng)
+        if not self.size:
+            return build_decks(count, game_size=self.game_size, rng=self.rng)
+        with self._lock:
+            available = min(count, len(self._decks))
+            decks = [self._decks.popleft() for _ in range(available)]
+            if len(self._decks) < self.size // 2:
+                self._start_refill()
+        if available < count:
+            decks += build_decks(
+                count - available, game_size=self.game_size, rng=self.rng
+            )
+        return decks
+
+    def _start_refill(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._refill_forever, name="deck-pool", daemon=True
+            )
+            self._thread.start()
+        self._refill_needed.set()
+
+    def _refill_forever(self) -> None:
+        while True:
+            self._refill_needed.wait()
+            self._refill_needed.clear()
+            self.fill()
+
+    def fill(self) -> None:
+        while len(self._decks) < self.size:
+            missing = min(REFILL_BATCH_SIZE, self.size - len(self._decks))
+            decks = build_decks(missing, game_size=self.game_size, rng=self.rng)
+            with self._lock:
+                self._decks.extend(decks)
+
+
+deck_pool = DeckPool(size=settings.DECK_POOL_SIZE, game_size=settings.GAME_SIZE)
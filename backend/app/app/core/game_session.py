@@ -0,0 +1,163 @@
+import time
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from app.core.game_state import GameState
+from app.core.move_log import MoveRecord
+
+
+class SessionSnapshot(NamedTuple):
+    """
+    What `crud.game.save_session` writes for a `GameSession`, taken while no
+    move is being applied.
+    """
+
+    id: int
+    owner_id: int
+    state: bytes
+    open_count: int
+    is_finished: bool
+    version: int
+    saved_version: int
+    end_open_count: Optional[int]
+    finished_at: Optional[datetime]
+    moves: Tuple[MoveRecord, ...]
+
+
+class GameSession:
+    """
+    Decoded state of one game, kept in memory between moves so a move is only
+    a `GameState` update.
+
+    `version` counts every move, as the HTTP `open_card` does, and
+    `saved_version` is the version of the stored row. The moves in between
+    are written with one UPDATE by `crud.game.save_session`.
+    """
+
+    __slots__ = (
+        "id",
+        "owner_id",
+        "pair_count",
+        "state",
+        "open_count",
+        "version",
+        "saved_version",
+        "end_open_count",
+        "finished_at",
+        "moves",
+        "touched_at",
+        "saving",
+        "closed",
+    )
+
+    def __init__(
+        self,
+        *,
+        id: int,
+        owner_id: int,
+        pair_count: int,
+        state: GameState,
+        open_count: int,
+        version: int,
+    ) -> None:
+        self.id = id
+        self.owner_id = owner_id
+        self.pair_count = pair_count
+        self.state = state
+        self.open_count = open_count
+        self.version = version
+        self.saved_version = version
+        # open_count of a game end that still has to reach the best scores
+        self.end_open_count: Optional[int] = None
+        self.finished_at: Optional[datetime] = None
+        # Unsaved moves, for the `cardmove` log
+        self.moves: List[MoveRecord] = []
+        # Bookkeeping of `ActiveGameStore`
+        self.touched_at = time.monotonic()
+        self.saving = False
+        self.closed = False
+
+    @classmethod
+    def from_model(cls, card_game: Any) -> "GameSession":
+        return cls(
+            id=card_game.id,
+            owner_id=card_game.owner_id,
+            pair_count=card_game.pair_count,
+            state=card_game.game_state,
+            open_count=card_game.open_count,
+            version=card_game.version,
+        )
+
+    @property
+    def unsaved_moves(self) -> int:
+        return self.version - self.saved_version
+
+    @property
+    def total_card(self) -> int:
+        return self.pair_count * 2
+
+    @property
+    def game_info(self) -> Dict[str, Any]:
+        return {**self.state.to_game_info(), "is_game_end": self.state.is_game_end()}
+
+    def open_card(self, position: int) -> Dict[str, Any]:
+        """
+        Apply the move at `position`, returning the `schemas.CardGameDelta`
+        fields. Raises `IndexError` for a position outside the board.
+        """
+        state = self.state
+        if not 0 <= position < state.total_card:
+            raise IndexError(f"Card position {position} is out of range")
+        before = state.copy()
+        result = state.accept_answer_if_in_condition(position)
+        self.open_count += 1
+        self.version += 1
+        now = datetime.utcnow()
+        self.moves.append(MoveRecord(self.id, self.open_count, position, result, now))
+        if not before.is_game_end() and state.is_game_end():
+            self.end_open_count = self.open_count
+            self.finished_at = now
+        return {
+            "id": self.id,
+            "version": self.version,
+            "open_count": self.open_count,
+            **state.move_delta(before, position),
+        }
+
+    def snapshot(self) -> SessionSnapshot:
+        return SessionSnapshot(
+            self.id,
+            self.owner_id,
+            self.state.encode(),
+            self.open_count,
+            self.state.is_game_end(),
+            self.version,
+            self.saved_version,
+            self.end_open_count,
+            self.finished_at,
+            tuple(self.moves),
+        )
+
+    def mark_saved(self, snapshot: SessionSnapshot) -> None:
+        """
+        Record that `snapshot` was written, moves made since stay unsaved.
+        """
+        self.saved_version = snapshot.version
+        del self.moves[: len(snapshot.moves)]
+        if snapshot.end_open_count is not None:
+            self.end_open_count = None
+            self.finished_at = None
+
+    def as_card_game(self) -> Dict[str, Any]:
+        """
+        The game in the `schemas.CardGame` shape.
+        """
+        return {
+            "id": self.id,
+            "owner_id": self.owner_id,
+            "version": self.version,
+            "open_count": self.open_count,
+            "pair_count": self.pair_count,
+            "total_card": self.total_card,
+            "game_info": self.game_info,
+        }
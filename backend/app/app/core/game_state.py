@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import struct
+import sys
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+
+# Binary layout of an encoded game state (all integers little-endian):
+#
+#   version (uint8) | card count (uint16)
+#   | pending position (uint16, 0xFFFF = none) | matched pairs (uint16)
+#   | layout (card count * uint16) | revealed mask | seen mask
+#
+# Both masks are ceil(card count / 8) bytes, bit `position % 8` of byte
+# `position // 8` for each position. `revealed` holds the matched cards,
+# `seen` every card that was ever accepted as an answer (it backs
+# `display_by_answer` in the API response). Version 1 states have no matched
+# pairs field and are still decoded. The pending position used to be written
+# as an int16 -1, the same bytes as the uint16 sentinel.
+STATE_VERSION = 2
+NO_PENDING = -1
+_NO_PENDING_ENCODED = 0xFFFF
+
+# Outcome of a move, as `accept_answer_if_in_condition` reports it
+MOVE_IGNORED = 0  # card already face up
+MOVE_FIRST = 1  # first card of a pair turned up
+MOVE_MATCH = 2  # second card matched the first
+MOVE_MISMATCH = 3  # second card didn't match, the first is turned down
+
+_HEADER = struct.Struct("<BHHH")
+_HEADER_V1 = struct.Struct("<BHH")
+
+
+def _layout_to_bytes(layout: array) -> bytes:
+    if sys.byteorder == "big":
+        layout = array("H", layout)
+        layout.byteswap()
+    return layout.tobytes()
+
+
+def _layout_from_bytes(data: bytes) -> array:
+    layout = array("H")
+    layout.frombytes(data)
+    if sys.byteorder == "big":
+        layout.byteswap()
+    return layout
+
+
+def _mask_size(total_card: int) -> int:
+    return (total_card + 7) // 8
+
+
+def _is_set(mask: bytearray, position: int) -> bool:
+    return bool(mask[position >> 3] >> (position & 7) & 1)
+
+
+def _set(mask: bytearray, position: int) -> None:
+    mask[position >> 3] |= 1 << (position & 7)
+
+
+class GameState:
+    """
+    Fixed-size game state of a card game.
+
+    * `layout`: card display (1..n) at each position
+    * `revealed`: bitmask of matched positions
+    * `seen`: bitmask of positions that were ever accepted as an answer
+    * `pending`: first card of the current pair or `NO_PENDING`
+    * `matched`: number of matched pairs
+
+    Checking and applying a move touches one byte of each mask, so its cost
+    doesn't depend on the board size.
+    """
+
+    __slots__ = ("layout", "revealed", "seen", "pending", "matched")
+
+    def __init__(
+        self,
+        layout: array,
+        *,
+        revealed: Optional[bytearray] = None,
+        seen: Optional[bytearray] = None,
+        pending: int = NO_PENDING,
+        matched: int = 0,
+    ) -> None:
+        mask_size = _mask_size(len(layout))
+        self.layout = layout
+        self.revealed = bytearray(mask_size) if revealed is None else revealed
+        self.seen = bytearray(mask_size) if seen is None else seen
+        self.pending = pending
+        self.matched = matched
+
+    @classmethod
+    def from_displays(cls, displays: Iterable[str]) -> GameState:
+        return cls(array("H", (int(display) for display in displays)))
+
+    @classmethod
+    def from_game_info(cls, game_info: Dict[str, Any]) -> GameState:
+        """
+        Build a state from the legacy `GameInfoInDB` JSON blob.
+        """
+        state = cls.from_displays(game_info["display_by_position"])
+        sequence = game_info["answer_as_position_in_sequence"]
+        if len(sequence) % 2 == 1:
+            state.pending = sequence[-1]
+            _set(state.seen, state.pending)
+            sequence = sequence[:-1]
+        for position in sequence:
+            _set(state.revealed, position)
+            _set(state.seen, position)
+        for position in game_info["display_by_answer"]:
+            _set(state.seen, int(position))
+        state.matched = len(sequence) // 2
+        return state
+
+    def deal(self) -> GameState:
+        """
+        State of the same layout before the first move.
+        """
+        return GameState(array("H", self.layout))
+
+    def copy(self) -> GameState:
+        """
+        Copy to keep across moves, sharing the layout (which moves don't change).
+        """
+        return GameState(
+            self.layout,
+            revealed=bytearray(self.revealed),
+            seen=bytearray(self.seen),
+            pending=self.pending,
+            matched=self.matched,
+        )
+
+    @property
+    def total_card(self) -> int:
+        return len(self.layout)
+
+    def is_face_up(self, position: int) -> bool:
+        return _is_set(self.revealed, position) or position == self.pending
+
+    def should_accept_answer(self, answer_position: int) -> bool:
+        if self.is_game_end() or self.is_face_up(answer_position):
+            return False
+        if self.pending == NO_PENDING:
+            return True
+        return self.layout[self.pending] == self.layout[answer_position]
+
+    def accept_answer_if_in_condition(self, answer_position: int) -> int:
+        """
+        Apply the move at `answer_position`, returning its `MOVE_*` outcome.
+        """
+        if not 0 <= answer_position < self.total_card:
+            raise IndexError(f"Card position {answer_position} is out of range")
+        if self.is_face_up(answer_position):
+            return MOVE_IGNORED
+        if self.should_accept_answer(answer_position):
+            _set(self.seen, answer_position)
+            if self.pending == NO_PENDING:
+                self.pending = answer_position
+                return MOVE_FIRST
+            _set(self.revealed, self.pending)
+            _set(self.revealed, answer_position)
+            self.matched += 1
+            self.pending = NO_PENDING
+            return MOVE_MATCH
+        self.pending = NO_PENDING
+        return MOVE_MISMATCH
+
+    def is_game_end(self) -> bool:
+        return self.matched * 2 == self.total_card
+
+    def move_delta(self, before: GameState, position: int) -> Dict[str, Any]:
+        """
+        Cards turned face up (with their display) and face down by the move at
+        `position` that led from `before` to this state.
+        """
+        revealed = {}
+        if self.is_face_up(position) and not before.is_face_up(position):
+            revealed[position] = str(self.layout[position])
+        hidden = []
+        if before.pending != NO_PENDING and not self.is_face_up(before.pending):
+            hidden.append(before.pending)
+        return {
+            "revealed": revealed,
+            "hidden": hidden,
+            "is_game_end": self.is_game_end(),
+        }
+
+    def answer_sequence(self) -> List[int]:
+        """
+        Face-up positions, matched pairs first (in position order) and the
+        pending card last, as `answer_as_position_in_sequence` used to hold them.
+        """
+        sequence: List[int] = []
+        partner: Dict[int, int] = {}
+        for position, display in enumerate(self.layout):
+            if not _is_set(self.revealed, position):
+                continue
+            first = partner.pop(display, None)
+            if first is None:
+                partner[display] = position
+            else:
+                sequence += [first, position]
+        if self.pending != NO_PENDING:
+            sequence.append(self.pending)
+        return sequence
+
+    def seen_positions(self) -> List[int]:
+        """
+        Positions that were ever accepted as an answer, in order. Bytes of the
+        mask without a seen card are skipped whole.
+        """
+        positions = []
+        for index, byte in enumerate(self.seen):
+            if byte:
+                base = index << 3
+                positions += [base + bit for bit in range(8) if byte >> bit & 1]
+        return positions
+
+    def to_game_info(self) -> Dict[str, Any]:
+        """
+        Render the state in the `GameInfoInDB` shape.
+        """
+        layout = self.layout
+        return {
+            "display_by_position": [str(display) for display in layout],
+            "answer_as_position_in_sequence": self.answer_sequence(),
+            "display_by_answer": {
+                position: str(layout[position]) for position in self.seen_positions()
+            },
+        }
+
+    def encode(self) -> bytes:
+        pending = _NO_PENDING_ENCODED if self.pending == NO_PENDING else self.pending
+        return b"".join(
+            (
+                _HEADER.pack(STATE_VERSION, self.total_card, pending, self.matched),
+                _layout_to_bytes(self.layout),
+                self.revealed,
+                self.seen,
+            )
+        )
+
+    @classmethod
+    def decode(cls, data: bytes) -> GameState:
+        version = data[0]
+        if version == STATE_VERSION:
+            _, total_card, pending, matched = _HEADER.unpack_from(data)
+            header_end = _HEADER.size
+        elif version == 1:
+            _, total_card, pending = _HEADER_V1.unpack_from(data)
+            header_end = _HEADER_V1.size
+            matched = None
+        else:
+            raise ValueError(f"Unsupported game state version {version}")
+        if pending == _NO_PENDING_ENCODED:
+            pending = NO_PENDING
+        mask_size = _mask_size(total_card)
+        layout_end = header_end + total_card * 2
+        revealed_end = layout_end + mask_size
+        seen_end = revealed_end + mask_size
+        layout = _layout_from_bytes(data[header_end:layout_end])
+        revealed = bytearray(data[layout_end:revealed_end])
+        seen = bytearray(data[revealed_end:seen_end])
+        if matched is None:
+            matched = bin(int.from_bytes(revealed, "little")).count("1") // 2
+        return cls(
+            layout, revealed=revealed, seen=seen, pending=pending, matched=matched
+        )
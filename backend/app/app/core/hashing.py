@@ -0,0 +1,146 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Callable, Iterator, Optional, Tuple, TypeVar
+
+from passlib.context import CryptContext
+
+T = TypeVar("T")
+
+
+class PasswordHasherBusy(Exception):
+    """
+    Raised when more password hashing jobs are in flight than the queue allows.
+    """
+
+
+@lru_cache()
+def _context(rounds: int) -> CryptContext:
+    # Hashes below `rounds` are reported by `verify_and_update` as outdated
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+    )
+
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def _verify_and_update(
+    password: str, hashed_password: str, rounds: int
+) -> Tuple[bool, Optional[str]]:
+    return _context(rounds).verify_and_update(password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    bcrypt with a work factor of `rounds`, run in a pool of `workers`
+    processes so hashing neither holds the GIL of the API process nor piles up
+    in its threadpool. `workers=0` hashes inline in the calling thread.
+
+    At most `queue_depth` jobs are running or waiting at a time, calls beyond
+    that raise `PasswordHasherBusy` at once instead of queueing.
+    """
+
+    def __init__(self, *, rounds: int, workers: int, queue_depth: int) -> None:
+        self.rounds = rounds
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self._slots = threading.BoundedSemaphore(queue_depth)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers only import this module, forking would copy
+                # the API process with its open database connections
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            executor = self._get_executor()
+            try:
+                return executor.submit(fn, *args).result()
+            except BrokenProcessPool:
+                with self._lock:
+                    if self._executor is executor:
+                        self._executor = None
+                raise
+        finally:
+            self._slots.release()
+
+    async def _run_async(self, fn: Callable[..., T], *args: Any) -> T:
+        if not self.workers:
+            return await asyncio.get_event_loop().run_in_executor(None, fn, *args)
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            executor = self._get_executor()
+            try:
+                return await asyncio.wrap_future(executor.submit(fn, *args))
+            except BrokenProcessPool:
+                with self._lock:
+                    if self._executor is executor:
+                        self._executor = None
+                raise
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash, password, self.rounds)
+
+    def verify_and_update(
+        self, password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Check `password`, returning a new hash as well if `hashed_password`
+        was made with fewer rounds than the current work factor.
+        """
+        return self._run(_verify_and_update, password, hashed_password, self.rounds)
+
+    async def verify_and_update_async(
+        self, password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        `verify_and_update` that waits on the event loop instead of a thread.
+        """
+        return await self._run_async(
+            _verify_and_update, password, hashed_password, self.rounds
+        )
+
+    @contextmanager
+    def saturated(self) -> Iterator[None]:
+        """
+        Hold every queue slot meanwhile, so that calls raise
+        `PasswordHasherBusy` as under overload. For tests.
+        """
+        held = 0
+        try:
+            while self._slots.acquire(blocking=False):
+                held += 1
+            yield
+        finally:
+            for _ in range(held):
+                self._slots.release()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
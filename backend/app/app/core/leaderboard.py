@@ -0,0 +1,401 @@
+import json
+import os
+import secrets
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+from app.core import serialize
+from app.core.config import settings
+
+Cursor = Tuple[int, int]  # (min_open_count, id) of the last entry of a page
+
+# All-time best scores, and those of the current UTC day and week (from Monday)
+PERIODS = ("all", "day", "week")
+BUCKETED_PERIODS = PERIODS[1:]
+
+# Most pages a leaderboard keeps rendered
+PAGE_CACHE_SIZE = 256
+
+# Postgres channel of the score updates of game ends, between workers
+NOTIFY_CHANNEL = "leaderboard"
+# Sent on it instead of score updates when the scores were changed in bulk
+RELOAD_PAYLOAD = "reload"
+
+
+class LeaderboardEntry(NamedTuple):
+    min_open_count: int
+    id: int
+    user_id: int
+
+
+class RankedEntry(NamedTuple):
+    rank: int
+    min_open_count: int
+    id: int
+    user_id: int
+
+
+class ScoreUpdate(NamedTuple):
+    """
+    A score a game end improved, in the `bucket` of `period`.
+    """
+
+    period: str
+    bucket: Optional[datetime]
+    entry: LeaderboardEntry
+
+
+def worker_id() -> str:
+    """
+    Sender of this process's score updates, told apart after a fork.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def encode_score_updates(updates: Iterable[ScoreUpdate], *, sender: str) -> str:
+    return json.dumps(
+        {
+            "sender": sender,
+            "updates": [
+                [
+                    period,
+                    None if bucket is None else bucket.isoformat(),
+                    *entry,
+                ]
+                for period, bucket, entry in updates
+            ],
+        },
+        separators=(",", ":"),
+    )
+
+
+def decode_score_updates(payload: str) -> Tuple[Optional[str], List[ScoreUpdate]]:
+    """
+    The sender and the updates of a payload, without a sender for the bare
+    list of updates sent before it was added. Raises `ValueError` on a
+    malformed payload.
+    """
+    try:
+        message = json.loads(payload)
+        sender, updates = None, message
+        if isinstance(message, dict):
+            sender, updates = message["sender"], message["updates"]
+        return sender, [
+            ScoreUpdate(
+                period,
+                None if bucket is None else datetime.fromisoformat(bucket),
+                LeaderboardEntry(min_open_count, id, user_id),
+            )
+            for period, bucket, min_open_count, id, user_id in updates
+        ]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Malformed score updates {payload!r}") from e
+
+
+class RenderedPage(NamedTuple):
+    """
+    A page as `List[schemas.RankedBestScore]` JSON, with the cursor of the
+    next one if it is full.
+    """
+
+    body: bytes
+    next_cursor: Optional[str]
+    end: int  # position past the last entry the page can hold
+
+
+def bucket_start(period: str, at: datetime) -> Optional[datetime]:
+    """
+    Start of the bucket of `period` holding the naive UTC time `at`, `None`
+    for the single all-time bucket.
+    """
+    if period == "all":
+        return None
+    day = at.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "day":
+        return day
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    raise ValueError(f"Unknown leaderboard period {period!r}")
+
+
+def encode_cursor(min_open_count: int, id: int) -> str:
+    return f"{min_open_count}.{id}"
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """
+    Raises `ValueError` on a malformed cursor.
+    """
+    min_open_count, id = cursor.split(".")
+    return int(min_open_count), int(id)
+
+
+class Leaderboard:
+    """
+    Best scores kept in a `SortedList` by (min_open_count, id), the order of
+    the `ix_bestscore_min_open_count_id` index.
+
+    Ranks and cursors are found by bisection and scores are moved in
+    O(log n). Players with the same score share a rank. `record` applies a
+    game end of this worker incrementally; other workers' updates show up on
+    the next `replace`, at most `reload_seconds` later.
+
+    A daily or weekly leaderboard holds the scores of the current bucket of
+    its `period`, and is reloaded as soon as the next bucket starts.
+
+    Every change bumps a generation, the ETag of the leaderboard's
+    responses. Pages within the first `cached_top` entries are kept rendered
+    until a change reaches them, a new score below them leaves them be.
+    """
+
+    def __init__(
+        self, *, reload_seconds: float, period: str = "all", cached_top: int = 1000
+    ) -> None:
+        self.reload_seconds = reload_seconds
+        self.period = period
+        self.cached_top = cached_top
+        # Generations of other workers' leaderboards are unrelated
+        self._tag = secrets.token_hex(4)
+        self._generation = 0
+        self._modified_at = time.time()
+        self._pages: Dict[Tuple[Optional[Cursor], int], RenderedPage] = {}
+        self._listeners: List[Callable[[], None]] = []
+        self._bucket: Optional[datetime] = None
+        self._entries = SortedList()
+        self._by_user: Dict[int, LeaderboardEntry] = {}
+        self._loaded_at: Optional[float] = None
+        self._ever_loaded = False
+        # Scores recorded while a reload reads the table, its snapshot may
+        # predate them
+        self._recorded_during_load: Optional[
+            List[Tuple[Optional[datetime], LeaderboardEntry]]
+        ] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """
+        Call `callback` after every change, with the leaderboard locked: it
+        must return at once and not read the leaderboard.
+        """
+        self._listeners.append(callback)
+
+    def validators(self) -> Tuple[str, float]:
+        """
+        ETag and modification time of the current entries.
+        """
+        with self._lock:
+            etag = f'"{self.period}-{self._tag}-{self._generation}"'
+            return etag, self._modified_at
+
+    def current_bucket(self) -> Optional[datetime]:
+        return bucket_start(self.period, datetime.utcnow())
+
+    def needs_load(self) -> bool:
+        """
+        Whether the entries held can't be served: never loaded, expired or
+        of a past bucket.
+        """
+        return self._loaded_at is None or self._bucket != self.current_bucket()
+
+    def was_loaded(self) -> bool:
+        return self._ever_loaded
+
+    def needs_reload(self) -> bool:
+        loaded_at = self._loaded_at
+        return (
+            loaded_at is None
+            or time.monotonic() - loaded_at > self.reload_seconds
+            or self._bucket != self.current_bucket()
+        )
+
+    def expire(self) -> None:
+        """
+        Have the next read reload the table, after it was changed in bulk.
+        """
+        self._loaded_at = None
+
+    def begin_reload(self) -> bool:
+        """
+        Claim the next reload, `False` if another thread is already on it.
+        """
+        with self._lock:
+            if self._recorded_during_load is not None:
+                return False
+            self._recorded_during_load = []
+            return True
+
+    def replace(
+        self, entries: Iterable[LeaderboardEntry], *, bucket: Optional[datetime] = None
+    ) -> None:
+        """
+        Swap in the rows of a reload of `bucket`.
+        """
+        entries = SortedList(entries)
+        by_user = {entry.user_id: entry for entry in entries}
+        with self._lock:
+            recorded = self._recorded_during_load or []
+            if entries != self._entries:
+                self._changed(0)
+            self._bucket = bucket
+            self._entries = entries
+            self._by_user = by_user
+            self._recorded_during_load = None
+            for recorded_bucket, entry in recorded:
+                if recorded_bucket == bucket:
+                    self._record(entry)
+            self._loaded_at = time.monotonic()
+            self._ever_loaded = True
+
+    def abort_reload(self) -> None:
+        with self._lock:
+            self._recorded_during_load = None
+
+    def record(
+        self,
+        *,
+        id: int,
+        user_id: int,
+        min_open_count: int,
+        bucket: Optional[datetime] = None,
+    ) -> None:
+        """
+        Apply a score of `bucket`, ignored unless it is the bucket held.
+        """
+        entry = LeaderboardEntry(min_open_count, id, user_id)
+        with self._lock:
+            if self._recorded_during_load is not None:
+                self._recorded_during_load.append((bucket, entry))
+            if bucket == self._bucket:
+                self._record(entry)
+
+    def _record(self, entry: LeaderboardEntry) -> None:
+        current = self._by_user.get(entry.user_id)
+        removed = len(self._entries)
+        if current is not None:
+            if current.min_open_count <= entry.min_open_count:
+                return
+            removed = self._entries.bisect_left(current)
+            del self._entries[removed]
+        self._entries.add(entry)
+        inserted = self._entries.bisect_left(entry)
+        self._by_user[entry.user_id] = entry
+        self._changed(min(removed, inserted))
+
+    def _changed(self, position: int) -> None:
+        # Entries from `position` on moved or changed rank
+        self._generation += 1
+        self._modified_at = time.time()
+        stale = [key for key, page in self._pages.items() if page.end > position]
+        for key in stale:
+            del self._pages[key]
+        for callback in self._listeners:
+            callback()
+
+    def _rank(self, min_open_count: int) -> int:
+        # (min_open_count,) sorts before every entry with that score
+        return self._entries.bisect_left((min_open_count,)) + 1
+
+    def get(self, user_id: int) -> Optional[RankedEntry]:
+        with self._lock:
+            entry = self._by_user.get(user_id)
+            if entry is None:
+                return None
+            return RankedEntry(self._rank(entry.min_open_count), *entry)
+
+    def _start(self, after: Optional[Cursor]) -> int:
+        start = 0 if after is None else self._entries.bisect_left(after)
+        if after is not None and start < len(self._entries):
+            # `after` itself was on the previous page
+            if self._entries[start][:2] == after:
+                start += 1
+        return start
+
+    def page(self, *, after: Optional[Cursor] = None, limit: int) -> List[RankedEntry]:
+        with self._lock:
+            start = self._start(after)
+            end = start + limit
+            return [
+                RankedEntry(self._rank(entry.min_open_count), *entry)
+                for entry in self._entries[start:end]
+            ]
+
+    def rendered_page(
+        self, *, after: Optional[Cursor] = None, limit: int
+    ) -> RenderedPage:
+        """
+        `page`, rendered outside the lock. Served from the cache while its
+        entries are unchanged.
+        """
+        key = (after, limit)
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                return page
+            generation = self._generation
+            start = self._start(after)
+            end = start + limit
+            entries = [
+                RankedEntry(self._rank(entry.min_open_count), *entry)
+                for entry in self._entries[start:end]
+            ]
+        next_cursor = None
+        if len(entries) == limit:
+            next_cursor = encode_cursor(entries[-1].min_open_count, entries[-1].id)
+        page = RenderedPage(serialize.ranked_best_scores(entries), next_cursor, end)
+        if page.end <= self.cached_top:
+            with self._lock:
+                # Unless a change came in while it was rendered
+                if generation == self._generation:
+                    if len(self._pages) >= PAGE_CACHE_SIZE:
+                        del self._pages[next(iter(self._pages))]
+                    self._pages[key] = page
+        return page
+
+    def neighbors(self, user_id: int, *, size: int) -> List[RankedEntry]:
+        """
+        Up to `size` entries either side of `user_id` and the user's own entry.
+        """
+        with self._lock:
+            entry = self._by_user.get(user_id)
+            if entry is None:
+                return []
+            position = self._entries.bisect_left(entry)
+            first = max(0, position - size)
+            last = position + size + 1
+            return [
+                RankedEntry(self._rank(neighbor.min_open_count), *neighbor)
+                for neighbor in self._entries[first:last]
+            ]
+
+
+leaderboards = {
+    period: Leaderboard(
+        reload_seconds=settings.LEADERBOARD_RELOAD_SECONDS,
+        period=period,
+        cached_top=settings.LEADERBOARD_CACHED_TOP,
+    )
+    for period in PERIODS
+}
+leaderboard = leaderboards["all"]
+
+
+def publish_scores(updates: Iterable[ScoreUpdate]) -> None:
+    """
+    Apply the scores of a game end to this worker's leaderboards, once its
+    transaction is committed.
+    """
+    for period, bucket, entry in updates:
+        leaderboards[period].record(
+            id=entry.id,
+            user_id=entry.user_id,
+            min_open_count=entry.min_open_count,
+            bucket=bucket,
+        )
@@ -0,0 +1,112 @@
+import bisect
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+# Upper bounds in seconds, roughly log-spaced from 0.1 ms to 10 s
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    10.0,
+)
+
+
+class Histogram:
+    """
+    Thread-safe fixed-bucket histogram, Prometheus style (cumulative `le`).
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """
+        `(upper bound, observations <= bound)` pairs, ending with `+Inf`.
+        """
+        with self._lock:
+            counts = list(self._counts)
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def snapshot(self) -> Dict[str, object]:
+        """
+        JSON friendly form, the `+Inf` bucket has `le` None.
+        """
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": [
+                {"le": bound if bound != float("inf") else None, "count": count}
+                for bound, count in self.cumulative()
+            ],
+        }
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    return ",".join(
+        '{}="{}"'.format(
+            name,
+            value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in labels.items()
+    )
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else str(bound)
+
+
+def prometheus_sample(name: str, value: float, labels: Dict[str, str]) -> str:
+    if not labels:
+        return f"{name} {value}"
+    return f"{name}{{{_format_labels(labels)}}} {value}"
+
+
+def prometheus_histogram(
+    name: str, histogram: Histogram, labels: Dict[str, str]
+) -> List[str]:
+    """
+    Sample lines of `histogram` in the Prometheus text format, the caller
+    writes the `# TYPE` line.
+    """
+    cumulative = histogram.cumulative()
+    lines = [
+        prometheus_sample(
+            f"{name}_bucket", count, {**labels, "le": _format_bound(bound)}
+        )
+        for bound, count in cumulative
+    ]
+    lines.append(prometheus_sample(f"{name}_sum", histogram.sum, labels))
+    lines.append(prometheus_sample(f"{name}_count", cumulative[-1][1], labels))
+    return lines
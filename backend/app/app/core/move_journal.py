@@ -0,0 +1,181 @@
+import fcntl
+import glob
+import os
+import struct
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# One record per move, little-endian: game id (uint32) | version after the
+# move (uint32) | position (uint16). A record with position DISCARDED drops
+# the moves of that game up to its version.
+_RECORD = struct.Struct("<IIH")
+DISCARDED = 0xFFFF
+
+Move = Tuple[int, int]  # (version after the move, position)
+
+
+def _lock(path: str) -> Optional[int]:
+    """
+    File descriptor holding an exclusive lock on `path`, `None` if another
+    process holds it. The lock goes with the process, even when it crashes.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+class MoveJournal:
+    """
+    Append-only file of moves applied in memory, so games can be rebuilt
+    after a crash from their stored row plus the moves of later versions.
+
+    Each record is a single `os.write` to a file opened with `O_APPEND`: a
+    crashed process leaves at most a truncated last record, which `replay`
+    skips. With `fsync` every record is also flushed to disk, which survives
+    a power loss as well.
+
+    A journal belongs to one process: `claim_journal` gives each worker its
+    own file, held with `lock_fd` until `close`.
+    """
+
+    def __init__(
+        self, path: str, *, fsync: bool = False, lock_fd: Optional[int] = None
+    ) -> None:
+        self.path = path
+        self.fsync = fsync
+        self.lock_fd = lock_fd
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._fd = self._open()
+
+    def _open(self) -> int:
+        return os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+
+    def size(self) -> int:
+        return os.fstat(self._fd).st_size
+
+    def append(self, game_id: int, version: int, position: int) -> None:
+        record = _RECORD.pack(game_id, version, position)
+        with self._lock:
+            os.write(self._fd, record)
+            if self.fsync:
+                os.fsync(self._fd)
+
+    def discard(self, game_id: int, version: int) -> None:
+        """
+        Drop the moves of `game_id` up to `version`, they must not be replayed.
+        """
+        self.append(game_id, version, DISCARDED)
+
+    def _read(self, end: Optional[int] = None) -> Dict[int, List[Move]]:
+        with open(self.path, "rb") as journal:
+            data = journal.read() if end is None else journal.read(end)
+        data = data[: len(data) - len(data) % _RECORD.size]
+        moves: Dict[int, List[Move]] = {}
+        for game_id, version, position in _RECORD.iter_unpack(data):
+            if position == DISCARDED:
+                moves[game_id] = [
+                    move for move in moves.get(game_id, []) if move[0] > version
+                ]
+            else:
+                moves.setdefault(game_id, []).append((version, position))
+        return {
+            game_id: game_moves for game_id, game_moves in moves.items() if game_moves
+        }
+
+    def replay(self) -> Dict[int, List[Move]]:
+        """
+        Journaled moves of each game, in the order they were applied.
+        """
+        with self._lock:
+            return self._read()
+
+    def compact(
+        self, saved_versions: Dict[int, int], *, end: Optional[int] = None
+    ) -> None:
+        """
+        Rewrite the journal with only the moves of the games in
+        `saved_versions` past their saved version, the others are all stored.
+
+        `saved_versions` holds for the first `end` bytes (the whole journal
+        by default): records appended after them are kept as they are. The
+        journal is only locked to copy those and swap the files, so moves
+        keep being appended while it is rewritten.
+        """
+        with self._compact_lock:
+            if end is None:
+                end = self.size()
+            end -= end % _RECORD.size
+            records = [
+                _RECORD.pack(game_id, version, position)
+                for game_id, game_moves in self._read(end).items()
+                if game_id in saved_versions
+                for version, position in game_moves
+                if version > saved_versions[game_id]
+            ]
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "wb") as journal:
+                journal.write(b"".join(records))
+                with self._lock:
+                    with open(self.path, "rb") as current:
+                        current.seek(end)
+                        journal.write(current.read())
+                    journal.flush()
+                    os.fsync(journal.fileno())
+                    os.replace(temp_path, self.path)
+                    os.close(self._fd)
+                    self._fd = self._open()
+
+    def close(self) -> None:
+        with self._lock:
+            os.close(self._fd)
+            if self.lock_fd is not None:
+                os.close(self.lock_fd)
+                self.lock_fd = None
+
+
+def _slot_path(path: str, slot: int) -> str:
+    return f"{path}.{slot}"
+
+
+def claim_journal(path: str, *, fsync: bool = False) -> MoveJournal:
+    """
+    The journal `<path>.<n>` of the first slot `n` no other process holds,
+    so the workers sharing `GAME_JOURNAL_PATH` never write or compact each
+    other's moves. A restarted worker claims a slot freed by its
+    predecessor and replays what it left.
+    """
+    slot = 0
+    while True:
+        slot_path = _slot_path(path, slot)
+        lock_fd = _lock(f"{slot_path}.lock")
+        if lock_fd is not None:
+            return MoveJournal(slot_path, fsync=fsync, lock_fd=lock_fd)
+        slot += 1
+
+
+def orphaned_journals(path: str, *, fsync: bool = False) -> List[MoveJournal]:
+    """
+    Journals of the slots of `path` no process holds, left by workers gone
+    for good (when there are fewer workers than before), claimed to be
+    recovered. A journal at `path` itself, from before the slots, is one.
+    """
+    journals = []
+    prefix = f"{path}."
+    start = len(prefix)
+    slot_paths = [
+        slot_path
+        for slot_path in sorted(glob.glob(f"{glob.escape(prefix)}*"))
+        if slot_path[start:].isdigit()
+    ]
+    if os.path.exists(path):
+        slot_paths.append(path)
+    for slot_path in slot_paths:
+        lock_fd = _lock(f"{slot_path}.lock")
+        if lock_fd is not None:
+            journals.append(MoveJournal(slot_path, fsync=fsync, lock_fd=lock_fd))
+    return journals
@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import Iterable, NamedTuple
+
+from app.core.game_state import GameState
+
+
+class MoveRecord(NamedTuple):
+    """
+    One row of the `cardmove` log.
+    """
+
+    game_id: int
+    seq: int  # open_count after the move, 1 for the first move of a game
+    position: int
+    result: int  # MOVE_* outcome
+    created_at: datetime
+
+
+def snapshot_due(first_seq: int, last_seq: int, every: int) -> bool:
+    """
+    Whether moves `first_seq`..`last_seq` pass a multiple of `every`, so the
+    state after `last_seq` should be kept as a replay snapshot.
+    """
+    return every > 0 and (first_seq - 1) // every < last_seq // every
+
+
+def replay(state: GameState, positions: Iterable[int]) -> GameState:
+    """
+    Apply the moves at `positions` to `state`, in order.
+    """
+    for position in positions:
+        state.accept_answer_if_in_condition(position)
+    return state
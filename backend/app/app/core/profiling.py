@@ -0,0 +1,243 @@
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.metrics import Histogram, prometheus_histogram, prometheus_sample
+
+# Phases of a request timed apart from its total latency. They can overlap:
+# `auth` and `commit` include the time of their own statements, which `db`
+# counts as well.
+PHASES = ("auth", "db", "commit", "handler", "serialization")
+
+# Upper bounds of the statements per request histogram
+STATEMENT_BUCKETS = (0, 1, 2, 3, 4, 5, 8, 13, 21, 34, 55, 100)
+
+
+class RequestProfile:
+    """
+    Time spent in each phase and SQL statements run by one request.
+    """
+
+    __slots__ = (
+        "route",
+        "query_budget",
+        "start",
+        "handler_end",
+        "phases",
+        "statements",
+        "_marks",
+    )
+
+    def __init__(self) -> None:
+        self.route: Optional[str] = None
+        self.query_budget: Optional[int] = None
+        self.start = time.perf_counter()
+        self.handler_end: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self.statements = 0
+        # Start time of the phases in progress, by phase
+        self._marks: Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def begin(self, phase: str) -> None:
+        self._marks[phase] = time.perf_counter()
+
+    def end(self, phase: str) -> None:
+        start = self._marks.pop(phase, None)
+        if start is not None:
+            self.add(phase, time.perf_counter() - start)
+
+    def statement(self, seconds: float) -> None:
+        self.statements += 1
+        self.add("db", seconds)
+
+    @property
+    def over_budget(self) -> bool:
+        return self.query_budget is not None and self.statements > self.query_budget
+
+
+# Profile of the request being handled. The threadpool runs sync endpoints
+# and dependencies in a copy of the request's context, so they see it too.
+_current: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+    "request_profile", default=None
+)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current.get()
+
+
+def start_profile() -> Tuple[RequestProfile, contextvars.Token]:
+    profile = RequestProfile()
+    return profile, _current.set(profile)
+
+
+def stop_profile(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Add the time of the block to phase `name` of the current request, if it
+    is profiled.
+    """
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - start)
+
+
+class RouteStats:
+    __slots__ = ("latency", "phases", "statements", "statuses")
+
+    def __init__(self) -> None:
+        self.latency = Histogram()
+        self.phases = {name: Histogram() for name in PHASES}
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.statuses: Counter = Counter()
+
+
+class RouteMetrics:
+    """
+    Latency, phase and statement histograms of each route of this worker
+    process, keyed by method and path template so their number stays bounded.
+    """
+
+    def __init__(self) -> None:
+        self._routes: Dict[Tuple[str, str], RouteStats] = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, method: str, route: str) -> RouteStats:
+        key = (method, route)
+        stats = self._routes.get(key)
+        if stats is None:
+            with self._lock:
+                stats = self._routes.setdefault(key, RouteStats())
+        return stats
+
+    def record(
+        self, method: str, status: int, profile: RequestProfile, latency: float
+    ) -> None:
+        stats = self._stats(method, profile.route or "other")
+        stats.latency.observe(latency)
+        for name, seconds in profile.phases.items():
+            stats.phases[name].observe(seconds)
+        stats.statements.observe(profile.statements)
+        with self._lock:
+            stats.statuses[status] += 1
+
+    def prometheus(self) -> List[str]:
+        with self._lock:
+            routes = list(self._routes.items())
+        lines = ["# TYPE http_requests_total counter"]
+        for (method, route), stats in routes:
+            with self._lock:
+                statuses = list(stats.statuses.items())
+            for status, count in statuses:
+                lines.append(
+                    prometheus_sample(
+                        "http_requests_total",
+                        count,
+                        {"method": method, "route": route, "status": str(status)},
+                    )
+                )
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for (method, route), stats in routes:
+            lines += prometheus_histogram(
+                "http_request_duration_seconds",
+                stats.latency,
+                {"method": method, "route": route},
+            )
+        lines.append("# TYPE http_request_phase_seconds histogram")
+        for (method, route), stats in routes:
+            for name, histogram in stats.phases.items():
+                if histogram.count:
+                    lines += prometheus_histogram(
+                        "http_request_phase_seconds",
+                        histogram,
+                        {"method": method, "route": route, "phase": name},
+                    )
+        lines.append("# TYPE http_request_db_statements histogram")
+        for (method, route), stats in routes:
+            lines += prometheus_histogram(
+                "http_request_db_statements",
+                stats.statements,
+                {"method": method, "route": route},
+            )
+        return lines
+
+
+# Innermost frames of threads waiting for work, left out of the samples
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+
+
+def _folded_stack(frame: Any) -> Optional[str]:
+    if os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+        return None
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+            f"{code.co_firstlineno})"
+        )
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """
+    Samples the stacks of all busy threads of the process every `interval`
+    seconds while running, and renders them in the folded format read by
+    flamegraph.pl and speedscope.
+
+    Other requests served meanwhile by the same worker are sampled as well,
+    so profile a worker without other traffic.
+    """
+
+    def __init__(self, *, interval: float) -> None:
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = _folded_stack(frame)
+                if stack is not None:
+                    self.samples[stack] += 1
+
+    def __enter__(self) -> "StackSampler":
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.stop()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.samples.most_common()
+        )
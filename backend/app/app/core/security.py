@@ -1,34 +1,81 @@
+import time
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Dict, Optional, Tuple, Union
 
 from jose import jwt
-from passlib.context import CryptContext
 
+from app.core.cache import build_cache
 from app.core.config import settings
+from app.core.hashing import PasswordHasher
+from app.core.tokens import TokenDenylist, VerifiedTokenCache
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hasher = PasswordHasher(
+    rounds=settings.BCRYPT_ROUNDS,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_depth=settings.PASSWORD_HASH_QUEUE_DEPTH,
+)
 
+verified_tokens = VerifiedTokenCache(max_size=settings.ACCESS_TOKEN_CACHE_SIZE)
+# Revocations are never evicted while they cover live tokens, and a failing
+# Redis raises instead of letting revoked tokens through
+token_denylist = TokenDenylist(
+    build_cache(
+        settings.TOKEN_DENYLIST_BACKEND,
+        namespace="token-denylist",
+        ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        max_size=None,
+        url=settings.TOKEN_DENYLIST_URL,
+        strict=True,
+    ),
+    token_lifetime=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
 
 ALGORITHM = "HS256"
 
 
 def create_access_token(
-    subject: Union[str, Any], expires_delta: timedelta = None
+    subject: Union[str, Any],
+    expires_delta: timedelta = None,
+    *,
+    is_active: Optional[bool] = None,
+    is_superuser: Optional[bool] = None,
 ) -> str:
+    """
+    `is_active` and `is_superuser` are embedded as claims when given, see
+    `ACCESS_TOKEN_EMBED_PRINCIPAL`.
+    """
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode: Dict[str, Any] = {"exp": expire, "sub": str(subject), "iat": time.time()}
+    if is_active is not None:
+        to_encode["is_active"] = is_active
+    if is_superuser is not None:
+        to_encode["is_superuser"] = is_superuser
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.verify_and_update(plain_password, hashed_password)[0]
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    return password_hasher.verify_and_update(plain_password, hashed_password)
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    return await password_hasher.verify_and_update_async(
+        plain_password, hashed_password
+    )
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
@@ -0,0 +1,116 @@
+from typing import TYPE_CHECKING, Any, Iterable, Mapping
+
+from app.core.game_state import GameState
+
+if TYPE_CHECKING:
+    from app.core.leaderboard import RankedEntry  # noqa: F401
+
+# Hand-rolled JSON of the hot response models, byte for byte what FastAPI's
+# `JSONResponse` renders for them after validating against `response_model`:
+# the same key order, compact separators, int keys as strings. Every value is
+# an int, a bool or a card display (the decimal digits of an int), so nothing
+# needs escaping and each model is one precompiled template.
+
+_CARD_GAME = (
+    '{"game_info":%s,"open_count":%d,"id":%d,"owner_id":%d,"version":%d,'
+    '"pair_count":%d,"total_card":%d}'
+)
+_GAME_INFO = (
+    '{"answer_as_position_in_sequence":[%s],"display_by_answer":{%s},'
+    '"is_game_end":%s}'
+)
+_CARD_GAME_DELTA = (
+    '{"id":%d,"version":%d,"open_count":%d,"revealed":{%s},"hidden":[%s],'
+    '"is_game_end":%s}'
+)
+_RANKED_BEST_SCORE = '{"user_id":%d,"min_open_count":%d,"id":%d,"rank":%d}'
+
+
+def _bool(value: bool) -> str:
+    return "true" if value else "false"
+
+
+def _ints(values: Iterable[int]) -> str:
+    return ",".join(map(str, values))
+
+
+def _game_info(state: GameState) -> str:
+    layout = state.layout
+    return _GAME_INFO % (
+        _ints(state.answer_sequence()),
+        ",".join(
+            [
+                f'"{position}":"{layout[position]}"'
+                for position in state.seen_positions()
+            ]
+        ),
+        _bool(state.is_game_end()),
+    )
+
+
+def _card_game(game: Any, state: GameState) -> str:
+    return _CARD_GAME % (
+        _game_info(state),
+        game.open_count,
+        game.id,
+        game.owner_id,
+        game.version,
+        game.pair_count,
+        game.pair_count * 2,
+    )
+
+
+def card_game(game: Any, state: GameState) -> bytes:
+    """
+    `schemas.CardGame` of a `models.CardGame` or a `GameSession`, `state`
+    being its decoded `GameState`.
+    """
+    return _card_game(game, state).encode()
+
+
+def card_games(games: Iterable[Any]) -> bytes:
+    """
+    `List[schemas.CardGame]` of `models.CardGame` rows.
+    """
+    rendered = ",".join([_card_game(game, game.game_state) for game in games])
+    return f"[{rendered}]".encode()
+
+
+def card_game_delta(delta: Mapping[str, Any]) -> bytes:
+    """
+    `schemas.CardGameDelta` of the fields `GameSession.open_card` returns.
+    """
+    revealed = ",".join(
+        [f'"{position}":"{display}"' for position, display in delta["revealed"].items()]
+    )
+    return (
+        _CARD_GAME_DELTA
+        % (
+            delta["id"],
+            delta["version"],
+            delta["open_count"],
+            revealed,
+            _ints(delta["hidden"]),
+            _bool(delta["is_game_end"]),
+        )
+    ).encode()
+
+
+def ranked_best_score(entry: "RankedEntry") -> bytes:
+    return (
+        _RANKED_BEST_SCORE % (entry.user_id, entry.min_open_count, entry.id, entry.rank)
+    ).encode()
+
+
+def ranked_best_scores(entries: Iterable["RankedEntry"]) -> bytes:
+    """
+    `List[schemas.RankedBestScore]` of leaderboard entries.
+    """
+    rendered = ",".join(
+        [
+            _RANKED_BEST_SCORE
+            % (entry.user_id, entry.min_open_count, entry.id, entry.rank)
+            for entry in entries
+        ]
+    )
+    return f"[{rendered}]".encode()
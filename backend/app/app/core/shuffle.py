@@ -0,0 +1,37 @@
+import random
+from array import array
+from typing import Optional
+
+from app.core.config import settings
+
+# Cards are stored as uint16 and counted in a uint16 (see app.core.game_state)
+MAX_GAME_SIZE = 0xFFFF // 2
+
+
+def get_rng(seed: Optional[int] = None) -> random.Random:
+    """
+    `random.Random(seed)` to replay the same decks (tests, debugging), the
+    operating system CSPRNG otherwise, so deals can't be predicted from earlier
+    ones.
+    """
+    if seed is None:
+        return random.SystemRandom()
+    return random.Random(seed)
+
+
+def shuffled_deck(game_size: int, rng: random.Random) -> array:
+    """
+    Both cards of each pair 1..`game_size`, shuffled in O(n).
+
+    `Random.shuffle` is the Fisher-Yates (Durstenfeld) shuffle: one
+    `randbelow` and one swap per card, every permutation equally likely.
+    """
+    if not 1 <= game_size <= MAX_GAME_SIZE:
+        raise ValueError(f"Game size must be between 1 and {MAX_GAME_SIZE}")
+    deck = array("H", range(1, game_size + 1)) * 2
+    rng.shuffle(deck)
+    return deck
+
+
+# Shared by the deck pool and `GameInfoInDB.build_random_game`
+default_rng = get_rng(settings.GAME_SHUFFLE_SEED)
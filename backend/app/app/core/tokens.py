@@ -0,0 +1,99 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from app.core.cache import Cache
+
+
+class TokenClaims(NamedTuple):
+    """
+    Verified claims of an access token. `is_active` and `is_superuser` are
+    only in tokens issued with `ACCESS_TOKEN_EMBED_PRINCIPAL`, `iat` is
+    missing from tokens issued before it was added.
+    """
+
+    sub: Optional[int]
+    exp: Optional[float]
+    iat: Optional[float]
+    is_active: Optional[bool]
+    is_superuser: Optional[bool]
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+class VerifiedTokenCache:
+    """
+    Thread-safe LRU of the claims of at most `max_size` verified tokens, by
+    `token_digest`, so a token reused by its client skips the signature check
+    and the payload validation. An entry is dropped once its token expires,
+    tokens without an expiry are never cached.
+    """
+
+    def __init__(self, *, max_size: int) -> None:
+        self.max_size = max_size
+        self._data: "OrderedDict[bytes, TokenClaims]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, digest: bytes) -> Optional[TokenClaims]:
+        with self._lock:
+            claims = self._data.get(digest)
+            if claims is None:
+                return None
+            assert claims.exp is not None
+            if claims.exp <= time.time():
+                del self._data[digest]
+                return None
+            self._data.move_to_end(digest)
+            return claims
+
+    def put(self, digest: bytes, claims: TokenClaims) -> None:
+        if self.max_size <= 0 or claims.exp is None:
+            return
+        with self._lock:
+            self._data[digest] = claims
+            self._data.move_to_end(digest)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class TokenDenylist:
+    """
+    Revoked access tokens, kept in `cache` only while they could still be
+    used: a single token until it expires, and every token of a user issued
+    up to the revocation for `token_lifetime` seconds.
+
+    `cache` must neither evict live entries nor hide its failures: a strict
+    cache raises `CacheUnavailable` from every method here.
+    """
+
+    def __init__(self, cache: Cache, *, token_lifetime: float) -> None:
+        self.cache = cache
+        self.token_lifetime = token_lifetime
+
+    def revoke(self, digest: bytes, claims: TokenClaims) -> None:
+        ttl = self.token_lifetime if claims.exp is None else claims.exp - time.time()
+        if ttl > 0:
+            self.cache.set(f"token:{digest.hex()}", 1, ttl=ttl)
+
+    def revoke_user(self, user_id: int) -> None:
+        self.cache.set(f"user:{user_id}", time.time(), ttl=self.token_lifetime)
+
+    def is_revoked(self, digest: bytes, claims: TokenClaims) -> bool:
+        if self.cache.get(f"token:{digest.hex()}") is not None:
+            return True
+        revoked_at = self.cache.get(f"user:{claims.sub}")
+        if revoked_at is None:
+            return False
+        # Tokens without `iat` can't tell whether they came after
+        return claims.iat is None or claims.iat <= revoked_at
@@ -1,6 +1,8 @@
-from .crud_game import game
+from .crud_best_score import async_best_score, best_score
+from .crud_card_move import async_card_move, card_move
+from .crud_game import async_game, game
 from .crud_item import item
-from .crud_user import user
+from .crud_user import async_user, user
 
 # For a new basic set of CRUD operations you could just do
 
@@ -0,0 +1,131 @@
+from typing import Any, Dict, Generic, Mapping, Optional, Tuple, Type, Union
+
+from databases import Database
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, insert, select
+from sqlalchemy.sql import Select
+
+from app.crud.base import (
+    CreateSchemaType,
+    ModelType,
+    UpdateSchemaType,
+    update_statement,
+    updated_model,
+)
+from app.crud.pagination import (
+    Page,
+    PageCursor,
+    build_page,
+    decode_page_cursor,
+    keyset_order,
+)
+
+
+class AsyncCRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    sort_columns: Tuple[str, ...] = ("id",)
+
+    def __init__(self, model: Type[ModelType]):
+        """
+        Async CRUD object with the same default methods as `CRUDBase`.
+
+        Queries run through `databases` on the event loop. Rows are returned as
+        transient (session-less) instances of `model`, so response models with
+        `orm_mode` render them the same way as the sync path.
+
+        **Parameters**
+
+        * `model`: A SQLAlchemy model class
+        """
+        self.model = model
+        self.table = model.__table__  # type: ignore
+
+    def insert_values(self, **values: Any) -> Dict[str, Any]:
+        """
+        `databases` does not run client-side column defaults, fill them here.
+        """
+        for column in self.table.c:
+            if column.name in values or column.default is None:
+                continue
+            if column.default.is_scalar:
+                values[column.name] = column.default.arg
+            elif column.default.is_callable:
+                values[column.name] = column.default.arg(None)
+        return values
+
+    def to_model(self, row: Optional[Mapping]) -> Optional[ModelType]:
+        if row is None:
+            return None
+        return self.model(**dict(row))  # type: ignore
+
+    async def get(self, db: Database, id: Any) -> Optional[ModelType]:
+        row = await db.fetch_one(select([self.table]).where(self.table.c.id == id))
+        return self.to_model(row)
+
+    def decode_cursor(self, cursor: str) -> PageCursor:
+        return decode_page_cursor(
+            cursor,
+            {name: self.table.c[name].type.python_type for name in self.sort_columns},
+        )
+
+    async def paginate(
+        self,
+        db: Database,
+        query: Select,
+        *,
+        cursor: Optional[PageCursor] = None,
+        limit: int = 100,
+        sort: str = "id",
+    ) -> Page[ModelType]:
+        if cursor is not None:
+            sort = cursor.sort
+        if sort not in self.sort_columns:
+            raise ValueError(f"Can't sort by {sort!r}")
+        where, order_by = keyset_order(self.table.c[sort], self.table.c.id, cursor)
+        if where is not None:
+            query = query.where(where)
+        rows = await db.fetch_all(query.order_by(*order_by).limit(limit + 1))
+        return build_page(
+            [self.to_model(row) for row in rows],  # type: ignore
+            sort=sort,
+            cursor=cursor,
+            limit=limit,
+        )
+
+    async def get_multi(
+        self,
+        db: Database,
+        *,
+        cursor: Optional[PageCursor] = None,
+        limit: int = 100,
+        sort: str = "id",
+    ) -> Page[ModelType]:
+        return await self.paginate(
+            db, select([self.table]), cursor=cursor, limit=limit, sort=sort
+        )
+
+    async def create(self, db: Database, *, obj_in: CreateSchemaType) -> ModelType:
+        obj_in_data = jsonable_encoder(obj_in)
+        row = await db.fetch_one(
+            insert(self.table)
+            .values(**self.insert_values(**obj_in_data))
+            .returning(*self.table.c)
+        )
+        return self.to_model(row)  # type: ignore
+
+    async def update(
+        self,
+        db: Database,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+    ) -> Optional[ModelType]:
+        statement = update_statement(self.model, db_obj, obj_in)
+        if statement is None:
+            return db_obj
+        return updated_model(self.model, await db.fetch_one(statement))
+
+    async def remove(self, db: Database, *, id: int) -> Optional[ModelType]:
+        row = await db.fetch_one(
+            delete(self.table).where(self.table.c.id == id).returning(*self.table.c)
+        )
+        return self.to_model(row)
@@ -1,9 +1,19 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from typing import Any, Dict, Generic, Mapping, Optional, Tuple, Type, TypeVar, Union
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, inspect, update
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.sql import Update
 
+from app.crud.pagination import (
+    Page,
+    PageCursor,
+    build_page,
+    decode_page_cursor,
+    keyset_order,
+)
 from app.db.base_class import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
@@ -11,53 +21,151 @@ CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+def update_statement(
+    model: Type[ModelType],
+    db_obj: ModelType,
+    obj_in: Union[BaseModel, Dict[str, Any]],
+) -> Optional[Update]:
+    """
+    UPDATE ... RETURNING of the fields of `obj_in` in the row of `db_obj`,
+    `None` if there are none. The row of a versioned model (`version_id_col`)
+    only matches `db_obj`'s version, which is bumped, as the ORM does.
+    """
+    if isinstance(obj_in, dict):
+        update_data = obj_in
+    else:
+        update_data = obj_in.dict(exclude_unset=True)
+    table = model.__table__  # type: ignore
+    version = inspect(model).version_id_col
+    values = {
+        field: value
+        for field, value in update_data.items()
+        if field in table.c and (version is None or field != version.key)
+    }
+    if not values:
+        return None
+    statement = update(table).where(table.c.id == db_obj.id)  # type: ignore
+    if version is not None:
+        statement = statement.where(version == getattr(db_obj, version.key)).values(
+            {version.key: version + 1}
+        )
+    return statement.values(**values).returning(*table.c)
+
+
+def updated_model(
+    model: Type[ModelType], row: Optional[Mapping]
+) -> Optional[ModelType]:
+    """
+    The model of the row an update returned, `None` if it was deleted. Raises
+    `StaleDataError` instead for a versioned model, changed or deleted.
+    """
+    if row is None:
+        if inspect(model).version_id_col is not None:
+            raise StaleDataError(f"{model.__name__} was modified concurrently")
+        return None
+    return model(**dict(row))  # type: ignore
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    # Non-null columns lists can be sorted by, each with an index on
+    # (column, id) or a unique one on the column
+    sort_columns: Tuple[str, ...] = ("id",)
+
     def __init__(self, model: Type[ModelType]):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
 
+        Creates and updates are a single INSERT / UPDATE ... RETURNING, the
+        written row comes back as a transient (session-less) instance of
+        `model` instead of being read again. Lists are paged with keyset
+        cursors, see `app.crud.pagination`.
+
         **Parameters**
 
         * `model`: A SQLAlchemy model class
         * `schema`: A Pydantic model (schema) class
         """
         self.model = model
+        self.table = model.__table__  # type: ignore
+
+    def to_model(self, row: Optional[Mapping]) -> Optional[ModelType]:
+        if row is None:
+            return None
+        return self.model(**dict(row))  # type: ignore
+
+    def insert_returning(self, db: Session, values: Dict[str, Any]) -> ModelType:
+        row = db.execute(
+            insert(self.table).values(**values).returning(*self.table.c)
+        ).first()
+        db.commit()
+        return self.to_model(row)  # type: ignore
 
     def get(self, db: Session, id: Any) -> Optional[ModelType]:
         return db.query(self.model).filter(self.model.id == id).first()
 
+    def decode_cursor(self, cursor: str) -> PageCursor:
+        """
+        Raises `ValueError` on a cursor that isn't one of this CRUD's lists.
+        """
+        return decode_page_cursor(
+            cursor,
+            {name: self.table.c[name].type.python_type for name in self.sort_columns},
+        )
+
+    def paginate(
+        self,
+        query: Query,
+        *,
+        cursor: Optional[PageCursor] = None,
+        limit: int = 100,
+        sort: str = "id",
+    ) -> Page[ModelType]:
+        """
+        The page of `query` at `cursor`, sorted by the `sort` column and id
+        (`sort` is taken from the cursor if there is one).
+        """
+        if cursor is not None:
+            sort = cursor.sort
+        if sort not in self.sort_columns:
+            raise ValueError(f"Can't sort by {sort!r}")
+        where, order_by = keyset_order(self.table.c[sort], self.table.c.id, cursor)
+        if where is not None:
+            query = query.filter(where)
+        rows = query.order_by(*order_by).limit(limit + 1).all()
+        return build_page(rows, sort=sort, cursor=cursor, limit=limit)
+
     def get_multi(
-        self, db: Session, *, skip: int = 0, limit: int = 100
-    ) -> List[ModelType]:
-        return db.query(self.model).offset(skip).limit(limit).all()
+        self,
+        db: Session,
+        *,
+        cursor: Optional[PageCursor] = None,
+        limit: int = 100,
+        sort: str = "id",
+    ) -> Page[ModelType]:
+        return self.paginate(
+            db.query(self.model), cursor=cursor, limit=limit, sort=sort
+        )
 
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
-        db_obj = self.model(**obj_in_data)  # type: ignore
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        return self.insert_returning(db, obj_in_data)
 
     def update(
         self,
         db: Session,
         *,
         db_obj: ModelType,
-        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
-    ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
-        if isinstance(obj_in, dict):
-            update_data = obj_in
-        else:
-            update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
-        db.add(db_obj)
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+    ) -> Optional[ModelType]:
+        """
+        `db_obj` updated, `None` if its row was deleted meanwhile.
+        """
+        statement = update_statement(self.model, db_obj, obj_in)
+        if statement is None:
+            return db_obj
+        row = db.execute(statement).first()
         db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        return updated_model(self.model, row)
 
     def remove(self, db: Session, *, id: int) -> ModelType:
         obj = db.query(self.model).get(id)
@@ -0,0 +1,434 @@
+from datetime import datetime, timedelta
+from typing import Any, List, Optional
+
+from databases import Database
+from sqlalchemy import delete, exists, func, literal, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.leaderboard import (
+    BUCKETED_PERIODS,
+    NOTIFY_CHANNEL,
+    RELOAD_PAYLOAD,
+    Cursor,
+    Leaderboard,
+    LeaderboardEntry,
+    ScoreUpdate,
+    bucket_start,
+    encode_score_updates,
+    leaderboards,
+    worker_id,
+)
+from app.crud.async_base import AsyncCRUDBase
+from app.crud.base import CRUDBase
+from app.models.card_game import BestScore, CardGame, PeriodBestScore
+from app.schemas.game import BestScoreCreate, BestScoreUpdate
+
+LEADERBOARD_BATCH_SIZE = 1000
+
+
+def _leaderboard_query(
+    period: str, bucket: Optional[datetime], *, after: Optional[Cursor], limit: int
+) -> Any:
+    # Walks the (min_open_count, id) index of the table or of the bucket, no
+    # sort and no OFFSET
+    if period == "all":
+        table = BestScore.__table__  # type: ignore
+        query = select([table.c.min_open_count, table.c.id, table.c.user_id]).where(
+            table.c.min_open_count.isnot(None)
+        )
+    else:
+        table = PeriodBestScore.__table__  # type: ignore
+        query = select([table.c.min_open_count, table.c.id, table.c.user_id]).where(
+            (table.c.period == period) & (table.c.bucket_start == bucket)
+        )
+    if after is not None:
+        query = query.where(tuple_(table.c.min_open_count, table.c.id) > after)
+    return query.order_by(table.c.min_open_count, table.c.id).limit(limit)
+
+
+def _record_statement(table: Any, *, user_id: int, open_count: int) -> Any:
+    # One statement whatever the user's scores so far, serialized on the
+    # unique user_id index. Nothing is written unless the score improves.
+    statement = insert(table).values(user_id=user_id, min_open_count=open_count)
+    best = func.least(table.c.min_open_count, statement.excluded.min_open_count)
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={"min_open_count": best},
+        where=table.c.min_open_count.is_distinct_from(best),
+    ).returning(table.c.id, table.c.min_open_count)
+
+
+def _record_buckets_statement(
+    *, user_id: int, open_count: int, finished_at: datetime
+) -> Any:
+    # The game end's bucket of every period, upserted as in `_record_statement`
+    table = PeriodBestScore.__table__  # type: ignore
+    statement = insert(table).values(
+        [
+            {
+                "period": period,
+                "bucket_start": bucket_start(period, finished_at),
+                "user_id": user_id,
+                "min_open_count": open_count,
+            }
+            for period in BUCKETED_PERIODS
+        ]
+    )
+    best = func.least(table.c.min_open_count, statement.excluded.min_open_count)
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.period, table.c.bucket_start, table.c.user_id],
+        set_={"min_open_count": best},
+        where=table.c.min_open_count.is_distinct_from(best),
+    ).returning(
+        table.c.id, table.c.period, table.c.bucket_start, table.c.min_open_count
+    )
+
+
+def _bucket_updates(rows: List[Any], user_id: int) -> List[ScoreUpdate]:
+    return [
+        ScoreUpdate(
+            row["period"],
+            row["bucket_start"],
+            LeaderboardEntry(row["min_open_count"], row["id"], user_id),
+        )
+        for row in rows
+    ]
+
+
+def _notify_statement(updates: List[ScoreUpdate]) -> Any:
+    # Sent on commit, the other workers apply it to their leaderboards (this
+    # one already did with `publish_scores`)
+    payload = encode_score_updates(updates, sender=worker_id())
+    return select([func.pg_notify(NOTIFY_CHANNEL, payload)])
+
+
+def _expired_buckets_statement(now: datetime) -> Any:
+    # Buckets older than the one holding the retention limit, the current
+    # bucket of every period is always kept
+    table = PeriodBestScore.__table__  # type: ignore
+    oldest = now - timedelta(days=settings.LEADERBOARD_RETENTION_DAYS)
+    return delete(table).where(
+        or_(
+            *[
+                (table.c.period == period)
+                & (table.c.bucket_start < bucket_start(period, oldest))
+                for period in BUCKETED_PERIODS
+            ]
+        )
+    )
+
+
+def _to_entries(rows: List[Any]) -> List[LeaderboardEntry]:
+    return [
+        LeaderboardEntry(row["min_open_count"], row["id"], row["user_id"])
+        for row in rows
+    ]
+
+
+def _next_cursor(entries: List[LeaderboardEntry]) -> Optional[Cursor]:
+    if len(entries) < LEADERBOARD_BATCH_SIZE:
+        return None
+    return entries[-1].min_open_count, entries[-1].id
+
+
+class CRUDBestScore(CRUDBase[BestScore, BestScoreCreate, BestScoreUpdate]):
+    def get_by_user(self, db: Session, *, user_id: int) -> Optional[BestScore]:
+        return db.query(BestScore).filter(BestScore.user_id == user_id).first()
+
+    def get_multi_ordered(
+        self,
+        db: Session,
+        *,
+        user_id: Optional[int] = None,
+        after: Optional[Cursor] = None,
+        limit: int = 100,
+    ) -> List[BestScore]:
+        """
+        Best scores by (min_open_count, id), continuing after the
+        (min_open_count, id) `after` cursor.
+        """
+        query = db.query(self.model)
+        if user_id is not None:
+            query = query.filter(BestScore.user_id == user_id)
+        if after is not None:
+            query = query.filter(tuple_(BestScore.min_open_count, BestScore.id) > after)
+        return query.order_by(BestScore.min_open_count, BestScore.id).limit(limit).all()
+
+    def record(
+        self, db: Session, *, user_id: int, open_count: int
+    ) -> Optional[LeaderboardEntry]:
+        """
+        Lower the user's best score to `open_count` if it is better, with a
+        single INSERT ... ON CONFLICT DO UPDATE.
+
+        No commit, so it runs inside the caller's transaction. Returns the new
+        score for `leaderboard.record` once that transaction commits, `None`
+        if the score didn't improve.
+        """
+        row = db.execute(
+            _record_statement(self.table, user_id=user_id, open_count=open_count)
+        ).first()
+        if row is None:
+            return None
+        return LeaderboardEntry(row.min_open_count, row.id, user_id)
+
+    def record_game_end(
+        self, db: Session, *, user_id: int, open_count: int, finished_at: datetime
+    ) -> List[ScoreUpdate]:
+        """
+        `record` a game end in the all-time best scores, and in the daily and
+        weekly buckets of `finished_at` with one more upsert. No commit.
+
+        Returns the scores it improved, for `publish_scores` once the
+        caller's transaction commits. With the "postgres"
+        `settings.LEADERBOARD_EVENTS_BACKEND` they are also sent to the other
+        workers by a NOTIFY in that transaction.
+        """
+        updates: List[ScoreUpdate] = []
+        entry = self.record(db, user_id=user_id, open_count=open_count)
+        if entry is not None:
+            updates.append(ScoreUpdate("all", None, entry))
+        rows = db.execute(
+            _record_buckets_statement(
+                user_id=user_id, open_count=open_count, finished_at=finished_at
+            )
+        ).fetchall()
+        updates += _bucket_updates(rows, user_id)
+        if updates and settings.LEADERBOARD_EVENTS_BACKEND == "postgres":
+            db.execute(_notify_statement(updates))
+        return updates
+
+    def drop_expired_buckets(self, db: Session) -> int:
+        """
+        Delete the daily and weekly scores older than
+        `settings.LEADERBOARD_RETENTION_DAYS`, returning how many.
+        """
+        result = db.execute(_expired_buckets_statement(datetime.utcnow()))
+        db.commit()
+        return result.rowcount
+
+    def recompute(self, db: Session) -> None:
+        """
+        Rebuild every best score from the finished games, in one transaction
+        of set-based statements: an upsert of each owner's best game, a
+        delete of the scores left without one, and the daily and weekly
+        buckets within the retention rebuilt by one INSERT ... SELECT each.
+        API workers pick the new scores up at their next leaderboard reload,
+        right away with the "postgres" `settings.LEADERBOARD_EVENTS_BACKEND`.
+        """
+        games = CardGame.__table__  # type: ignore
+        table = self.table
+        best_games = (
+            select([games.c.owner_id, func.min(games.c.end_open_count)])
+            .where(games.c.end_open_count.isnot(None))
+            .group_by(games.c.owner_id)
+        )
+        statement = insert(table).from_select(["user_id", "min_open_count"], best_games)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[table.c.user_id],
+                set_={"min_open_count": statement.excluded.min_open_count},
+                where=table.c.min_open_count.is_distinct_from(
+                    statement.excluded.min_open_count
+                ),
+            )
+        )
+        db.execute(
+            delete(table).where(
+                ~exists().where(
+                    (games.c.owner_id == table.c.user_id)
+                    & games.c.end_open_count.isnot(None)
+                )
+            )
+        )
+        buckets = PeriodBestScore.__table__  # type: ignore
+        db.execute(delete(buckets))
+        oldest = datetime.utcnow() - timedelta(days=settings.LEADERBOARD_RETENTION_DAYS)
+        for period in BUCKETED_PERIODS:
+            # date_trunc('week', ...) starts weeks on Monday, as `bucket_start`
+            bucket = func.date_trunc(period, games.c.finished_at)
+            best_games = (
+                select(
+                    [
+                        literal(period),
+                        bucket,
+                        games.c.owner_id,
+                        func.min(games.c.end_open_count),
+                    ]
+                )
+                .where(games.c.finished_at >= bucket_start(period, oldest))
+                .group_by(bucket, games.c.owner_id)
+            )
+            db.execute(
+                insert(buckets).from_select(
+                    ["period", "bucket_start", "user_id", "min_open_count"], best_games
+                )
+            )
+        if settings.LEADERBOARD_EVENTS_BACKEND == "postgres":
+            db.execute(select([func.pg_notify(NOTIFY_CHANNEL, RELOAD_PAYLOAD)]))
+        db.commit()
+        for board in leaderboards.values():
+            board.expire()
+
+    def load_leaderboard(self, db: Session, *, period: str = "all") -> None:
+        """
+        Load the leaderboard of `period` if it holds no entries to serve yet,
+        or those of a past bucket. Later reloads are `refresh_leaderboard`'s,
+        run in the background.
+        """
+        if leaderboards[period].needs_load():
+            self._reload(db, leaderboards[period])
+
+    def refresh_leaderboard(self, db: Session, *, period: str = "all") -> None:
+        """
+        Reload the leaderboard of `period` from the table once it is older
+        than `settings.LEADERBOARD_RELOAD_SECONDS`, or its bucket is over.
+        """
+        if leaderboards[period].needs_reload():
+            self._reload(db, leaderboards[period])
+
+    def _reload(self, db: Session, board: Leaderboard) -> None:
+        if not board.begin_reload():
+            return
+        bucket = board.current_bucket()
+        entries: List[LeaderboardEntry] = []
+        after: Optional[Cursor] = None
+        try:
+            # The batches read one snapshot of the table, on a connection of
+            # their own: the caller's transaction may have begun already
+            with db.get_bind().connect() as connection:
+                connection = connection.execution_options(
+                    isolation_level="REPEATABLE READ"
+                )
+                with connection.begin():
+                    while True:
+                        batch = _to_entries(
+                            connection.execute(
+                                _leaderboard_query(
+                                    board.period,
+                                    bucket,
+                                    after=after,
+                                    limit=LEADERBOARD_BATCH_SIZE,
+                                )
+                            ).fetchall()
+                        )
+                        entries += batch
+                        after = _next_cursor(batch)
+                        if after is None:
+                            break
+        except BaseException:
+            board.abort_reload()
+            raise
+        board.replace(entries, bucket=bucket)
+
+
+class AsyncCRUDBestScore(AsyncCRUDBase[BestScore, BestScoreCreate, BestScoreUpdate]):
+    async def get_multi_ordered(
+        self,
+        db: Database,
+        *,
+        user_id: Optional[int] = None,
+        after: Optional[Cursor] = None,
+        limit: int = 100,
+    ) -> List[BestScore]:
+        query = select([self.table])
+        if user_id is not None:
+            query = query.where(self.table.c.user_id == user_id)
+        if after is not None:
+            query = query.where(
+                tuple_(self.table.c.min_open_count, self.table.c.id) > after
+            )
+        rows = await db.fetch_all(
+            query.order_by(self.table.c.min_open_count, self.table.c.id).limit(limit)
+        )
+        return [self.to_model(row) for row in rows]  # type: ignore
+
+    async def record(
+        self, db: Database, *, user_id: int, open_count: int
+    ) -> Optional[LeaderboardEntry]:
+        """
+        Async `CRUDBestScore.record`, runs inside the caller's transaction.
+        """
+        row = await db.fetch_one(
+            _record_statement(self.table, user_id=user_id, open_count=open_count)
+        )
+        if row is None:
+            return None
+        return LeaderboardEntry(row["min_open_count"], row["id"], user_id)
+
+    async def record_game_end(
+        self, db: Database, *, user_id: int, open_count: int, finished_at: datetime
+    ) -> List[ScoreUpdate]:
+        """
+        Async `CRUDBestScore.record_game_end`, runs inside the caller's
+        transaction.
+        """
+        updates: List[ScoreUpdate] = []
+        entry = await self.record(db, user_id=user_id, open_count=open_count)
+        if entry is not None:
+            updates.append(ScoreUpdate("all", None, entry))
+        rows = await db.fetch_all(
+            _record_buckets_statement(
+                user_id=user_id, open_count=open_count, finished_at=finished_at
+            )
+        )
+        updates += _bucket_updates(rows, user_id)
+        if updates and settings.LEADERBOARD_EVENTS_BACKEND == "postgres":
+            await db.execute(_notify_statement(updates))
+        return updates
+
+    async def drop_expired_buckets(self, db: Database) -> int:
+        """
+        Async `CRUDBestScore.drop_expired_buckets`. `databases` reports no
+        rowcount, the deleted rows are counted by the statement.
+        """
+        table = PeriodBestScore.__table__  # type: ignore
+        deleted = (
+            _expired_buckets_statement(datetime.utcnow())
+            .returning(table.c.user_id)
+            .cte("deleted")
+        )
+        return await db.fetch_val(select([func.count()]).select_from(deleted))
+
+    async def load_leaderboard(self, db: Database, *, period: str = "all") -> None:
+        if leaderboards[period].needs_load():
+            await self._reload(db, leaderboards[period])
+
+    async def refresh_leaderboard(self, db: Database, *, period: str = "all") -> None:
+        if leaderboards[period].needs_reload():
+            await self._reload(db, leaderboards[period])
+
+    async def _reload(self, db: Database, board: Leaderboard) -> None:
+        if not board.begin_reload():
+            return
+        bucket = board.current_bucket()
+        entries: List[LeaderboardEntry] = []
+        after: Optional[Cursor] = None
+        try:
+            # The batches read one snapshot of the table
+            async with db.transaction(isolation="repeatable_read"):
+                while True:
+                    batch = _to_entries(
+                        await db.fetch_all(
+                            _leaderboard_query(
+                                board.period,
+                                bucket,
+                                after=after,
+                                limit=LEADERBOARD_BATCH_SIZE,
+                            )
+                        )
+                    )
+                    entries += batch
+                    after = _next_cursor(batch)
+                    if after is None:
+                        break
+        except BaseException:
+            board.abort_reload()
+            raise
+        board.replace(entries, bucket=bucket)
+
+
+best_score = CRUDBestScore(BestScore)
+async_best_score = AsyncCRUDBestScore(BestScore)
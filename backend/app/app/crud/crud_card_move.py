@@ -0,0 +1,176 @@
+import io
+from typing import Any, List, Optional, Sequence, Tuple
+
+from databases import Database
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.game_state import GameState
+from app.core.move_log import MoveRecord, replay, snapshot_due
+from app.crud.async_base import AsyncCRUDBase
+from app.crud.base import CRUDBase
+from app.models.card_game import CardGame
+from app.models.card_move import CardGameSnapshot, CardMove
+from app.schemas.game import CardMoveCreate
+
+MOVE_COLUMNS = MoveRecord._fields
+
+
+def _snapshot_values(
+    moves: Sequence[MoveRecord], state: Optional[bytes]
+) -> Optional[dict]:
+    if state is None or not snapshot_due(
+        moves[0].seq, moves[-1].seq, settings.GAME_SNAPSHOT_MOVES
+    ):
+        return None
+    return {"game_id": moves[-1].game_id, "seq": moves[-1].seq, "state": state}
+
+
+def _latest_snapshot_query(*, game_id: int, seq: int) -> Any:
+    table = CardGameSnapshot.__table__  # type: ignore
+    return (
+        select([table.c.seq, table.c.state])
+        .where(table.c.game_id == game_id)
+        .where(table.c.seq <= seq)
+        .order_by(table.c.seq.desc())
+        .limit(1)
+    )
+
+
+def _positions_query(*, game_id: int, after_seq: int, seq: int) -> Any:
+    table = CardMove.__table__  # type: ignore
+    return (
+        select([table.c.position])
+        .where(table.c.game_id == game_id)
+        .where(table.c.seq > after_seq)
+        .where(table.c.seq <= seq)
+        .order_by(table.c.seq)
+    )
+
+
+def _replay_base(game: CardGame, snapshot: Any) -> Tuple[GameState, int]:
+    if snapshot is None:
+        return game.game_state.deal(), 0
+    return GameState.decode(snapshot["state"]), snapshot["seq"]
+
+
+def _replay(
+    state: GameState, base_seq: int, seq: int, rows: List[Any]
+) -> Optional[GameState]:
+    # Moves made before the log was enabled are missing
+    if len(rows) != seq - base_seq:
+        return None
+    return replay(state, (row["position"] for row in rows))
+
+
+class CRUDCardMove(CRUDBase[CardMove, CardMoveCreate, CardMoveCreate]):
+    def add_moves(
+        self,
+        db: Session,
+        *,
+        moves: Sequence[MoveRecord],
+        state: Optional[bytes] = None,
+    ) -> None:
+        """
+        Log `moves` of one game inside the caller's transaction, and keep
+        `state`, the game after the last of them, as a replay snapshot if they
+        pass a multiple of `GAME_SNAPSHOT_MOVES`.
+
+        A batch is streamed with COPY, a single move is an INSERT.
+        """
+        if not moves:
+            return
+        table = self.model.__table__  # type: ignore
+        if len(moves) == 1:
+            db.execute(insert(table).values(moves[0]._asdict()))
+        else:
+            rows = "".join(
+                f"{move.game_id}\t{move.seq}\t{move.position}\t{move.result}\t"
+                f"{move.created_at.isoformat()}\n"
+                for move in moves
+            )
+            with db.connection().connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY {table.name} ({', '.join(MOVE_COLUMNS)}) FROM STDIN",
+                    io.StringIO(rows),
+                )
+        snapshot = _snapshot_values(moves, state)
+        if snapshot is not None:
+            db.execute(insert(CardGameSnapshot.__table__).values(snapshot))
+
+    def get_multi_by_game(
+        self, db: Session, *, game_id: int, after_seq: int = 0, limit: int = 100
+    ) -> List[CardMove]:
+        return (
+            db.query(self.model)
+            .filter(CardMove.game_id == game_id, CardMove.seq > after_seq)
+            .order_by(CardMove.seq)
+            .limit(limit)
+            .all()
+        )
+
+    def get_state_at(
+        self, db: Session, *, game: CardGame, seq: int
+    ) -> Optional[GameState]:
+        """
+        State of `game` after move `seq` (0 for the deal): the latest snapshot
+        up to `seq` with the moves since replayed on it. `None` if the log
+        lacks some of those moves.
+        """
+        snapshot = db.execute(_latest_snapshot_query(game_id=game.id, seq=seq)).first()
+        state, base_seq = _replay_base(game, snapshot)
+        rows = db.execute(
+            _positions_query(game_id=game.id, after_seq=base_seq, seq=seq)
+        ).fetchall()
+        return _replay(state, base_seq, seq, rows)
+
+
+class AsyncCRUDCardMove(AsyncCRUDBase[CardMove, CardMoveCreate, CardMoveCreate]):
+    async def add_moves(
+        self,
+        db: Database,
+        *,
+        moves: Sequence[MoveRecord],
+        state: Optional[bytes] = None,
+    ) -> None:
+        """
+        Async `CRUDCardMove.add_moves`, runs inside the caller's transaction.
+        """
+        if not moves:
+            return
+        if len(moves) == 1:
+            await db.execute(insert(self.table).values(moves[0]._asdict()))
+        else:
+            await db.connection().raw_connection.copy_records_to_table(
+                self.table.name, records=moves, columns=MOVE_COLUMNS
+            )
+        snapshot = _snapshot_values(moves, state)
+        if snapshot is not None:
+            await db.execute(insert(CardGameSnapshot.__table__).values(snapshot))
+
+    async def get_multi_by_game(
+        self, db: Database, *, game_id: int, after_seq: int = 0, limit: int = 100
+    ) -> List[CardMove]:
+        rows = await db.fetch_all(
+            select([self.table])
+            .where(self.table.c.game_id == game_id)
+            .where(self.table.c.seq > after_seq)
+            .order_by(self.table.c.seq)
+            .limit(limit)
+        )
+        return [self.to_model(row) for row in rows]  # type: ignore
+
+    async def get_state_at(
+        self, db: Database, *, game: CardGame, seq: int
+    ) -> Optional[GameState]:
+        snapshot = await db.fetch_one(_latest_snapshot_query(game_id=game.id, seq=seq))
+        state, base_seq = _replay_base(game, snapshot)
+        rows = await db.fetch_all(
+            _positions_query(game_id=game.id, after_seq=base_seq, seq=seq)
+        )
+        return _replay(state, base_seq, seq, rows)
+
+
+card_move = CRUDCardMove(CardMove)
+async_card_move = AsyncCRUDCardMove(CardMove)
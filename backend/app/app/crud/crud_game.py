@@ -1,11 +1,67 @@
-from typing import List
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
 
+from databases import Database
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy import Column, Table, insert, select, update
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
+from app.core.config import settings
+from app.core.deck_pool import deck_pool
+from app.core.game_session import SessionSnapshot
+from app.core.game_state import GameState
+from app.core.leaderboard import ScoreUpdate, publish_scores
+from app.core.move_log import MoveRecord
+from app.crud.async_base import AsyncCRUDBase
 from app.crud.base import CRUDBase
+from app.crud.crud_best_score import async_best_score, best_score
+from app.crud.crud_card_move import async_card_move, card_move
+from app.crud.pagination import Page, PageCursor
 from app.models.card_game import CardGame
-from app.schemas.game import CardGameCreate, CardGameUpdate, GameInfoInDB
+from app.schemas.game import CardGameCreate, CardGameUpdate
+
+# Rows per INSERT of the async batch create, 7 parameters each
+ASYNC_INSERT_BATCH_SIZE = 1000
+
+
+class GameValidators(NamedTuple):
+    owner_id: int
+    version: int
+
+
+def _move_values(
+    table: Table, game_state: GameState, *, finished_at: Optional[datetime]
+) -> Dict:
+    # The row of a game after a move to `game_state`, with the time of the
+    # move if it ended the game
+    values = {
+        "state": game_state.encode(),
+        "open_count": table.c.open_count + 1,
+        "is_finished": game_state.is_game_end(),
+        "version": table.c.version + 1,
+    }
+    if finished_at is not None:
+        values["end_open_count"] = table.c.open_count + 1
+        values["finished_at"] = finished_at
+    return values
+
+
+def _snapshot_values(snapshot: SessionSnapshot) -> Dict:
+    values = {
+        "state": snapshot.state,
+        "open_count": snapshot.open_count,
+        "is_finished": snapshot.is_finished,
+        "version": snapshot.version,
+    }
+    if snapshot.end_open_count is not None:
+        values["end_open_count"] = snapshot.end_open_count
+        values["finished_at"] = snapshot.finished_at
+    return values
+
+
+def summary_columns(table: Table) -> List[Column]:
+    return [table.c.id, table.c.open_count, table.c.is_finished, table.c.created_at]
 
 
 class CRUDCardGame(CRUDBase[CardGame, CardGameCreate, CardGameUpdate]):
@@ -13,24 +69,288 @@ class CRUDCardGame(CRUDBase[CardGame, CardGameCreate, CardGameUpdate]):
         self, db: Session, *, obj_in: CardGameCreate, owner_id: int
     ) -> CardGame:
         obj_in_data = jsonable_encoder(obj_in)
-        obj_in_data["game_info"] = GameInfoInDB.build_random_game().dict()
-        db_obj = self.model(**obj_in_data, owner_id=owner_id)
-        db.add(db_obj)
+        obj_in_data["state"] = deck_pool.take(1, game_size=obj_in.pair_count)[0]
+        return self.insert_returning(db, {**obj_in_data, "owner_id": owner_id})
+
+    def create_multi_with_owners(
+        self, db: Session, *, owner_ids: List[int], pair_count: int
+    ) -> List[CardGame]:
+        """
+        One new game of `pair_count` pairs for each entry of `owner_ids`, in a
+        single multi-row INSERT ... RETURNING.
+        """
+        table = self.table
+        decks = deck_pool.take(len(owner_ids), game_size=pair_count)
+        created_at = datetime.utcnow()
+        values = [
+            {
+                "owner_id": owner_id,
+                "state": state,
+                "pair_count": pair_count,
+                "open_count": 0,
+                "is_finished": False,
+                "created_at": created_at,
+                "version": 1,
+            }
+            for owner_id, state in zip(owner_ids, decks)
+        ]
+        rows = db.execute(insert(table).values(values).returning(*table.c)).fetchall()
+        db.commit()
+        return [self.to_model(row) for row in rows]  # type: ignore
+
+    def open_card(self, db: Session, *, db_obj: CardGame, position: int) -> CardGame:
+        """
+        Apply one move and commit it in a single transaction, returning the
+        updated game as a transient instance.
+
+        The game is written with one UPDATE ... RETURNING guarded by the
+        version column, so a move that raced with another one raises
+        `sqlalchemy.orm.exc.StaleDataError` before the best score is touched.
+        """
+        game_state = db_obj.game_state
+        was_game_end = game_state.is_game_end()
+        result = game_state.accept_answer_if_in_condition(position)
+        now = datetime.utcnow()
+        ended = not was_game_end and game_state.is_game_end()
+        finished_at = now if ended else None
+        table = self.table
+        row = db.execute(
+            update(table)
+            .where(table.c.id == db_obj.id)
+            .where(table.c.version == db_obj.version)
+            .values(**_move_values(table, game_state, finished_at=finished_at))
+            .returning(*table.c)
+        ).first()
+        if row is None:
+            raise StaleDataError(f"CardGame {db_obj.id} was modified concurrently")
+        if settings.GAME_MOVE_LOG_ENABLED:
+            move = MoveRecord(row["id"], row["open_count"], position, result, now)
+            card_move.add_moves(db, moves=[move], state=row["state"])
+        scores: List[ScoreUpdate] = []
+        if ended:
+            scores = best_score.record_game_end(
+                db,
+                user_id=row["owner_id"],
+                open_count=row["open_count"],
+                finished_at=now,
+            )
         db.commit()
-        db.refresh(db_obj)
-        print("return", db_obj)
-        return db_obj
+        publish_scores(scores)
+        return self.to_model(row)  # type: ignore
+
+    def save_session(self, db: Session, *, snapshot: SessionSnapshot) -> None:
+        """
+        Write the moves of a game session up to `snapshot` with one UPDATE
+        guarded by the saved version, plus the best scores if one of them
+        ended the game, in a single transaction.
+
+        Raises `sqlalchemy.orm.exc.StaleDataError` if the game was changed
+        outside the session.
+        """
+        table = self.table
+        result = db.execute(
+            update(table)
+            .where(table.c.id == snapshot.id)
+            .where(table.c.version == snapshot.saved_version)
+            .values(**_snapshot_values(snapshot))
+        )
+        if result.rowcount != 1:
+            db.rollback()
+            raise StaleDataError(f"CardGame {snapshot.id} was modified concurrently")
+        if settings.GAME_MOVE_LOG_ENABLED:
+            card_move.add_moves(db, moves=snapshot.moves, state=snapshot.state)
+        scores: List[ScoreUpdate] = []
+        if snapshot.end_open_count is not None:
+            scores = best_score.record_game_end(
+                db,
+                user_id=snapshot.owner_id,
+                open_count=snapshot.end_open_count,
+                finished_at=snapshot.finished_at or datetime.utcnow(),
+            )
+        db.commit()
+        publish_scores(scores)
+
+    def get_validators(self, db: Session, *, id: int) -> Optional[GameValidators]:
+        """
+        The owner and version of game `id`, enough to answer a conditional
+        read without loading the game state.
+        """
+        row = (
+            db.query(CardGame.owner_id, CardGame.version)
+            .filter(CardGame.id == id)
+            .first()
+        )
+        return None if row is None else GameValidators(*row)
 
     def get_multi_by_owner(
-        self, db: Session, *, owner_id: int, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        owner_id: int,
+        cursor: Optional[PageCursor] = None,
+        limit: int = 100,
+    ) -> Page[CardGame]:
+        return self.paginate(
+            db.query(self.model).filter(CardGame.owner_id == owner_id),
+            cursor=cursor,
+            limit=limit,
+        )
+
+    def get_summaries(
+        self,
+        db: Session,
+        *,
+        owner_id: Optional[int] = None,
+        is_finished: Optional[bool] = None,
+        cursor: Optional[PageCursor] = None,
+        limit: int = 100,
+    ) -> Page[Any]:
+        """
+        A page of `schemas.CardGameSummary` rows by id, of one owner or all
+        of them, read without the game state.
+        """
+        query = db.query(*summary_columns(self.table))
+        if owner_id is not None:
+            query = query.filter(CardGame.owner_id == owner_id)
+        if is_finished is not None:
+            query = query.filter(CardGame.is_finished == is_finished)
+        return self.paginate(query, cursor=cursor, limit=limit)
+
+
+class AsyncCRUDCardGame(AsyncCRUDBase[CardGame, CardGameCreate, CardGameUpdate]):
+    async def create_with_owner(
+        self, db: Database, *, obj_in: CardGameCreate, owner_id: int
+    ) -> CardGame:
+        obj_in_data = jsonable_encoder(obj_in)
+        obj_in_data["state"] = deck_pool.take(1, game_size=obj_in.pair_count)[0]
+        row = await db.fetch_one(
+            insert(self.table)
+            .values(**self.insert_values(**obj_in_data, owner_id=owner_id))
+            .returning(*self.table.c)
+        )
+        return self.to_model(row)  # type: ignore
+
+    async def create_multi_with_owners(
+        self, db: Database, *, owner_ids: List[int], pair_count: int
     ) -> List[CardGame]:
-        return (
-            db.query(self.model)
-            .filter(CardGame.owner_id == owner_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
+        """
+        Async `CRUDCardGame.create_multi_with_owners`. asyncpg caps the bind
+        parameters of one statement, so rows go in INSERTs of
+        `ASYNC_INSERT_BATCH_SIZE` within one transaction.
+        """
+        decks = deck_pool.take(len(owner_ids), game_size=pair_count)
+        values = [
+            self.insert_values(owner_id=owner_id, state=state, pair_count=pair_count)
+            for owner_id, state in zip(owner_ids, decks)
+        ]
+        games: List[CardGame] = []
+        async with db.transaction():
+            for start in range(0, len(values), ASYNC_INSERT_BATCH_SIZE):
+                end = start + ASYNC_INSERT_BATCH_SIZE
+                rows = await db.fetch_all(
+                    insert(self.table)
+                    .values(values[start:end])
+                    .returning(*self.table.c)
+                )
+                games += [self.to_model(row) for row in rows]  # type: ignore
+        return games
+
+    async def open_card(
+        self, db: Database, *, db_obj: CardGame, position: int
+    ) -> CardGame:
+        """
+        Async `CRUDCardGame.open_card`: a single version-guarded
+        UPDATE ... RETURNING plus the best score statements, in one transaction.
+        """
+        game_state = db_obj.game_state
+        was_game_end = game_state.is_game_end()
+        result = game_state.accept_answer_if_in_condition(position)
+        now = datetime.utcnow()
+        ended = not was_game_end and game_state.is_game_end()
+        finished_at = now if ended else None
+        async with db.transaction():
+            row = await db.fetch_one(
+                update(self.table)
+                .where(self.table.c.id == db_obj.id)
+                .where(self.table.c.version == db_obj.version)
+                .values(**_move_values(self.table, game_state, finished_at=finished_at))
+                .returning(*self.table.c)
+            )
+            if row is None:
+                raise StaleDataError(f"CardGame {db_obj.id} was modified concurrently")
+            if settings.GAME_MOVE_LOG_ENABLED:
+                move = MoveRecord(row["id"], row["open_count"], position, result, now)
+                await async_card_move.add_moves(db, moves=[move], state=row["state"])
+            scores: List[ScoreUpdate] = []
+            if ended:
+                scores = await async_best_score.record_game_end(
+                    db,
+                    user_id=row["owner_id"],
+                    open_count=row["open_count"],
+                    finished_at=now,
+                )
+        publish_scores(scores)
+        return self.to_model(row)  # type: ignore
+
+    async def get_validators(
+        self, db: Database, *, id: int
+    ) -> Optional[GameValidators]:
+        row = await db.fetch_one(
+            select([self.table.c.owner_id, self.table.c.version]).where(
+                self.table.c.id == id
+            )
         )
+        return None if row is None else GameValidators(row["owner_id"], row["version"])
+
+    async def get_summaries(
+        self,
+        db: Database,
+        *,
+        owner_id: Optional[int] = None,
+        is_finished: Optional[bool] = None,
+        cursor: Optional[PageCursor] = None,
+        limit: int = 100,
+    ) -> Page[Any]:
+        """
+        Async `CRUDCardGame.get_summaries`.
+        """
+        query = select(summary_columns(self.table))
+        if owner_id is not None:
+            query = query.where(self.table.c.owner_id == owner_id)
+        if is_finished is not None:
+            query = query.where(self.table.c.is_finished == is_finished)
+        return await self.paginate(db, query, cursor=cursor, limit=limit)
+
+    async def save_session(self, db: Database, *, snapshot: SessionSnapshot) -> None:
+        """
+        Async `CRUDCardGame.save_session`.
+        """
+        async with db.transaction():
+            row = await db.fetch_one(
+                update(self.table)
+                .where(self.table.c.id == snapshot.id)
+                .where(self.table.c.version == snapshot.saved_version)
+                .values(**_snapshot_values(snapshot))
+                .returning(self.table.c.id)
+            )
+            if row is None:
+                raise StaleDataError(
+                    f"CardGame {snapshot.id} was modified concurrently"
+                )
+            if settings.GAME_MOVE_LOG_ENABLED:
+                await async_card_move.add_moves(
+                    db, moves=snapshot.moves, state=snapshot.state
+                )
+            scores: List[ScoreUpdate] = []
+            if snapshot.end_open_count is not None:
+                scores = await async_best_score.record_game_end(
+                    db,
+                    user_id=snapshot.owner_id,
+                    open_count=snapshot.end_open_count,
+                    finished_at=snapshot.finished_at or datetime.utcnow(),
+                )
+        publish_scores(scores)
 
 
 game = CRUDCardGame(CardGame)
+async_game = AsyncCRUDCardGame(CardGame)
@@ -1,9 +1,10 @@
-from typing import List
+from typing import Optional
 
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 
 from app.crud.base import CRUDBase
+from app.crud.pagination import Page, PageCursor
 from app.models.item import Item
 from app.schemas.item import ItemCreate, ItemUpdate
 
@@ -13,21 +14,20 @@ class CRUDItem(CRUDBase[Item, ItemCreate, ItemUpdate]):
         self, db: Session, *, obj_in: ItemCreate, owner_id: int
     ) -> Item:
         obj_in_data = jsonable_encoder(obj_in)
-        db_obj = self.model(**obj_in_data, owner_id=owner_id)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        return self.insert_returning(db, {**obj_in_data, "owner_id": owner_id})
 
     def get_multi_by_owner(
-        self, db: Session, *, owner_id: int, skip: int = 0, limit: int = 100
-    ) -> List[Item]:
-        return (
-            db.query(self.model)
-            .filter(Item.owner_id == owner_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
+        self,
+        db: Session,
+        *,
+        owner_id: int,
+        cursor: Optional[PageCursor] = None,
+        limit: int = 100,
+    ) -> Page[Item]:
+        return self.paginate(
+            db.query(self.model).filter(Item.owner_id == owner_id),
+            cursor=cursor,
+            limit=limit,
         )
 
 
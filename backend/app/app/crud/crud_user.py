@@ -1,55 +1,189 @@
-from typing import Any, Dict, Optional, Union
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Union
 
+from databases import Database
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.core.security import get_password_hash, verify_password
+from app.core.cache import build_cache
+from app.core.config import settings
+from app.core.security import (
+    get_password_hash,
+    token_denylist,
+    verify_and_update_password,
+    verify_and_update_password_async,
+)
+from app.crud.async_base import AsyncCRUDBase
 from app.crud.base import CRUDBase
 from app.models.user import User
-from app.schemas.user import UserCreate, UserUpdate
+from app.schemas.user import UserCreate, UserPrincipal, UserUpdate
+
+principal_cache = build_cache(
+    settings.USER_CACHE_BACKEND,
+    namespace="user-principal",
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    url=settings.USER_CACHE_URL,
+)
+
+
+def _cached_principal(id: Any) -> Optional[UserPrincipal]:
+    cached = principal_cache.get(str(id))
+    return None if cached is None else UserPrincipal(*cached)
+
+
+def _cache_principal(user: User) -> UserPrincipal:
+    principal = UserPrincipal(user.id, user.is_active, user.is_superuser)
+    principal_cache.set(str(user.id), list(principal))
+    return principal
+
+
+def _changes_principal(db_obj: User, update_data: Dict[str, Any]) -> bool:
+    return any(
+        field in update_data and update_data[field] != getattr(db_obj, field)
+        for field in ("is_active", "is_superuser")
+    )
+
+
+@contextmanager
+def _revoking_embedded_principal(id: Any, *, revoke: bool = True) -> Iterator[None]:
+    """
+    Revoke the tokens of user `id`, whose claims would keep authorizing with
+    its old flags, around the change: before it, so an unavailable denylist
+    aborts it with `CacheUnavailable`, and after it for the tokens issued
+    meanwhile.
+    """
+    revoke = revoke and settings.ACCESS_TOKEN_EMBED_PRINCIPAL
+    if revoke:
+        token_denylist.revoke_user(id)
+    yield
+    if revoke:
+        token_denylist.revoke_user(id)
 
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
+    sort_columns = ("id", "email")
+
+    def get_principal(self, db: Session, id: Any) -> Optional[UserPrincipal]:
+        """
+        `UserPrincipal` of the user `id`, read through `principal_cache`.
+        """
+        principal = _cached_principal(id)
+        if principal is not None:
+            return principal
+        user = self.get(db, id=id)
+        if not user:
+            return None
+        return _cache_principal(user)
+
     def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
         return db.query(User).filter(User.email == email).first()
 
     def create(self, db: Session, *, obj_in: UserCreate) -> User:
-        db_obj = User(
-            email=obj_in.email,
-            hashed_password=get_password_hash(obj_in.password),
-            full_name=obj_in.full_name,
-            is_superuser=obj_in.is_superuser,
+        return self.insert_returning(
+            db,
+            {
+                "email": obj_in.email,
+                "hashed_password": get_password_hash(obj_in.password),
+                "full_name": obj_in.full_name,
+                "is_superuser": obj_in.is_superuser,
+            },
         )
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
 
     def update(
         self, db: Session, *, db_obj: User, obj_in: Union[UserUpdate, Dict[str, Any]]
-    ) -> User:
+    ) -> Optional[User]:
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
-        if update_data["password"]:
+        if update_data.get("password"):
             hashed_password = get_password_hash(update_data["password"])
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
-        return super().update(db, db_obj=db_obj, obj_in=update_data)
+        id = db_obj.id
+        with _revoking_embedded_principal(
+            id, revoke=_changes_principal(db_obj, update_data)
+        ):
+            updated = super().update(db, db_obj=db_obj, obj_in=update_data)
+        principal_cache.delete(str(id))
+        return updated
 
-    def authenticate(self, db: Session, *, email: str, password: str) -> Optional[User]:
+    def remove(self, db: Session, *, id: int) -> User:
+        with _revoking_embedded_principal(id):
+            db_obj = super().remove(db, id=id)
+        principal_cache.delete(str(id))
+        return db_obj
+
+    def _get_for_login(self, db: Session, *, email: str) -> Optional[User]:
         user = self.get_by_email(db, email=email)
+        if user:
+            # Give the connection back to the pool while the password is
+            # checked, the loaded user stays usable as a detached instance
+            db.expunge(user)
+            db.commit()
+        return user
+
+    def _store_upgraded_hash(self, db: Session, *, user: User, new_hash: str) -> None:
+        # Made with an outdated BCRYPT_ROUNDS, store the upgraded hash
+        db.query(User).filter(User.id == user.id).update(
+            {User.hashed_password: new_hash}, synchronize_session=False
+        )
+        db.commit()
+        user.hashed_password = new_hash
+
+    def authenticate(self, db: Session, *, email: str, password: str) -> Optional[User]:
+        user = self._get_for_login(db, email=email)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        verified, new_hash = verify_and_update_password(password, user.hashed_password)
+        if not verified:
             return None
+        if new_hash:
+            self._store_upgraded_hash(db, user=user, new_hash=new_hash)
         return user
 
-    def is_active(self, user: User) -> bool:
+    async def authenticate_async(
+        self, db: Session, *, email: str, password: str
+    ) -> Optional[User]:
+        """
+        `authenticate` for async endpoints: the queries run in the threadpool
+        and bcrypt in the password hashing pool, so a login waiting for its
+        hash holds neither a thread nor a connection.
+        """
+        user = await run_in_threadpool(self._get_for_login, db, email=email)
+        if not user:
+            return None
+        verified, new_hash = await verify_and_update_password_async(
+            password, user.hashed_password
+        )
+        if not verified:
+            return None
+        if new_hash:
+            await run_in_threadpool(
+                self._store_upgraded_hash, db, user=user, new_hash=new_hash
+            )
+        return user
+
+    def is_active(self, user: Union[User, UserPrincipal]) -> bool:
         return user.is_active
 
-    def is_superuser(self, user: User) -> bool:
+    def is_superuser(self, user: Union[User, UserPrincipal]) -> bool:
         return user.is_superuser
 
 
+class AsyncCRUDUser(AsyncCRUDBase[User, UserCreate, UserUpdate]):
+    sort_columns = ("id", "email")
+
+    async def get_principal(self, db: Database, id: Any) -> Optional[UserPrincipal]:
+        principal = _cached_principal(id)
+        if principal is not None:
+            return principal
+        user = await self.get(db, id=id)
+        if not user:
+            return None
+        return _cache_principal(user)
+
+
 user = CRUDUser(User)
+async_user = AsyncCRUDUser(User)
@@ -0,0 +1,114 @@
+import base64
+import binascii
+import json
+from typing import Any, Generic, List, Mapping, NamedTuple, Optional, Tuple, TypeVar
+
+from sqlalchemy import Column, tuple_
+from sqlalchemy.sql.elements import ClauseElement
+
+T = TypeVar("T")
+
+# Keyset pagination: a page is the `limit` rows after (or before) the
+# (sort column, id) key of a row, read in index order with no OFFSET to walk,
+# so every page costs the same however deep it is.
+
+
+class PageCursor(NamedTuple):
+    sort: str
+    before: bool  # the page ends before `key`, instead of starting after it
+    key: Tuple[Any, int]
+
+
+class Page(Generic[T]):
+    """
+    Rows of one page, with the cursors of its neighbours, `None` at either
+    end of the listing.
+    """
+
+    def __init__(
+        self, items: List[T], next_cursor: Optional[str], prev_cursor: Optional[str]
+    ) -> None:
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+
+def encode_page_cursor(cursor: PageCursor) -> str:
+    data = json.dumps(
+        [cursor.sort, cursor.before, *cursor.key], separators=(",", ":")
+    ).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_page_cursor(cursor: str, sort_types: Mapping[str, type]) -> PageCursor:
+    """
+    `sort_types` are the python types of the sortable columns by name. Raises
+    `ValueError` on a malformed cursor, or one for another listing.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort, before, value, id = json.loads(data)
+    except (binascii.Error, TypeError, ValueError):
+        raise ValueError(f"Malformed cursor {cursor!r}")
+    if (
+        sort not in sort_types
+        or not isinstance(before, bool)
+        or type(value) is not sort_types[sort]
+        or type(id) is not int
+    ):
+        raise ValueError(f"Malformed cursor {cursor!r}")
+    return PageCursor(sort, before, (value, id))
+
+
+def keyset_order(
+    sort_column: Column, id_column: Column, cursor: Optional[PageCursor]
+) -> Tuple[Optional[ClauseElement], List[ClauseElement]]:
+    """
+    The WHERE clause (`None` for the first page) and ORDER BY of the page of
+    `cursor`. Pages before a key are read backwards from it.
+    """
+    columns = [id_column] if sort_column is id_column else [sort_column, id_column]
+    if cursor is None:
+        return None, [column.asc() for column in columns]
+    if len(columns) == 1:
+        key, value = id_column, cursor.key[1]
+    else:
+        key, value = tuple_(*columns), cursor.key
+    if cursor.before:
+        return key < value, [column.desc() for column in columns]
+    return key > value, [column.asc() for column in columns]
+
+
+def build_page(
+    rows: List[T], *, sort: str, cursor: Optional[PageCursor], limit: int
+) -> Page[T]:
+    """
+    The page of `rows`, read in the order of `keyset_order` with one row more
+    than `limit` to tell whether another page follows.
+    """
+    backwards = cursor is not None and cursor.before
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        # Past either end of the listing, the way back starts at the cursor
+        if cursor is None:
+            return Page(rows, None, None)
+        back = encode_page_cursor(cursor._replace(before=not cursor.before))
+        return Page(rows, back, None) if backwards else Page(rows, None, back)
+
+    def at(row: T, *, before: bool) -> str:
+        key = (getattr(row, sort), getattr(row, "id"))
+        return encode_page_cursor(PageCursor(sort, before, key))
+
+    # Rows on the side a cursor came from are taken to still be there
+    if backwards:
+        more_after, more_before = True, has_more
+    else:
+        more_after, more_before = has_more, cursor is not None
+    return Page(
+        rows,
+        at(rows[-1], before=False) if more_after else None,
+        at(rows[0], before=True) if more_before else None,
+    )
@@ -0,0 +1,23 @@
+from typing import Optional
+
+from databases import Database
+
+from app.core.config import settings
+from app.db.profiling import ProfiledDatabase
+
+_database: Optional[Database] = None
+
+
+def get_database() -> Database:
+    """
+    The connection pool of the async database layer, created on first use:
+    its asyncpg backend is only imported with `settings.ASYNC_DB_ENABLED`.
+    """
+    global _database
+    if _database is None:
+        _database = (ProfiledDatabase if settings.PROFILING_ENABLED else Database)(
+            settings.SQLALCHEMY_DATABASE_URI,
+            min_size=settings.ASYNC_DB_POOL_MIN_SIZE,
+            max_size=settings.ASYNC_DB_POOL_MAX_SIZE,
+        )
+    return _database
@@ -0,0 +1,88 @@
+import logging
+import select
+import threading
+from typing import Callable
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationListener(threading.Thread):
+    """
+    LISTENs on `channel` over a dedicated connection, outside the pools, and
+    hands the payload of each notification to `callback` in this thread.
+
+    Once LISTENing on a connection it calls `on_listen`: the notifications
+    sent before are gone. After a lost connection it reconnects every
+    `retry_seconds`.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        channel: str,
+        callback: Callable[[str], None],
+        *,
+        on_listen: Callable[[], None],
+        retry_seconds: float = 5.0,
+        poll_seconds: float = 1.0,
+    ) -> None:
+        super().__init__(name=f"listen-{channel}", daemon=True)
+        self.dsn = dsn
+        self.channel = channel
+        self.callback = callback
+        self.on_listen = on_listen
+        self.retry_seconds = retry_seconds
+        self.poll_seconds = poll_seconds
+        self._stopped = threading.Event()
+        self._listening = threading.Event()
+
+    @property
+    def listening(self) -> bool:
+        """
+        Whether notifications are being received.
+        """
+        return self._listening.is_set()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                conn = psycopg2.connect(self.dsn)
+            except psycopg2.Error:
+                logger.exception("Connecting to LISTEN on %s failed", self.channel)
+                self._stopped.wait(self.retry_seconds)
+                continue
+            try:
+                self._listen(conn)
+            except psycopg2.Error:
+                logger.exception("Lost the LISTEN connection of %s", self.channel)
+                self._stopped.wait(self.retry_seconds)
+            finally:
+                self._listening.clear()
+                conn.close()
+
+    def _listen(self, conn: "psycopg2.extensions.connection") -> None:
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        # Only once LISTENing, so that nothing sent meanwhile is missed
+        self._listening.set()
+        self.on_listen()
+        while not self._stopped.is_set():
+            readable, _, _ = select.select([conn], [], [], self.poll_seconds)
+            if not readable:
+                continue
+            conn.poll()
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                try:
+                    self.callback(notify.payload)
+                except Exception:
+                    logger.exception(
+                        "Handling a notification on %s failed", self.channel
+                    )
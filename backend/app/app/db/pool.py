@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from app.core.metrics import Histogram
+
+
+class PoolStats:
+    """
+    Connection pool counters of this worker process.
+    """
+
+    def __init__(self) -> None:
+        self.wait_time = Histogram()
+        self.checkout_latency = Histogram()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.pings = 0
+        self.ping_failures = 0
+        self._lock = threading.Lock()
+
+    def incr(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that records how long checkouts wait for a connection
+    (`wait_time`) and how long the whole checkout takes, liveness ping and
+    checkout events included (`checkout_latency`).
+    """
+
+    _local = threading.local()
+
+    def connect(self) -> Any:
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            stats.checkout_latency.observe(time.perf_counter() - start)
+            stats.incr("checkouts")
+
+    def _do_get(self) -> Any:
+        # QueuePool._do_get retries by calling itself, only time the outer call
+        if getattr(self._local, "in_get", False):
+            return super()._do_get()
+        self._local.in_get = True
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            stats.incr("timeouts")
+            raise
+        finally:
+            self._local.in_get = False
+            stats.wait_time.observe(time.perf_counter() - start)
+
+
+def instrument_engine(engine: Engine, *, pre_ping: str, idle_seconds: float) -> None:
+    """
+    Count new connections and, for the "idle" pre-ping strategy, ping
+    connections on checkout only when they sat in the pool for more than
+    `idle_seconds` instead of paying a round trip on every checkout.
+
+    A failed ping raises `DisconnectionError`, the pool then discards the
+    connection and retries the checkout with a fresh one.
+    """
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+        stats.incr("connects")
+        connection_record.info["checkin_time"] = time.monotonic()
+
+    if pre_ping != "idle":
+        return
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection: Any, connection_record: Any) -> None:
+        connection_record.info["checkin_time"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(
+        dbapi_connection: Any, connection_record: Any, connection_proxy: Any
+    ) -> None:
+        if time.monotonic() - connection_record.info["checkin_time"] < idle_seconds:
+            return
+        stats.incr("pings")
+        try:
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            finally:
+                cursor.close()
+        except Exception:
+            stats.incr("ping_failures")
+            raise exc.DisconnectionError()
+
+
+def pool_status(engine: Engine) -> Dict[str, Any]:
+    pool = engine.pool
+    return {
+        "pid": os.getpid(),
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "checkouts": stats.checkouts,
+        "timeouts": stats.timeouts,
+        "connects": stats.connects,
+        "pings": stats.pings,
+        "ping_failures": stats.ping_failures,
+        "wait_time": stats.wait_time.snapshot(),
+        "checkout_latency": stats.checkout_latency.snapshot(),
+    }
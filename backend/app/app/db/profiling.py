@@ -0,0 +1,91 @@
+import time
+from typing import Any
+
+from databases import Database
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.profiling import current_profile
+
+
+def instrument_statements(engine: Engine, session_factory: sessionmaker) -> None:
+    """
+    Count the statements of `engine` and time them (`db` phase) and its
+    commits (`commit` phase) in the profile of the current request.
+
+    Statements sent on the raw DBAPI connection, like the COPY of
+    `crud.card_move.add_moves`, are not seen.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn: Any,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        if current_profile() is not None:
+            context._profile_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(
+        conn: Any,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        profile = current_profile()
+        start = getattr(context, "_profile_start", None)
+        if profile is not None and start is not None:
+            profile.statement(time.perf_counter() - start)
+
+    # The engine reports a commit just before the COMMIT is sent, the session
+    # once it is done
+    @event.listens_for(engine, "commit")
+    def on_commit(conn: Any) -> None:
+        profile = current_profile()
+        if profile is not None:
+            profile.begin("commit")
+
+    @event.listens_for(session_factory, "after_commit")
+    def after_commit(session: Any) -> None:
+        profile = current_profile()
+        if profile is not None:
+            profile.end("commit")
+
+
+class ProfiledDatabase(Database):
+    """
+    `Database` counting and timing its queries in the profile of the current
+    request, as `instrument_statements` does for the sync engine.
+    """
+
+    async def _profiled(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        profile = current_profile()
+        if profile is None:
+            return await getattr(super(), method)(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return await getattr(super(), method)(*args, **kwargs)
+        finally:
+            profile.statement(time.perf_counter() - start)
+
+    async def fetch_all(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._profiled("fetch_all", *args, **kwargs)
+
+    async def fetch_one(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._profiled("fetch_one", *args, **kwargs)
+
+    async def fetch_val(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._profiled("fetch_val", *args, **kwargs)
+
+    async def execute(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._profiled("execute", *args, **kwargs)
+
+    async def execute_many(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._profiled("execute_many", *args, **kwargs)
@@ -1,8 +1,33 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from typing import Optional
+
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from starlette.middleware.cors import CORSMiddleware
 
+from app.api.active_games import (
+    close_journal,
+    recover_sessions,
+    save_idle_sessions,
+    save_idle_sessions_forever,
+)
 from app.api.api_v1.api import api_router
+from app.api.leaderboard_buckets import drop_expired_buckets_forever
+from app.api.leaderboard_events import start_leaderboard_events, stop_leaderboard_events
+from app.api.profiling import (
+    ProfilingMiddleware,
+    bearer_token_matches,
+    instrument_routes,
+    prometheus_text,
+)
+from app.core.cache import CacheUnavailable
 from app.core.config import settings
+from app.core.hashing import PasswordHasherBusy
+from app.core.security import password_hasher
+from app.db.async_session import get_database
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title=settings.PROJECT_NAME, openapi_url=f"{settings.API_V1_STR}/openapi.json"
@@ -19,3 +44,107 @@ if settings.BACKEND_CORS_ORIGINS:
     )
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
+
+if settings.PROFILING_ENABLED:
+
+    if settings.PROFILING_METRICS_TOKEN:
+
+        @app.get("/metrics", include_in_schema=False)
+        def read_metrics(authorization: str = Header(None)) -> PlainTextResponse:
+            if not bearer_token_matches(
+                authorization, settings.PROFILING_METRICS_TOKEN
+            ):
+                raise HTTPException(status_code=403, detail="Not authenticated")
+            return PlainTextResponse(
+                prometheus_text(), media_type="text/plain; version=0.0.4"
+            )
+
+    instrument_routes(app.routes)
+    app.add_middleware(
+        ProfilingMiddleware,
+        sampler_token=settings.PROFILING_SAMPLER_TOKEN,
+        sample_interval=settings.PROFILING_SAMPLE_INTERVAL,
+    )
+
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(
+    request: Request, exc: PasswordHasherBusy
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many password checks in progress, retry later"},
+        headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER)},
+    )
+
+
+# Only the token denylist is strict, a revoked token must not get through
+@app.exception_handler(CacheUnavailable)
+async def cache_unavailable_handler(
+    request: Request, exc: CacheUnavailable
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Token revocations are unavailable, retry later"},
+    )
+
+
+@app.on_event("startup")
+def warn_memory_token_denylist() -> None:
+    if settings.TOKEN_DENYLIST_BACKEND == "memory":
+        logger.warning(
+            "Revoked tokens are kept in this worker only and forgotten on "
+            "restart, set TOKEN_DENYLIST_BACKEND=redis to share and keep them"
+        )
+
+
+@app.on_event("shutdown")
+def shutdown_password_hasher() -> None:
+    password_hasher.shutdown()
+
+
+idle_sessions_task: Optional[asyncio.Task] = None
+expired_buckets_task: Optional[asyncio.Task] = None
+
+
+# Registered before the async database shutdown below, so sessions are saved
+# while the database is still connected
+@app.on_event("shutdown")
+async def save_active_games() -> None:
+    if idle_sessions_task is not None:
+        idle_sessions_task.cancel()
+    await save_idle_sessions(idle_seconds=0)
+    close_journal()
+
+
+@app.on_event("shutdown")
+async def stop_leaderboard_compaction() -> None:
+    if expired_buckets_task is not None:
+        expired_buckets_task.cancel()
+    stop_leaderboard_events()
+
+
+if settings.ASYNC_DB_ENABLED:
+
+    @app.on_event("startup")
+    async def connect_async_db() -> None:
+        await get_database().connect()
+
+    @app.on_event("shutdown")
+    async def disconnect_async_db() -> None:
+        await get_database().disconnect()
+
+
+# After the async database startup above
+@app.on_event("startup")
+async def start_active_games() -> None:
+    global idle_sessions_task
+    await recover_sessions()
+    idle_sessions_task = asyncio.ensure_future(save_idle_sessions_forever())
+
+
+@app.on_event("startup")
+async def start_leaderboard_compaction() -> None:
+    global expired_buckets_task
+    expired_buckets_task = asyncio.ensure_future(drop_expired_buckets_forever())
+    start_leaderboard_events()
@@ -1,3 +1,4 @@
 from .card_game import CardGame
+from .card_move import CardGameSnapshot, CardMove
 from .item import Item
 from .user import User
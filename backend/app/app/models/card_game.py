@@ -1,8 +1,19 @@
-from typing import TYPE_CHECKING
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict
 
-from sqlalchemy import JSON, Column, ForeignKey, Integer
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+)
 from sqlalchemy.orm import relationship
 
+from app.core.game_state import GameState
 from app.db.base_class import Base
 
 if TYPE_CHECKING:
@@ -13,12 +24,77 @@ class CardGame(Base):
     id = Column(Integer, primary_key=True, index=True)
     owner_id = Column(Integer, ForeignKey("user.id"))
     owner = relationship("User", back_populates="card_games")
-    game_info = Column(JSON)
+    state = Column(LargeBinary)
+    pair_count = Column(Integer, nullable=False)
     open_count = Column(Integer, default=0)
+    version = Column(Integer, nullable=False, default=1)
+    # Kept in step with `state` by every write, so game listings never read it
+    is_finished = Column(Boolean, nullable=False, default=False)
+    # open_count of the move that ended the game, the moves after it don't count
+    end_open_count = Column(Integer)
+    # When that move was made, it places the game in the periodic leaderboards
+    finished_at = Column(DateTime)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # Every UPDATE is guarded by `WHERE version = <loaded version>`, so a move
+    # applied concurrently raises StaleDataError instead of being lost.
+    __mapper_args__ = {"version_id_col": version}
+
+    # A user's games in id order, all of them or the finished or unfinished
+    # ones: keyset pagination walks them without sorting
+    __table_args__ = (
+        Index("ix_cardgame_owner_id_id", "owner_id", "id"),
+        Index("ix_cardgame_owner_id_is_finished_id", "owner_id", "is_finished", "id"),
+    )
+
+    @property
+    def game_state(self) -> GameState:
+        return GameState.decode(self.state)
+
+    @property
+    def total_card(self) -> int:
+        return self.pair_count * 2
+
+    @property
+    def game_info(self) -> Dict[str, Any]:
+        game_state = self.game_state
+        return {**game_state.to_game_info(), "is_game_end": game_state.is_game_end()}
 
 
 class BestScore(Base):
     id = Column(Integer, primary_key=True, index=True)
     min_open_count = Column(Integer, default=999)
-    user_id = Column(Integer, ForeignKey("user.id"))
+    user_id = Column(Integer, ForeignKey("user.id"), unique=True, index=True)
     user = relationship("User", back_populates="best_score")
+
+    # Leaderboard order, keyset pagination walks it without sorting
+    __table_args__ = (Index("ix_bestscore_min_open_count_id", "min_open_count", "id"),)
+
+
+# A user's best score among the games finished in the day or week starting at
+# `bucket_start` (UTC), upserted at each game end like `BestScore`
+class PeriodBestScore(Base):
+    id = Column(Integer, primary_key=True, index=True)
+    period = Column(String(8), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    user_id = Column(Integer, ForeignKey("user.id"), nullable=False)
+    min_open_count = Column(Integer, nullable=False)
+
+    # One score per user and bucket, upserted on the first index. The second
+    # is the leaderboard order of a bucket, and drops expired buckets by range
+    __table_args__ = (
+        Index(
+            "ix_periodbestscore_period_bucket_start_user_id",
+            "period",
+            "bucket_start",
+            "user_id",
+            unique=True,
+        ),
+        Index(
+            "ix_periodbestscore_period_bucket_start_min_open_count_id",
+            "period",
+            "bucket_start",
+            "min_open_count",
+            "id",
+        ),
+    )
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, LargeBinary, SmallInteger
+
+from app.db.base_class import Base
+
+
+# Append-only log of every move, keyed by (game_id, seq) with seq the
+# open_count after the move, so the primary key index serves replays in order
+class CardMove(Base):
+    game_id = Column(
+        Integer, ForeignKey("cardgame.id", ondelete="CASCADE"), primary_key=True
+    )
+    seq = Column(Integer, primary_key=True)
+    position = Column(Integer, nullable=False)
+    result = Column(SmallInteger, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+
+# Packed `GameState` after move `seq`, replays start from the latest one
+class CardGameSnapshot(Base):
+    game_id = Column(
+        Integer, ForeignKey("cardgame.id", ondelete="CASCADE"), primary_key=True
+    )
+    seq = Column(Integer, primary_key=True)
+    state = Column(LargeBinary, nullable=False)
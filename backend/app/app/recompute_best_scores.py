@@ -0,0 +1,21 @@
+import logging
+
+from app import crud
+from app.db.session import SessionLocal
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    logger.info("Recomputing best scores")
+    db = SessionLocal()
+    try:
+        crud.best_score.recompute(db)
+    finally:
+        db.close()
+    logger.info("Best scores recomputed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,22 @@
+from .db_pool import DBPoolStats
 from .game import (
     BestScore,
+    BestScoreCreate,
+    BestScoreUpdate,
     CardGame,
+    CardGameBatchCreate,
     CardGameCreate,
+    CardGameDelta,
     CardGameInDB,
+    CardGameSummary,
+    CardMove,
+    CardMoveCreate,
     GameInfo,
     GameInfoInDB,
+    RankedBestScore,
 )
 from .item import Item, ItemCreate, ItemInDB, ItemUpdate
 from .msg import Msg
+from .page import Page
 from .token import Token, TokenPayload
-from .user import User, UserCreate, UserInDB, UserUpdate
+from .user import User, UserCreate, UserInDB, UserPrincipal, UserUpdate
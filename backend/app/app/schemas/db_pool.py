@@ -0,0 +1,29 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class HistogramBucket(BaseModel):
+    le: Optional[float]  # None for +Inf
+    count: int
+
+
+class Histogram(BaseModel):
+    count: int
+    sum: float
+    buckets: List[HistogramBucket]
+
+
+class DBPoolStats(BaseModel):
+    pid: int
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    connects: int
+    pings: int
+    ping_failures: int
+    wait_time: Histogram
+    checkout_latency: Histogram
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 import random
+from datetime import datetime
 from typing import Dict, List, Optional
 
-from pydantic import BaseModel, root_validator
+from pydantic import BaseModel, Field
 
 from app.core.config import settings
+from app.core.shuffle import MAX_GAME_SIZE, default_rng, shuffled_deck
 
 
 class GameInfoInDB(BaseModel):
@@ -14,43 +16,14 @@ class GameInfoInDB(BaseModel):
     display_by_answer: Dict[int, str]  # positions
 
     @staticmethod
-    def build_random_game() -> GameInfoInDB:
-        number_displays = [str(idx + 1) for idx in range(settings.GAME_SIZE)] * 2
-        solutions = []
-        for _ in [idx for idx in range(settings.GAME_SIZE)] * 2:
-            card_display_index = random.choice(range(len(number_displays)))
-            card_display = number_displays.pop(card_display_index)
-            solutions.append(card_display)
+    def build_random_game(rng: random.Random = default_rng) -> GameInfoInDB:
+        deck = shuffled_deck(settings.GAME_SIZE, rng)
         return GameInfoInDB(
-            display_by_position=solutions,
+            display_by_position=[str(display) for display in deck],
             answer_as_position_in_sequence=[],
             display_by_answer={},
         )
 
-    def should_accept_answer(self, answer_position: int) -> bool:
-        if len(self.answer_as_position_in_sequence) == len(self.display_by_position):
-            return False
-        if len(self.answer_as_position_in_sequence) % 2 == 0:
-            return True
-        if (
-            self.display_by_position[self.answer_as_position_in_sequence[-1]]
-            == self.display_by_position[answer_position]
-        ):
-            return True
-
-    def accept_answer_if_in_condition(self, answer_position: int) -> None:
-        if self.should_accept_answer(answer_position):
-            self.answer_as_position_in_sequence.append(answer_position)
-            self.display_by_answer[answer_position] = self.display_by_position[
-                answer_position
-            ]
-        else:
-            if len(self.answer_as_position_in_sequence) % 2 == 1:
-                self.answer_as_position_in_sequence.pop()
-
-    def is_game_end(self) -> bool:
-        return len(self.answer_as_position_in_sequence) == len(self.display_by_position)
-
 
 # Shared properties
 class CardGameBase(BaseModel):
@@ -60,18 +33,27 @@ class CardGameBase(BaseModel):
 
 # Properties to receive on CardGame creation
 class CardGameCreate(BaseModel):
-    pass
+    pair_count: int = Field(settings.GAME_SIZE, ge=1, le=MAX_GAME_SIZE)
 
 
-# Properties to receive on CardGame update
-class CardGameUpdate(CardGameBase):
-    pass
+# Properties to receive on batch CardGame creation: `count` games for each
+# owner, the current user if `owner_ids` is not given
+class CardGameBatchCreate(CardGameCreate):
+    count: int = Field(1, ge=1)
+    owner_ids: Optional[List[int]] = None
+
+
+# Properties to receive on CardGame update. The game itself, packed in
+# `models.CardGame.state`, only changes by its moves
+class CardGameUpdate(BaseModel):
+    open_count: Optional[int] = None
 
 
 # Properties shared by models stored in DB
 class CardGameInDBBase(CardGameBase):
     id: int
     owner_id: int
+    version: int
 
     class Config:
         orm_mode = True
@@ -80,20 +62,14 @@ class CardGameInDBBase(CardGameBase):
 class GameInfo(BaseModel):
     answer_as_position_in_sequence: List[int]
     display_by_answer: Dict[int, str]
-    is_game_end: Optional[bool]
-
-    @root_validator
-    def validate_date(cls, values):
-        values["is_game_end"] = (
-            len(values["answer_as_position_in_sequence"]) == settings.GAME_SIZE * 2
-        )
-        return values
+    is_game_end: bool
 
 
 # Properties to return to client
 class CardGame(CardGameInDBBase):
     game_info: GameInfo
-    total_card: int = settings.GAME_SIZE * 2
+    pair_count: int
+    total_card: int
 
     class Config:
         schema_extra = {
@@ -110,20 +86,74 @@ class CardGame(CardGameInDBBase):
                 "open_count": 0,
                 "id": 0,
                 "owner_id": 0,
+                "version": 1,
+                "pair_count": 6,
                 "total_card": 12,
             }
         }
 
 
+# Properties to return to client for a move in delta mode, only what the move
+# changed
+class CardGameDelta(BaseModel):
+    id: int
+    version: int
+    open_count: int
+    revealed: Dict[int, str]  # positions turned face up: display
+    hidden: List[int]  # positions turned face down
+    is_game_end: bool
+
+
 # Properties properties stored in DB
 class CardGameInDB(CardGameInDBBase):
     pass
 
 
-class BestScore(BaseModel):
+# Properties to return to client in game listings, read without the state
+class CardGameSummary(BaseModel):
     id: int
+    open_count: int
+    is_finished: bool
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+# One logged move, `result` is one of the app.core.game_state MOVE_* outcomes
+class CardMoveCreate(BaseModel):
+    game_id: int
+    seq: int
+    position: int
+    result: int
+    created_at: datetime
+
+
+class CardMove(CardMoveCreate):
+    class Config:
+        orm_mode = True
+
+
+class BestScoreBase(BaseModel):
     user_id: int
     min_open_count: int
 
+
+class BestScoreCreate(BestScoreBase):
+    pass
+
+
+class BestScoreUpdate(BaseModel):
+    min_open_count: int
+
+
+class BestScore(BestScoreBase):
+    id: int
+
     class Config:
         orm_mode = True
+
+
+# Leaderboard position, players with the same min_open_count share a rank
+class RankedBestScore(BestScore):
+    rank: int
@@ -0,0 +1,16 @@
+from typing import Generic, List, Optional, TypeVar
+
+from pydantic.generics import GenericModel
+
+ItemType = TypeVar("ItemType")
+
+
+# One page of a list, pass `next_cursor` or `prev_cursor` back as `cursor` for
+# the page after or before it. Either is null at that end of the list.
+class Page(GenericModel, Generic[ItemType]):
+    items: List[ItemType]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+    class Config:
+        orm_mode = True
@@ -10,3 +10,7 @@ class Token(BaseModel):
 
 class TokenPayload(BaseModel):
     sub: Optional[int] = None
+    exp: Optional[float] = None
+    iat: Optional[float] = None
+    is_active: Optional[bool] = None
+    is_superuser: Optional[bool] = None
@@ -1,8 +1,16 @@
-from typing import Optional
+from typing import NamedTuple, Optional
 
 from pydantic import BaseModel, EmailStr
 
 
+# What the auth dependencies need to know about the user behind a token. A
+# plain tuple so cache hits don't pay for pydantic validation.
+class UserPrincipal(NamedTuple):
+    id: int
+    is_active: bool
+    is_superuser: bool
+
+
 # Shared properties
 class UserBase(BaseModel):
     email: Optional[EmailStr] = None
@@ -0,0 +1,214 @@
+import asyncio
+from datetime import datetime
+from typing import Generator, List, Optional
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.api import leaderboard_events
+from app.api.leaderboard_events import apply_notification, broadcasters, stream_events
+from app.core.broadcast import Broadcaster
+from app.core.config import settings
+from app.core.leaderboard import (
+    RELOAD_PAYLOAD,
+    LeaderboardEntry,
+    ScoreUpdate,
+    encode_score_updates,
+    leaderboard,
+    publish_scores,
+    worker_id,
+)
+from app.tests.utils.user import create_random_user
+
+
+@pytest.fixture(scope="module", autouse=True)
+def expire_leaderboard() -> Generator:
+    yield
+    # Later tests read the scores left out here
+    leaderboard.expire()
+
+
+def record_score(db: Session, *, user_id: int, open_count: int) -> None:
+    score = crud.best_score.record(db, user_id=user_id, open_count=open_count)
+    db.commit()
+    leaderboard.record(
+        id=score.id, user_id=score.user_id, min_open_count=score.min_open_count
+    )
+
+
+def test_rank_and_neighbors(client: TestClient, db: Session) -> None:
+    users = [create_random_user(db) for _ in range(3)]
+    # Leave out scores of earlier tests, until the next reload
+    leaderboard.replace([])
+    for open_count, user in zip((3, 1, 2), users):
+        record_score(db, user_id=user.id, open_count=open_count)
+    r = client.get(f"{settings.API_V1_STR}/best_scores/rank/{users[1].id}")
+    assert r.status_code == 200
+    assert r.json()["rank"] == 1
+    assert r.json()["min_open_count"] == 1
+    r = client.get(
+        f"{settings.API_V1_STR}/best_scores/neighbors/{users[2].id}",
+        params={"size": 1},
+    )
+    assert [entry["user_id"] for entry in r.json()] == [
+        users[1].id,
+        users[2].id,
+        users[0].id,
+    ]
+    r = client.get(f"{settings.API_V1_STR}/best_scores/rank/{2 ** 30}")
+    assert r.status_code == 404
+
+
+def test_read_best_scores_by_cursor(client: TestClient, db: Session) -> None:
+    for _ in range(3):
+        record_score(db, user_id=create_random_user(db).id, open_count=4)
+    seen = []
+    params = {"limit": 2}
+    while True:
+        r = client.get(f"{settings.API_V1_STR}/best_scores/", params=params)
+        assert r.status_code == 200
+        seen += [(entry["min_open_count"], entry["id"]) for entry in r.json()]
+        if "X-Next-Cursor" not in r.headers:
+            break
+        params["cursor"] = r.headers["X-Next-Cursor"]
+    assert seen == sorted(seen)
+    assert len(seen) == len(set(seen)) >= 3
+
+
+def test_read_best_scores_invalid_cursor(client: TestClient) -> None:
+    r = client.get(f"{settings.API_V1_STR}/best_scores/", params={"cursor": "x"})
+    assert r.status_code == 400
+
+
+def test_read_best_scores_of_the_day(client: TestClient, db: Session) -> None:
+    user = create_random_user(db)
+    updates = crud.best_score.record_game_end(
+        db, user_id=user.id, open_count=1, finished_at=datetime.utcnow()
+    )
+    db.commit()
+    publish_scores(updates)
+    r = client.get(
+        f"{settings.API_V1_STR}/best_scores/rank/{user.id}", params={"period": "day"}
+    )
+    assert r.status_code == 200
+    assert r.json()["min_open_count"] == 1
+    r = client.get(f"{settings.API_V1_STR}/best_scores/", params={"period": "month"})
+    assert r.status_code == 422
+
+
+def test_read_best_scores_conditional_get(client: TestClient, db: Session) -> None:
+    url = f"{settings.API_V1_STR}/best_scores/"
+    r = client.get(url, params={"limit": 5})
+    etag, last_modified = r.headers["ETag"], r.headers["Last-Modified"]
+    r = client.get(url, params={"limit": 5}, headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    # Changes within the second of Last-Modified would go unseen
+    r = client.get(
+        url, params={"limit": 5}, headers={"If-Modified-Since": last_modified}
+    )
+    assert r.status_code == 200
+    # A new best score leads the leaderboard
+    record_score(db, user_id=create_random_user(db).id, open_count=0)
+    r = client.get(url, params={"limit": 5}, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.json()[0]["min_open_count"] == 0
+
+
+class StreamRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+def test_stream_sends_changes(db: Session, monkeypatch) -> None:
+    user = create_random_user(db)
+    leaderboard.replace([])
+    # Later tests keep the listeners of the client's startup only
+    monkeypatch.setattr(leaderboard, "_listeners", list(leaderboard._listeners))
+
+    async def read_events() -> List[bytes]:
+        # Started on this loop, instead of the one of the client's startup
+        broadcaster = Broadcaster(interval=settings.LEADERBOARD_EVENTS_INTERVAL)
+        leaderboard.add_listener(broadcaster.notify)
+        monkeypatch.setitem(broadcasters, "all", broadcaster)
+        task = broadcaster.start()
+        events = []
+        stream = stream_events(StreamRequest(), period="all", top=1, user_id=user.id)
+        try:
+            async for event in stream:
+                events.append(event)
+                if len(events) == 2:
+                    # Ends up first, changing both the top and the user's rank
+                    await asyncio.get_event_loop().run_in_executor(
+                        None, lambda: record_score(db, user_id=user.id, open_count=0)
+                    )
+                if len(events) == 4:
+                    break
+        finally:
+            await stream.aclose()
+            task.cancel()
+        return events
+
+    # asyncio.run() would leave no current loop for the client's teardown
+    previous_loop = asyncio.get_event_loop()
+    loop = asyncio.new_event_loop()
+    try:
+        asyncio.set_event_loop(loop)
+        events = loop.run_until_complete(read_events())
+    finally:
+        loop.close()
+        asyncio.set_event_loop(previous_loop)
+    assert broadcasters["all"].subscribers == 0
+    assert events[:2] == [b"event: top\ndata: []\n\n", b"event: rank\ndata: null\n\n"]
+    assert events[2].startswith(b"event: top\ndata: [{")
+    assert events[3].startswith(b"event: rank\ndata: {")
+
+
+def test_own_notifications_are_skipped() -> None:
+    leaderboard.replace([])
+    update = ScoreUpdate("all", None, LeaderboardEntry(1, 2**30, 2**30))
+    apply_notification(encode_score_updates([update], sender=worker_id()))
+    assert leaderboard.get(2**30) is None
+    apply_notification(encode_score_updates([update], sender="other:1"))
+    assert leaderboard.get(2**30).min_open_count == 1
+
+
+def test_reload_notification_expires_the_leaderboards() -> None:
+    leaderboard.replace([])
+    apply_notification(RELOAD_PAYLOAD)
+    assert leaderboard.needs_load()
+
+
+class Listener:
+    def __init__(self, listening: bool) -> None:
+        self.listening = listening
+
+
+@pytest.mark.parametrize("listener", [None, Listener(False), Listener(True)])
+def test_refresh_reloads_only_when_not_listening(
+    monkeypatch, listener: Optional[Listener]
+) -> None:
+    calls: List[str] = []
+
+    async def load_leaderboard(period: str) -> None:
+        calls.append(f"load {period}")
+
+    async def refresh_leaderboard(period: str) -> None:
+        calls.append(f"refresh {period}")
+
+    monkeypatch.setattr(leaderboard_events, "_listener", listener)
+    monkeypatch.setattr(leaderboard_events, "load_leaderboard", load_leaderboard)
+    monkeypatch.setattr(leaderboard_events, "refresh_leaderboard", refresh_leaderboard)
+    leaderboard.replace([])
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(leaderboard_events.refresh_leaderboards())
+    finally:
+        loop.close()
+    # A notified worker only loads what can't be served, the others reload
+    # what is due
+    expected = "load" if listener is not None and listener.listening else "refresh"
+    assert f"{expected} all" in calls
+    assert all(call.startswith(expected) for call in calls)
@@ -0,0 +1,143 @@
+from collections import defaultdict
+
+import pytest
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.api.api_v1.endpoints.game_sessions import CLOSE_CODE_BASE
+from app.core.active_games import active_games
+from app.core.config import settings
+from app.models import CardGame
+from app.schemas import CardGame as CardGameAPIModel
+from app.schemas import GameInfoInDB
+from app.tests.utils.user import authentication_token_from_email
+from app.tests.utils.utils import random_email
+
+
+def session_url(game_id: int, headers: dict) -> str:
+    token = headers["Authorization"].split(" ", 1)[1]
+    return f"{settings.API_V1_STR}/games/{game_id}/session?token={token}"
+
+
+def test_play_game_over_websocket(
+    client: TestClient, normal_user_token_headers: dict, db: Session
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/games/", headers=normal_user_token_headers, json={}
+    )
+    card_game = CardGameAPIModel(**response.json())
+    game_info = GameInfoInDB(**db.query(CardGame).get(card_game.id).game_info)
+    position_by_display = defaultdict(list)
+    for pos, display in enumerate(game_info.display_by_position):
+        position_by_display[display].append(pos)
+
+    with client.websocket_connect(
+        session_url(card_game.id, normal_user_token_headers)
+    ) as websocket:
+        websocket.send_json({"position": card_game.total_card})
+        assert websocket.receive_json() == {"detail": "Card position out of range"}
+        for display in map(str, range(1, card_game.pair_count + 1)):
+            for pos in position_by_display[display]:
+                websocket.send_json({"position": pos})
+                game_delta = websocket.receive_json()
+                assert game_delta["revealed"] == {str(pos): display}
+        assert game_delta["is_game_end"] is True
+        assert game_delta["open_count"] == card_game.total_card
+
+    response = client.get(
+        f"{settings.API_V1_STR}/games/{card_game.id}",
+        headers=normal_user_token_headers,
+    )
+    assert response.json()["open_count"] == card_game.total_card
+    assert response.json()["version"] == card_game.version + card_game.total_card
+    assert response.json()["game_info"]["is_game_end"] is True
+    response = client.get(
+        f"{settings.API_V1_STR}/best_scores/rank/{card_game.owner_id}"
+    )
+    assert response.status_code == 200
+
+
+def test_websocket_rejects_other_users_game(
+    client: TestClient,
+    normal_user_token_headers: dict,
+    superuser_token_headers: dict,
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/games/", headers=superuser_token_headers, json={}
+    )
+    game_id = response.json()["id"]
+    with client.websocket_connect(
+        session_url(game_id, normal_user_token_headers)
+    ) as websocket:
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            websocket.receive_json()
+    assert exc_info.value.code == CLOSE_CODE_BASE + 400
+    # Not kept in memory for a rejected connect
+    assert active_games.get(game_id) is None
+    with client.websocket_connect(
+        f"{settings.API_V1_STR}/games/{game_id}/session?token=invalid"
+    ) as websocket:
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            websocket.receive_json()
+    assert exc_info.value.code == CLOSE_CODE_BASE + 403
+
+
+def test_open_card_write_behind(
+    client: TestClient, normal_user_token_headers: dict, db: Session, monkeypatch
+) -> None:
+    monkeypatch.setattr(settings, "GAME_WRITE_BEHIND_ENABLED", True)
+    response = client.post(
+        f"{settings.API_V1_STR}/games/", headers=normal_user_token_headers, json={}
+    )
+    card_game = CardGameAPIModel(**response.json())
+    game_info = GameInfoInDB(**db.query(CardGame).get(card_game.id).game_info)
+    position_by_display = defaultdict(list)
+    for pos, display in enumerate(game_info.display_by_position):
+        position_by_display[display].append(pos)
+
+    pos1, _ = position_by_display["1"]
+    response = client.post(
+        f"{settings.API_V1_STR}/games/{card_game.id}/open_card/{pos1}",
+        headers=normal_user_token_headers,
+    )
+    assert response.json()["open_count"] == 1
+    db.expire_all()
+    assert db.query(CardGame).get(card_game.id).open_count == 0
+    response = client.get(
+        f"{settings.API_V1_STR}/games/{card_game.id}",
+        headers=normal_user_token_headers,
+    )
+    assert response.json()["open_count"] == 1
+    # Only once the reader may see the game
+    other_user_headers = authentication_token_from_email(
+        client=client, email=random_email(), db=db
+    )
+    response = client.get(
+        f"{settings.API_V1_STR}/games/{card_game.id}/moves",
+        headers=other_user_headers,
+    )
+    assert response.status_code == 400
+    db.expire_all()
+    assert db.query(CardGame).get(card_game.id).open_count == 0
+    # Reading the move log saves the unsaved moves first
+    response = client.get(
+        f"{settings.API_V1_STR}/games/{card_game.id}/moves",
+        headers=normal_user_token_headers,
+    )
+    assert [move["position"] for move in response.json()] == [pos1]
+    db.expire_all()
+    assert db.query(CardGame).get(card_game.id).open_count == 1
+
+    for display in map(str, range(1, card_game.pair_count + 1)):
+        for pos in position_by_display[display]:
+            response = client.post(
+                f"{settings.API_V1_STR}/games/{card_game.id}/open_card/{pos}",
+                headers=normal_user_token_headers,
+            )
+    assert response.json()["game_info"]["is_game_end"] is True
+    db.expire_all()
+    stored = db.query(CardGame).get(card_game.id)
+    assert stored.open_count == card_game.total_card + 1
+    assert stored.version == card_game.version + card_game.total_card + 1
+    assert stored.game_info["is_game_end"] is True
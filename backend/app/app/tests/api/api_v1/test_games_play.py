@@ -1,12 +1,18 @@
 from collections import defaultdict
+from typing import Callable
 
 from sqlalchemy.orm import Session
 from starlette.testclient import TestClient
 
+from app import crud
+from app.api import deps
+from app.api.api_v1.endpoints import games
 from app.core.config import settings
 from app.models import CardGame
 from app.schemas import CardGame as CardGameAPIModel
 from app.schemas import GameInfoInDB
+from app.tests.utils.user import authentication_token_from_email, create_random_user
+from app.tests.utils.utils import random_email
 
 
 def test_create_game(
@@ -138,3 +144,262 @@ def test_while_play_game_should_be_able_to_recreate_new_game(
     )
     assert response.status_code == 200
     assert card_game.game_info.is_game_end is False
+
+
+def test_open_card_with_stale_version_should_conflict(
+    client: TestClient, normal_user_token_headers: dict, db: Session
+) -> None:
+    data = {}
+    response = client.post(
+        f"{settings.API_V1_STR}/games/",
+        headers=normal_user_token_headers,
+        json=data,
+    )
+    card_game = CardGameAPIModel(**response.json())
+    response = client.post(
+        f"{settings.API_V1_STR}/games/{card_game.id}/open_card/0",
+        headers=normal_user_token_headers,
+        params={"version": card_game.version},
+    )
+    assert response.status_code == 200
+    assert response.json()["version"] == card_game.version + 1
+    response = client.post(
+        f"{settings.API_V1_STR}/games/{card_game.id}/open_card/1",
+        headers=normal_user_token_headers,
+        params={"version": card_game.version},
+    )
+    assert response.status_code == 409
+
+
+def test_create_games_batch(
+    client: TestClient,
+    normal_user_token_headers: dict,
+    superuser_token_headers: dict,
+    db: Session,
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/games/batch",
+        headers=normal_user_token_headers,
+        json={"count": 3},
+    )
+    assert response.status_code == 200
+    games = response.json()
+    assert len(games) == 3
+    assert len({game["id"] for game in games}) == 3
+    owner_id = games[0]["owner_id"]
+    assert all(game["owner_id"] == owner_id for game in games)
+    assert all(game["version"] == 1 for game in games)
+
+    other = create_random_user(db)
+    response = client.post(
+        f"{settings.API_V1_STR}/games/batch",
+        headers=normal_user_token_headers,
+        json={"count": 1, "owner_ids": [other.id]},
+    )
+    assert response.status_code == 400
+    response = client.post(
+        f"{settings.API_V1_STR}/games/batch",
+        headers=superuser_token_headers,
+        json={"count": 2, "owner_ids": [owner_id, other.id]},
+    )
+    assert response.status_code == 200
+    assert sorted(game["owner_id"] for game in response.json()) == sorted(
+        [owner_id, owner_id, other.id, other.id]
+    )
+    response = client.post(
+        f"{settings.API_V1_STR}/games/batch",
+        headers=superuser_token_headers,
+        json={"count": 1, "owner_ids": [2**30]},
+    )
+    assert response.status_code == 404
+
+
+def test_play_large_board_to_the_end(
+    client: TestClient, normal_user_token_headers: dict, db: Session
+) -> None:
+    pair_count = 200
+    response = client.post(
+        f"{settings.API_V1_STR}/games/",
+        headers=normal_user_token_headers,
+        json={"pair_count": pair_count},
+    )
+    assert response.status_code == 200
+    card_game = CardGameAPIModel(**response.json())
+    assert card_game.pair_count == pair_count
+    assert card_game.total_card == pair_count * 2
+    card_game_db_model: CardGame = db.query(CardGame).get(card_game.id)
+    game_info = GameInfoInDB(**card_game_db_model.game_info)
+    position_by_display = defaultdict(list)
+    for pos, display in enumerate(game_info.display_by_position):
+        position_by_display[display].append(pos)
+
+    for display in map(str, range(1, pair_count + 1)):
+        assert card_game.game_info.is_game_end is False
+        for pos in position_by_display[display]:
+            response = client.post(
+                f"{settings.API_V1_STR}/games/{card_game.id}/open_card/{pos}",
+                headers=normal_user_token_headers,
+            )
+            card_game = CardGameAPIModel(**response.json())
+    assert card_game.game_info.is_game_end is True
+    assert card_game.open_count == pair_count * 2
+
+
+def test_game_endpoints_meet_query_budgets(
+    client: TestClient,
+    normal_user_token_headers: dict,
+    db: Session,
+    query_budget: Callable,
+) -> None:
+    with query_budget(games.create_game):
+        response = client.post(
+            f"{settings.API_V1_STR}/games/",
+            headers=normal_user_token_headers,
+            json={"pair_count": 3},
+        )
+    card_game = CardGameAPIModel(**response.json())
+    card_game_db_model: CardGame = db.query(CardGame).get(card_game.id)
+    game_info = GameInfoInDB(**card_game_db_model.game_info)
+    position_by_display = defaultdict(list)
+    for pos, display in enumerate(game_info.display_by_position):
+        position_by_display[display].append(pos)
+
+    # Every move, the last one recording the best score included
+    for display in map(str, range(1, 4)):
+        for pos in position_by_display[display]:
+            with query_budget(games.open_card):
+                response = client.post(
+                    f"{settings.API_V1_STR}/games/{card_game.id}/open_card/{pos}",
+                    headers=normal_user_token_headers,
+                )
+            assert response.status_code == 200
+    assert CardGameAPIModel(**response.json()).game_info.is_game_end is True
+    with query_budget(games.read_game):
+        response = client.get(
+            f"{settings.API_V1_STR}/games/{card_game.id}",
+            headers=normal_user_token_headers,
+        )
+    assert response.json()["open_count"] == 6
+
+
+def test_read_game_conditional_get(
+    client: TestClient, normal_user_token_headers: dict, query_budget: Callable
+) -> None:
+    url = f"{settings.API_V1_STR}/games/"
+    game_id = client.post(
+        url, headers=normal_user_token_headers, json={"pair_count": 2}
+    ).json()["id"]
+    response = client.get(f"{url}{game_id}", headers=normal_user_token_headers)
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    conditional_headers = {**normal_user_token_headers, "If-None-Match": etag}
+    with query_budget(games.read_game) as counter:
+        response = client.get(f"{url}{game_id}", headers=conditional_headers)
+    assert response.status_code == 304
+    # Answered without reading the game state
+    assert not any("cardgame.state" in statement for statement in counter.statements)
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+    client.post(f"{url}{game_id}/open_card/0", headers=normal_user_token_headers)
+    response = client.get(f"{url}{game_id}", headers=conditional_headers)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["open_count"] == 1
+
+
+def test_create_game_with_invalid_pair_count(
+    client: TestClient, normal_user_token_headers: dict
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/games/",
+        headers=normal_user_token_headers,
+        json={"pair_count": 0},
+    )
+    assert response.status_code == 422
+
+
+def test_open_card_delta_mode(
+    client: TestClient, normal_user_token_headers: dict, db: Session
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/games/",
+        headers=normal_user_token_headers,
+        json={},
+    )
+    card_game = CardGameAPIModel(**response.json())
+    card_game_db_model: CardGame = db.query(CardGame).get(card_game.id)
+    game_info = GameInfoInDB(**card_game_db_model.game_info)
+    position_by_display = defaultdict(list)
+    for pos, display in enumerate(game_info.display_by_position):
+        position_by_display[display].append(pos)
+    pos1, pos2 = position_by_display["1"]
+    pos3, _ = position_by_display["2"]
+
+    response = client.post(
+        f"{settings.API_V1_STR}/games/{card_game.id}/open_card/{pos1}",
+        headers=normal_user_token_headers,
+        params={"delta": True},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == deps.DELTA_MEDIA_TYPE
+    assert response.json() == {
+        "id": card_game.id,
+        "version": card_game.version + 1,
+        "open_count": 1,
+        "revealed": {str(pos1): "1"},
+        "hidden": [],
+        "is_game_end": False,
+    }
+    response = client.post(
+        f"{settings.API_V1_STR}/games/{card_game.id}/open_card/{pos3}",
+        headers={**normal_user_token_headers, "Accept": deps.DELTA_MEDIA_TYPE},
+    )
+    assert response.json()["revealed"] == {}
+    assert response.json()["hidden"] == [pos1]
+    response = client.post(
+        f"{settings.API_V1_STR}/games/{card_game.id}/open_card/{pos2}",
+        headers=normal_user_token_headers,
+    )
+    assert "game_info" in response.json()
+
+
+def test_read_games_lists_summaries(
+    client: TestClient,
+    superuser_token_headers: dict,
+    db: Session,
+    query_budget: Callable,
+) -> None:
+    email = random_email()
+    headers = authentication_token_from_email(client=client, email=email, db=db)
+    url = f"{settings.API_V1_STR}/games/"
+    ids = [
+        client.post(url, headers=headers, json={"pair_count": 1}).json()["id"]
+        for _ in range(3)
+    ]
+    for position in (0, 1):
+        client.post(f"{url}{ids[0]}/open_card/{position}", headers=headers)
+
+    with query_budget(games.read_games):
+        page = client.get(url, headers=headers, params={"limit": 2}).json()
+    assert [game["id"] for game in page["items"]] == ids[:2]
+    assert set(page["items"][0]) == {"id", "open_count", "is_finished", "created_at"}
+    assert page["items"][0]["is_finished"] is True
+    assert page["items"][0]["open_count"] == 2
+    page = client.get(
+        url, headers=headers, params={"limit": 2, "cursor": page["next_cursor"]}
+    ).json()
+    assert [game["id"] for game in page["items"]] == ids[2:]
+    assert page["next_cursor"] is None
+
+    page = client.get(url, headers=headers, params={"is_finished": False}).json()
+    assert [game["id"] for game in page["items"]] == ids[1:]
+
+    owner_id = crud.user.get_by_email(db, email=email).id
+    response = client.get(f"{url}all", headers=headers)
+    assert response.status_code == 400
+    page = client.get(
+        f"{url}all",
+        headers=superuser_token_headers,
+        params={"owner_id": owner_id, "is_finished": True},
+    ).json()
+    assert [game["id"] for game in page["items"]] == [ids[0]]
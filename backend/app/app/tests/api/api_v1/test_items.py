@@ -1,6 +1,9 @@
+from typing import Callable
+
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
+from app.api.api_v1.endpoints import items
 from app.core.config import settings
 from app.tests.utils.item import create_random_item
 
@@ -36,3 +39,37 @@ def test_read_item(
     assert content["description"] == item.description
     assert content["id"] == item.id
     assert content["owner_id"] == item.owner_id
+
+
+def test_item_endpoints_meet_query_budgets(
+    client: TestClient, superuser_token_headers: dict, query_budget: Callable
+) -> None:
+    with query_budget(items.create_item):
+        response = client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers=superuser_token_headers,
+            json={"title": "Foo"},
+        )
+    item_url = f"{settings.API_V1_STR}/items/{response.json()['id']}"
+    with query_budget(items.read_item):
+        client.get(item_url, headers=superuser_token_headers)
+    with query_budget(items.update_item):
+        response = client.put(
+            item_url, headers=superuser_token_headers, json={"description": "Bar"}
+        )
+    assert response.json()["description"] == "Bar"
+    with query_budget(items.read_items):
+        response = client.get(
+            f"{settings.API_V1_STR}/items/",
+            headers=superuser_token_headers,
+            params={"limit": 1},
+        )
+    with query_budget(items.read_items):
+        client.get(
+            f"{settings.API_V1_STR}/items/",
+            headers=superuser_token_headers,
+            params={"limit": 1, "cursor": response.json()["next_cursor"]},
+        )
+    with query_budget(items.delete_item):
+        response = client.delete(item_url, headers=superuser_token_headers)
+    assert response.status_code == 200
@@ -1,8 +1,17 @@
-from typing import Dict
+from typing import Any, Dict, Optional
 
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
 
+from app import crud
+from app.api import deps
+from app.core import security
+from app.core.cache import Cache, CacheUnavailable
 from app.core.config import settings
+from app.schemas.user import UserCreate
+from app.tests.utils.user import user_authentication_headers
+from app.tests.utils.utils import random_email, random_lower_string
 
 
 def test_get_access_token(client: TestClient) -> None:
@@ -27,3 +36,89 @@ def test_use_access_token(
     result = r.json()
     assert r.status_code == 200
     assert "email" in result
+
+
+def test_login_when_hashing_queue_is_full(client: TestClient) -> None:
+    hasher = security.password_hasher
+    if not hasher.workers:
+        pytest.skip("passwords are hashed inline")
+    login_data = {
+        "username": settings.FIRST_SUPERUSER,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+    with hasher.saturated():
+        r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == str(settings.PASSWORD_HASH_RETRY_AFTER)
+
+
+def test_revoked_token_is_rejected(client: TestClient, db: Session) -> None:
+    email = random_email()
+    password = random_lower_string()
+    crud.user.create(db, obj_in=UserCreate(email=email, password=password))
+    headers = user_authentication_headers(client=client, email=email, password=password)
+    r = client.post(f"{settings.API_V1_STR}/login/test-token", headers=headers)
+    assert r.status_code == 200
+    r = client.post(f"{settings.API_V1_STR}/login/revoke-token", headers=headers)
+    assert r.status_code == 200
+    r = client.post(f"{settings.API_V1_STR}/login/test-token", headers=headers)
+    assert r.status_code == 403
+    r = client.post(f"{settings.API_V1_STR}/games/", headers=headers, json={})
+    assert r.status_code == 403
+    # Other tokens of the user are still valid
+    headers = user_authentication_headers(client=client, email=email, password=password)
+    r = client.post(f"{settings.API_V1_STR}/login/test-token", headers=headers)
+    assert r.status_code == 200
+
+
+def test_embedded_principal_is_revoked_with_its_flags(
+    client: TestClient,
+    superuser_token_headers: Dict[str, str],
+    db: Session,
+    monkeypatch,
+) -> None:
+    monkeypatch.setattr(settings, "ACCESS_TOKEN_EMBED_PRINCIPAL", True)
+    email = random_email()
+    password = random_lower_string()
+    user = crud.user.create(db, obj_in=UserCreate(email=email, password=password))
+    headers = user_authentication_headers(client=client, email=email, password=password)
+    claims = deps.verify_token(headers["Authorization"].split()[1])
+    assert deps.embedded_principal(claims) == (user.id, True, False)
+    r = client.post(f"{settings.API_V1_STR}/games/", headers=headers, json={})
+    assert r.status_code == 200
+    r = client.put(
+        f"{settings.API_V1_STR}/users/{user.id}",
+        headers=superuser_token_headers,
+        json={"is_active": False},
+    )
+    assert r.status_code == 200
+    r = client.post(f"{settings.API_V1_STR}/games/", headers=headers, json={})
+    assert r.status_code == 403
+
+
+class UnavailableCache(Cache):
+    def get(self, key: str) -> Any:
+        raise CacheUnavailable(key)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise CacheUnavailable(key)
+
+    def delete(self, key: str) -> None:
+        raise CacheUnavailable(key)
+
+    def clear(self) -> None:
+        raise CacheUnavailable("*")
+
+
+def test_unavailable_denylist_rejects_tokens(
+    client: TestClient, normal_user_token_headers: Dict[str, str], monkeypatch
+) -> None:
+    monkeypatch.setattr(security.token_denylist, "cache", UnavailableCache())
+    r = client.post(
+        f"{settings.API_V1_STR}/login/test-token", headers=normal_user_token_headers
+    )
+    assert r.status_code == 503
+    r = client.post(
+        f"{settings.API_V1_STR}/login/revoke-token", headers=normal_user_token_headers
+    )
+    assert r.status_code == 503
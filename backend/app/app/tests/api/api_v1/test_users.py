@@ -1,11 +1,13 @@
-from typing import Dict
+from typing import Callable, Dict
 
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
 from app import crud
+from app.api.api_v1.endpoints import users
 from app.core.config import settings
 from app.schemas.user import UserCreate
+from app.tests.utils.user import user_authentication_headers
 from app.tests.utils.utils import random_email, random_lower_string
 
 
@@ -115,8 +117,153 @@ def test_retrieve_users(
     crud.user.create(db, obj_in=user_in2)
 
     r = client.get(f"{settings.API_V1_STR}/users/", headers=superuser_token_headers)
-    all_users = r.json()
+    all_users = r.json()["items"]
 
     assert len(all_users) > 1
     for item in all_users:
         assert "email" in item
+
+
+def test_page_through_users_by_email(
+    client: TestClient, superuser_token_headers: dict, db: Session
+) -> None:
+    for _ in range(3):
+        crud.user.create(
+            db, obj_in=UserCreate(email=random_email(), password=random_lower_string())
+        )
+    url = f"{settings.API_V1_STR}/users/"
+    params = {"limit": 2, "sort": "email"}
+    pages = []
+    page = client.get(url, headers=superuser_token_headers, params=params).json()
+    assert page["prev_cursor"] is None
+    pages.append(page["items"])
+    while page["next_cursor"]:
+        page = client.get(
+            url,
+            headers=superuser_token_headers,
+            params={"limit": 2, "cursor": page["next_cursor"]},
+        ).json()
+        pages.append(page["items"])
+    emails = [user["email"] for items in pages for user in items]
+    assert emails == sorted(emails)
+    assert len(emails) == len(set(emails)) >= 4
+    # And back to the first page
+    while page["prev_cursor"]:
+        page = client.get(
+            url,
+            headers=superuser_token_headers,
+            params={"limit": 2, "cursor": page["prev_cursor"]},
+        ).json()
+        assert page["items"] == pages.pop(-2)
+
+
+def test_read_users_rejects_invalid_cursor(
+    client: TestClient, superuser_token_headers: dict
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"cursor": "not-a-cursor"},
+    )
+    assert r.status_code == 400
+
+
+def test_deactivated_user_is_rejected(
+    client: TestClient, superuser_token_headers: dict, db: Session
+) -> None:
+    email = random_email()
+    password = random_lower_string()
+    user = crud.user.create(db, obj_in=UserCreate(email=email, password=password))
+    headers = user_authentication_headers(client=client, email=email, password=password)
+    r = client.post(f"{settings.API_V1_STR}/games/", headers=headers, json={})
+    assert r.status_code == 200
+    r = client.put(
+        f"{settings.API_V1_STR}/users/{user.id}",
+        headers=superuser_token_headers,
+        json={"is_active": False},
+    )
+    assert r.status_code == 200
+    r = client.post(f"{settings.API_V1_STR}/games/", headers=headers, json={})
+    assert r.status_code == 400
+
+
+def test_superuser_revokes_user_tokens(
+    client: TestClient,
+    superuser_token_headers: dict,
+    db: Session,
+    query_budget: Callable,
+) -> None:
+    email = random_email()
+    password = random_lower_string()
+    user = crud.user.create(db, obj_in=UserCreate(email=email, password=password))
+    headers = user_authentication_headers(client=client, email=email, password=password)
+    r = client.post(
+        f"{settings.API_V1_STR}/users/{user.id}/revoke-tokens", headers=headers
+    )
+    assert r.status_code == 400
+    with query_budget(users.revoke_user_tokens):
+        r = client.post(
+            f"{settings.API_V1_STR}/users/{user.id}/revoke-tokens",
+            headers=superuser_token_headers,
+        )
+    assert r.status_code == 200
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 403
+    headers = user_authentication_headers(client=client, email=email, password=password)
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 200
+    r = client.post(
+        f"{settings.API_V1_STR}/users/{user.id + 1000000}/revoke-tokens",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 404
+
+
+def test_update_user_me_only_changes_given_fields(
+    client: TestClient, db: Session, query_budget: Callable
+) -> None:
+    email = random_email()
+    password = random_lower_string()
+    user_in = UserCreate(email=email, password=password, full_name="Before")
+    user = crud.user.create(db, obj_in=user_in)
+    headers = user_authentication_headers(client=client, email=email, password=password)
+    with query_budget(users.update_user_me):
+        r = client.put(
+            f"{settings.API_V1_STR}/users/me",
+            headers=headers,
+            json={"full_name": "After"},
+        )
+    assert r.status_code == 200
+    assert r.json() == {
+        "id": user.id,
+        "email": email,
+        "full_name": "After",
+        "is_active": True,
+        "is_superuser": False,
+    }
+    with query_budget(users.read_user_me):
+        r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.json()["full_name"] == "After"
+    # The password is untouched
+    user_authentication_headers(client=client, email=email, password=password)
+
+
+def test_user_endpoints_meet_query_budgets(
+    client: TestClient, superuser_token_headers: dict, query_budget: Callable
+) -> None:
+    with query_budget(users.create_user):
+        r = client.post(
+            f"{settings.API_V1_STR}/users/",
+            headers=superuser_token_headers,
+            json={"email": random_email(), "password": random_lower_string()},
+        )
+    user_url = f"{settings.API_V1_STR}/users/{r.json()['id']}"
+    with query_budget(users.read_user_by_id):
+        client.get(user_url, headers=superuser_token_headers)
+    with query_budget(users.update_user):
+        r = client.put(
+            user_url, headers=superuser_token_headers, json={"full_name": "Budget"}
+        )
+    assert r.json()["full_name"] == "Budget"
+    with query_budget(users.read_users):
+        client.get(f"{settings.API_V1_STR}/users/", headers=superuser_token_headers)
@@ -1,11 +1,13 @@
-from typing import Dict, Generator
+from contextlib import contextmanager
+from typing import Any, Callable, ContextManager, Dict, Generator
 
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
+from app.api.query_budget import StatementCounter, get_query_budget
 from app.core.config import settings
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, engine
 from app.main import app
 from app.tests.utils.user import authentication_token_from_email
 from app.tests.utils.utils import get_superuser_token_headers
@@ -32,3 +34,24 @@ def normal_user_token_headers(client: TestClient, db: Session) -> Dict[str, str]
     return authentication_token_from_email(
         client=client, email=settings.EMAIL_TEST_USER, db=db
     )
+
+
+@pytest.fixture
+def query_budget() -> Callable[[Callable[..., Any]], ContextManager]:
+    """
+    `with query_budget(endpoint): <request>` fails if the request ran more
+    statements than `endpoint` declares with `@query_budget`.
+    """
+
+    @contextmanager
+    def check(endpoint: Callable[..., Any]) -> Generator:
+        budget = get_query_budget(endpoint)
+        assert budget is not None, f"{endpoint.__name__} declares no query budget"
+        with StatementCounter(engine) as counter:
+            yield counter
+        assert counter.count <= budget, (
+            f"{endpoint.__name__} ran {counter.count} statements, over its "
+            f"budget of {budget}:\n" + "\n".join(counter.statements)
+        )
+
+    return check
@@ -0,0 +1,72 @@
+from array import array
+from pathlib import Path
+
+import pytest
+
+from app.core.active_games import ActiveGameStore, SessionClosed
+from app.core.game_session import GameSession
+from app.core.game_state import GameState
+from app.core.move_journal import MoveJournal
+
+
+def build_session(id: int = 1) -> GameSession:
+    return GameSession(
+        id=id,
+        owner_id=2,
+        pair_count=2,
+        state=GameState(array("H", [1, 2, 1, 2])),
+        open_count=0,
+        version=1,
+    )
+
+
+def test_moves_claim_a_save_every_save_moves_and_at_game_end() -> None:
+    store = ActiveGameStore(save_moves=3, idle_seconds=60)
+    session = store.add(build_session())
+    assert store.add(build_session()) is session
+    assert store.open_card(session, 0)[1] is None
+    assert store.open_card(session, 1)[1] is None
+    _, snapshot = store.open_card(session, 0)
+    assert snapshot.version == 4
+    # One save in flight at a time
+    _, pending = store.open_card(session, 2)
+    assert pending is None
+    assert session.end_open_count is None
+    # The move that ended the game while saving is claimed after the save
+    _, pending = store.open_card(session, 1)
+    _, pending = store.open_card(session, 3)
+    assert pending is None
+    snapshot = store.saved(session, snapshot)
+    assert snapshot.end_open_count == session.open_count
+    assert store.saved(session, snapshot) is None
+    assert session.unsaved_moves == 0
+
+
+def test_idle_sessions_are_saved_then_evicted() -> None:
+    store = ActiveGameStore(save_moves=10, idle_seconds=60)
+    session = store.add(build_session())
+    store.open_card(session, 0)
+    assert store.claim_idle() == []
+    ((claimed, snapshot),) = store.claim_idle(idle_seconds=0)
+    assert claimed is session
+    store.saved(session, snapshot)
+    assert store.claim_idle(idle_seconds=0) == []
+    assert store.get(session.id) is None
+    with pytest.raises(SessionClosed):
+        store.open_card(session, 1)
+
+
+def test_journal_keeps_only_unsaved_moves(tmp_path: Path) -> None:
+    journal = MoveJournal(str(tmp_path / "moves.journal"))
+    store = ActiveGameStore(save_moves=2, idle_seconds=60, journal=journal)
+    session = store.add(build_session())
+    store.open_card(session, 0)
+    _, snapshot = store.open_card(session, 1)
+    store.saved(session, snapshot)
+    store.open_card(session, 2)
+    other = store.add(build_session(id=7))
+    store.open_card(other, 0)
+    store.discard(other)
+    assert journal.replay() == {1: [(2, 0), (3, 1), (4, 2)]}
+    store.compact_journal(force=True)
+    assert journal.replay() == {1: [(4, 2)]}
@@ -0,0 +1,30 @@
+import asyncio
+
+from app.core.broadcast import Broadcaster
+
+
+def test_bursts_are_coalesced() -> None:
+    async def run() -> None:
+        broadcaster = Broadcaster(interval=0.05)
+        task = broadcaster.start()
+        try:
+            published = broadcaster.published
+            for _ in range(3):
+                broadcaster.notify()
+            await asyncio.wait_for(published.wait(), 1)
+            # Changes during the interval wait for its end, all in one
+            published = broadcaster.published
+            broadcaster.notify()
+            broadcaster.notify()
+            await asyncio.sleep(0.01)
+            assert not published.is_set()
+            await asyncio.wait_for(published.wait(), 1)
+            assert not broadcaster.published.is_set()
+        finally:
+            task.cancel()
+
+    asyncio.run(run())
+
+
+def test_notify_before_start_is_ignored() -> None:
+    Broadcaster(interval=1).notify()
@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from app.core.cache import CacheUnavailable, MemoryCache, NullCache, RedisCache
+
+
+def test_memory_cache_evicts_least_recently_used() -> None:
+    cache = MemoryCache(ttl=60, max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_memory_cache_expires_entries() -> None:
+    cache = MemoryCache(ttl=60, max_size=10)
+    cache.set("a", 1, ttl=0.01)
+    cache.set("b", 2)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    cache.delete("b")
+    assert cache.get("b") is None
+
+
+def test_null_cache_never_hits() -> None:
+    cache = NullCache()
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_unbounded_memory_cache_only_drops_expired_entries() -> None:
+    cache = MemoryCache(ttl=60, max_size=None)
+    cache.set("expiring", 1, ttl=0.01)
+    time.sleep(0.02)
+    for key in range(2000):
+        cache.set(str(key), key)
+    assert len(cache) == 2000
+    assert cache.get("0") == 0
+
+
+def test_strict_redis_cache_raises_on_server_errors() -> None:
+    pytest.importorskip("redis")
+    # Nothing listens on port 1, every command fails
+    url = "redis://localhost:1/0"
+    lenient = RedisCache(url, namespace="test", ttl=60)
+    assert lenient.get("a") is None
+    lenient.clear()
+    cache = RedisCache(url, namespace="test", ttl=60, strict=True)
+    with pytest.raises(CacheUnavailable):
+        cache.get("a")
+    with pytest.raises(CacheUnavailable):
+        cache.set("a", 1)
+    with pytest.raises(CacheUnavailable):
+        cache.clear()
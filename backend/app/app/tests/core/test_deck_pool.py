@@ -0,0 +1,31 @@
+import time
+
+from app.core.deck_pool import DeckPool, build_decks
+from app.core.game_state import GameState
+
+
+def test_build_decks_holds_each_pair_once() -> None:
+    for deck in build_decks(10, game_size=6):
+        state = GameState.decode(deck)
+        assert sorted(state.layout) == sorted(list(range(1, 7)) * 2)
+        assert not any(state.revealed)
+        assert state.matched == 0
+
+
+def test_take_refills_in_background() -> None:
+    pool = DeckPool(size=8, game_size=3)
+    assert len(pool.take(10)) == 10
+    deadline = time.time() + 5
+    while len(pool) < 8 and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(pool) == 8
+    assert len(pool.take(3)) == 3
+    assert len(pool) >= 5
+
+
+def test_take_other_game_size_bypasses_pool() -> None:
+    pool = DeckPool(size=4, game_size=3)
+    pool.fill()
+    decks = pool.take(2, game_size=200)
+    assert [GameState.decode(deck).total_card for deck in decks] == [400, 400]
+    assert len(pool) == 4
@@ -0,0 +1,64 @@
+from array import array
+
+import pytest
+
+from app.core.game_session import GameSession
+from app.core.game_state import GameState
+
+
+def build_session() -> GameSession:
+    return GameSession(
+        id=1,
+        owner_id=2,
+        pair_count=2,
+        state=GameState(array("H", [1, 2, 1, 2])),
+        open_count=0,
+        version=1,
+    )
+
+
+def test_open_card_returns_delta_and_counts_moves() -> None:
+    session = build_session()
+    assert session.open_card(0) == {
+        "id": 1,
+        "version": 2,
+        "open_count": 1,
+        "revealed": {0: "1"},
+        "hidden": [],
+        "is_game_end": False,
+    }
+    delta = session.open_card(1)
+    assert delta["revealed"] == {}
+    assert delta["hidden"] == [0]
+    assert session.unsaved_moves == 2
+    snapshot = session.snapshot()
+    session.open_card(2)
+    session.mark_saved(snapshot)
+    assert session.unsaved_moves == 1
+    assert session.saved_version == 3
+
+
+def test_game_end_is_kept_until_saved() -> None:
+    session = build_session()
+    for position in (0, 2, 1, 3):
+        delta = session.open_card(position)
+    assert delta["is_game_end"] is True
+    assert session.end_open_count == 4
+    snapshot = session.snapshot()
+    assert snapshot.end_open_count == 4
+    assert snapshot.finished_at == snapshot.moves[-1].created_at
+    assert snapshot.state == session.state.encode()
+    session.open_card(0)
+    assert session.end_open_count == 4
+    session.mark_saved(snapshot)
+    assert session.end_open_count is None
+    assert session.finished_at is None
+    assert session.as_card_game()["game_info"]["is_game_end"] is True
+
+
+def test_open_card_out_of_range() -> None:
+    session = build_session()
+    for position in (-1, 4):
+        with pytest.raises(IndexError):
+            session.open_card(position)
+    assert session.unsaved_moves == 0
@@ -0,0 +1,129 @@
+import struct
+from array import array
+
+import pytest
+
+from app.core.game_state import NO_PENDING, GameState
+from app.core.shuffle import MAX_GAME_SIZE
+
+
+def test_encode_decode_round_trip() -> None:
+    state = GameState.from_displays(["1", "2", "2", "1"])
+    state.accept_answer_if_in_condition(1)
+    state.accept_answer_if_in_condition(2)
+    state.accept_answer_if_in_condition(0)
+    decoded = GameState.decode(state.encode())
+    assert list(decoded.layout) == [1, 2, 2, 1]
+    assert decoded.revealed == state.revealed
+    assert decoded.seen == state.seen
+    assert decoded.pending == 0
+    assert decoded.matched == 1
+
+
+def test_seen_positions() -> None:
+    state = GameState.from_displays([str(card) for card in range(1, 11)] * 2)
+    assert state.seen_positions() == []
+    for position in (13, 3, 8):
+        state.accept_answer_if_in_condition(position)
+    assert state.seen_positions() == [3, 8, 13]
+
+
+def test_render_matches_legacy_game_info() -> None:
+    game_info = {
+        "display_by_position": ["1", "2", "2", "1"],
+        "answer_as_position_in_sequence": [1, 2, 0],
+        "display_by_answer": {1: "2", 2: "2", 0: "1", 3: "1"},
+    }
+    state = GameState.from_game_info(game_info)
+    assert state.to_game_info() == game_info
+
+
+def test_incorrect_answer_hides_pending_card() -> None:
+    state = GameState.from_displays(["1", "2", "2", "1"])
+    state.accept_answer_if_in_condition(0)
+    state.accept_answer_if_in_condition(1)
+    assert state.pending == NO_PENDING
+    assert state.answer_sequence() == []
+    assert state.to_game_info()["display_by_answer"] == {0: "1"}
+
+
+def test_open_face_up_card_is_ignored() -> None:
+    state = GameState.from_displays(["1", "1"])
+    state.accept_answer_if_in_condition(0)
+    state.accept_answer_if_in_condition(0)
+    assert state.pending == 0
+    assert not state.is_game_end()
+    state.accept_answer_if_in_condition(1)
+    assert state.is_game_end()
+
+
+def test_decode_version_1_counts_matched_pairs() -> None:
+    layout = array("H", [1, 2, 2, 1])
+    data = struct.pack("<BHh4H", 1, 4, NO_PENDING, *layout) + bytes([0b0110] * 2)
+    state = GameState.decode(data)
+    assert state.matched == 1
+    assert state.answer_sequence() == [1, 2]
+    state.accept_answer_if_in_condition(0)
+    state.accept_answer_if_in_condition(3)
+    assert state.is_game_end()
+
+
+def test_decode_unknown_version_fails() -> None:
+    data = bytearray(GameState.from_displays(["1", "1"]).encode())
+    data[0] = 99
+    with pytest.raises(ValueError):
+        GameState.decode(bytes(data))
+
+
+def test_large_board_ends_after_last_pair() -> None:
+    pair_count = 300
+    state = GameState(array("H", list(range(1, pair_count + 1)) * 2))
+    for position in range(pair_count):
+        assert not state.is_game_end()
+        state.accept_answer_if_in_condition(position)
+        state.accept_answer_if_in_condition(position + pair_count)
+    assert state.matched == pair_count
+    assert state.is_game_end()
+    decoded = GameState.decode(state.encode())
+    assert decoded.is_game_end()
+    assert len(decoded.revealed) == pair_count * 2 // 8
+
+
+def test_pending_position_at_max_game_size_round_trips() -> None:
+    state = GameState(array("H", list(range(1, MAX_GAME_SIZE + 1)) * 2))
+    last = MAX_GAME_SIZE * 2 - 1
+    state.accept_answer_if_in_condition(last)
+    decoded = GameState.decode(state.encode())
+    assert decoded.pending == last
+    decoded.accept_answer_if_in_condition(MAX_GAME_SIZE - 1)
+    assert decoded.matched == 1
+    assert GameState.decode(decoded.encode()).pending == NO_PENDING
+
+
+def test_move_delta() -> None:
+    state = GameState.from_displays(["1", "2", "2", "1"])
+    before = GameState.decode(state.encode())
+    state.accept_answer_if_in_condition(1)
+    assert state.move_delta(before, 1) == {
+        "revealed": {1: "2"},
+        "hidden": [],
+        "is_game_end": False,
+    }
+    before = GameState.decode(state.encode())
+    state.accept_answer_if_in_condition(0)
+    assert state.move_delta(before, 0) == {
+        "revealed": {},
+        "hidden": [1],
+        "is_game_end": False,
+    }
+    state.accept_answer_if_in_condition(0)
+    before = GameState.decode(state.encode())
+    state.accept_answer_if_in_condition(3)
+    assert state.move_delta(before, 3) == {
+        "revealed": {3: "1"},
+        "hidden": [],
+        "is_game_end": False,
+    }
+    before = GameState.decode(state.encode())
+    state.accept_answer_if_in_condition(3)
+    assert state.move_delta(before, 3)["revealed"] == {}
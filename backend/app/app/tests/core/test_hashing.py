@@ -0,0 +1,34 @@
+import pytest
+
+from app.core.hashing import PasswordHasher, PasswordHasherBusy
+
+
+def test_hash_in_process_pool() -> None:
+    hasher = PasswordHasher(rounds=4, workers=1, queue_depth=2)
+    try:
+        hashed_password = hasher.hash("secret")
+        assert hashed_password.startswith("$2b$04$")
+        assert hasher.verify_and_update("secret", hashed_password) == (True, None)
+        assert hasher.verify_and_update("wrong", hashed_password) == (False, None)
+    finally:
+        hasher.shutdown()
+
+
+def test_outdated_hash_is_upgraded() -> None:
+    old_hash = PasswordHasher(rounds=4, workers=0, queue_depth=1).hash("secret")
+    hasher = PasswordHasher(rounds=5, workers=0, queue_depth=1)
+    verified, new_hash = hasher.verify_and_update("secret", old_hash)
+    assert verified
+    assert new_hash and new_hash.startswith("$2b$05$")
+
+
+def test_full_queue_raises_busy() -> None:
+    hasher = PasswordHasher(rounds=4, workers=1, queue_depth=1)
+    try:
+        with hasher.saturated():
+            with pytest.raises(PasswordHasherBusy):
+                hasher.hash("secret")
+        # The slots are given back
+        assert hasher.hash("secret").startswith("$2b$04$")
+    finally:
+        hasher.shutdown()
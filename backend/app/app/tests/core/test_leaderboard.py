@@ -0,0 +1,177 @@
+from datetime import datetime
+
+import pytest
+
+from app.core.leaderboard import (
+    Leaderboard,
+    LeaderboardEntry,
+    ScoreUpdate,
+    bucket_start,
+    decode_cursor,
+    decode_score_updates,
+    encode_cursor,
+    encode_score_updates,
+)
+
+
+def build_leaderboard() -> Leaderboard:
+    board = Leaderboard(reload_seconds=30)
+    board.replace([])
+    for id, (user_id, score) in enumerate([(10, 30), (11, 20), (12, 30), (13, 40)]):
+        board.record(id=id, user_id=user_id, min_open_count=score)
+    return board
+
+
+def test_rank_is_shared_by_equal_scores() -> None:
+    board = build_leaderboard()
+    assert board.get(11).rank == 1
+    assert board.get(10).rank == 2
+    assert board.get(12).rank == 2
+    assert board.get(13).rank == 4
+    assert board.get(99) is None
+
+
+def test_record_keeps_the_best_score() -> None:
+    board = build_leaderboard()
+    board.record(id=3, user_id=13, min_open_count=50)
+    assert board.get(13).min_open_count == 40
+    board.record(id=3, user_id=13, min_open_count=10)
+    assert board.get(13).rank == 1
+    assert len(board) == 4
+
+
+def test_page_continues_after_cursor() -> None:
+    board = build_leaderboard()
+    first = board.page(limit=2)
+    assert [entry.user_id for entry in first] == [11, 10]
+    cursor = decode_cursor(encode_cursor(first[-1].min_open_count, first[-1].id))
+    second = board.page(after=cursor, limit=2)
+    assert [entry.user_id for entry in second] == [12, 13]
+    assert board.page(after=(40, 3), limit=2) == []
+
+
+def test_neighbors() -> None:
+    board = build_leaderboard()
+    assert [entry.user_id for entry in board.neighbors(10, size=1)] == [11, 10, 12]
+    assert [entry.user_id for entry in board.neighbors(11, size=1)] == [11, 10]
+
+
+def test_reload_keeps_scores_recorded_meanwhile() -> None:
+    board = build_leaderboard()
+    assert board.begin_reload()
+    assert not board.begin_reload()
+    board.record(id=4, user_id=14, min_open_count=5)
+    # Snapshot read before user 14's game ended
+    board.replace([LeaderboardEntry(20, 1, 11)])
+    assert board.get(14).rank == 1
+    assert board.get(11).rank == 2
+    assert board.get(10) is None
+    assert not board.needs_reload()
+
+
+def test_expire_forces_a_reload() -> None:
+    board = build_leaderboard()
+    assert not board.needs_reload()
+    board.expire()
+    assert board.needs_reload()
+    assert board.needs_load()
+
+
+def test_only_a_first_load_is_waited_for() -> None:
+    board = Leaderboard(reload_seconds=0)
+    assert board.needs_load() and not board.was_loaded()
+    board.replace([LeaderboardEntry(20, 1, 11)])
+    # Due, but left to the background reload
+    assert board.needs_reload()
+    assert not board.needs_load() and board.was_loaded()
+
+
+def test_bucket_start() -> None:
+    # A Wednesday
+    at = datetime(2026, 10, 14, 17, 30, 5)
+    assert bucket_start("all", at) is None
+    assert bucket_start("day", at) == datetime(2026, 10, 14)
+    assert bucket_start("week", at) == datetime(2026, 10, 12)
+    assert bucket_start("week", datetime(2026, 10, 12)) == datetime(2026, 10, 12)
+
+
+def test_period_leaderboard_keeps_its_bucket() -> None:
+    board = Leaderboard(reload_seconds=30, period="day")
+    today = board.current_bucket()
+    yesterday = datetime(2000, 1, 1)
+    board.replace([LeaderboardEntry(20, 1, 11)], bucket=today)
+    assert not board.needs_reload()
+    board.record(id=2, user_id=12, min_open_count=10, bucket=yesterday)
+    board.record(id=3, user_id=13, min_open_count=30, bucket=today)
+    assert board.get(12) is None
+    assert [entry.user_id for entry in board.page(limit=10)] == [11, 13]
+    # The day is over
+    board.replace([], bucket=yesterday)
+    assert board.needs_reload()
+
+
+def test_rendered_pages_are_kept_until_a_change_reaches_them() -> None:
+    board = build_leaderboard()
+    etag, _ = board.validators()
+    first = board.rendered_page(limit=2)
+    assert first.next_cursor == encode_cursor(30, 0)
+    after = decode_cursor(first.next_cursor)
+    second = board.rendered_page(after=after, limit=2)
+    assert board.rendered_page(limit=2) is first
+    # Below the first page
+    board.record(id=4, user_id=14, min_open_count=35)
+    assert board.validators()[0] != etag
+    assert board.rendered_page(limit=2) is first
+    assert board.rendered_page(after=after, limit=2) is not second
+    board.record(id=5, user_id=15, min_open_count=1)
+    assert board.rendered_page(limit=2) is not first
+    assert board.get(15).rank == 1
+
+
+def test_pages_past_the_cached_top_are_rendered_each_time() -> None:
+    board = Leaderboard(reload_seconds=30, cached_top=1)
+    board.replace([LeaderboardEntry(20, 1, 11)])
+    page = board.rendered_page(limit=2)
+    assert page.next_cursor is None
+    assert board.rendered_page(limit=2) is not page
+    assert board.rendered_page(limit=2) == page
+
+
+def test_reload_without_changes_keeps_the_etag() -> None:
+    board = build_leaderboard()
+    etag, _ = board.validators()
+    board.replace(
+        [
+            LeaderboardEntry(20, 1, 11),
+            LeaderboardEntry(30, 0, 10),
+            LeaderboardEntry(30, 2, 12),
+            LeaderboardEntry(40, 3, 13),
+        ]
+    )
+    assert board.validators()[0] == etag
+    board.replace([])
+    assert board.validators()[0] != etag
+
+
+def test_score_updates_payload() -> None:
+    updates = [
+        ScoreUpdate("all", None, LeaderboardEntry(12, 3, 7)),
+        ScoreUpdate("week", datetime(2026, 10, 12), LeaderboardEntry(12, 9, 7)),
+    ]
+    payload = encode_score_updates(updates, sender="host:1")
+    assert decode_score_updates(payload) == ("host:1", updates)
+    # Sent before the sender was added
+    assert decode_score_updates('[["all", null, 12, 3, 7]]') == (None, updates[:1])
+    for payload in ("", "[1]", '[["all", null, 1, 2]]', '{"updates": []}'):
+        with pytest.raises(ValueError):
+            decode_score_updates(payload)
+
+
+def test_listeners_are_called_on_changes() -> None:
+    board = build_leaderboard()
+    calls = []
+    board.add_listener(lambda: calls.append(len(calls)))
+    board.record(id=3, user_id=13, min_open_count=50)
+    assert calls == []
+    board.record(id=3, user_id=13, min_open_count=10)
+    assert calls == [0]
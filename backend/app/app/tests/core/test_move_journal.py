@@ -0,0 +1,58 @@
+import os
+from pathlib import Path
+
+from app.core.move_journal import MoveJournal, claim_journal, orphaned_journals
+
+
+def test_replay_skips_discarded_moves_and_torn_record(tmp_path: Path) -> None:
+    path = str(tmp_path / "moves.journal")
+    journal = MoveJournal(path)
+    journal.append(1, 2, 0)
+    journal.append(2, 5, 3)
+    journal.append(1, 3, 4)
+    journal.discard(2, 5)
+    journal.append(2, 6, 1)
+    journal.close()
+    with open(path, "ab") as torn:
+        torn.write(b"\x01\x00")
+    assert MoveJournal(path).replay() == {1: [(2, 0), (3, 4)], 2: [(6, 1)]}
+
+
+def test_compact_keeps_unsaved_moves_of_active_games(tmp_path: Path) -> None:
+    path = str(tmp_path / "moves.journal")
+    journal = MoveJournal(path)
+    for version in range(2, 6):
+        journal.append(1, version, version)
+    journal.append(2, 2, 0)
+    journal.compact({1: 3})
+    assert journal.replay() == {1: [(4, 4), (5, 5)]}
+    journal.append(1, 6, 0)
+    assert journal.replay() == {1: [(4, 4), (5, 5), (6, 0)]}
+    assert journal.size() == os.path.getsize(path)
+
+
+def test_compact_keeps_moves_appended_past_the_saved_versions(tmp_path: Path) -> None:
+    path = str(tmp_path / "moves.journal")
+    journal = MoveJournal(path)
+    journal.append(1, 2, 0)
+    journal.append(1, 3, 1)
+    end = journal.size()
+    # Game 2 started after the saved versions were read
+    journal.append(2, 2, 5)
+    journal.compact({1: 2}, end=end)
+    assert journal.replay() == {1: [(3, 1)], 2: [(2, 5)]}
+
+
+def test_workers_claim_their_own_journal(tmp_path: Path) -> None:
+    path = str(tmp_path / "moves.journal")
+    first = claim_journal(path)
+    second = claim_journal(path)
+    assert {first.path, second.path} == {f"{path}.0", f"{path}.1"}
+    first.append(1, 2, 0)
+    second.append(2, 2, 0)
+    assert orphaned_journals(path) == []
+    second.close()
+    orphans = orphaned_journals(path)
+    assert [orphan.replay() for orphan in orphans] == [{2: [(2, 0)]}]
+    # Held by the recovering worker until it closes them
+    assert claim_journal(path).path == f"{path}.2"
@@ -0,0 +1,35 @@
+from app.core.game_state import (
+    MOVE_FIRST,
+    MOVE_IGNORED,
+    MOVE_MATCH,
+    MOVE_MISMATCH,
+    GameState,
+)
+from app.core.move_log import replay, snapshot_due
+
+
+def test_moves_report_their_outcome() -> None:
+    state = GameState.from_displays(["1", "2", "1", "2"])
+    assert state.accept_answer_if_in_condition(0) == MOVE_FIRST
+    assert state.accept_answer_if_in_condition(0) == MOVE_IGNORED
+    assert state.accept_answer_if_in_condition(1) == MOVE_MISMATCH
+    assert state.accept_answer_if_in_condition(0) == MOVE_FIRST
+    assert state.accept_answer_if_in_condition(2) == MOVE_MATCH
+
+
+def test_replay_from_the_deal_rebuilds_the_state() -> None:
+    state = GameState.from_displays(["1", "2", "1", "2"])
+    positions = [0, 1, 0, 2, 3]
+    for position in positions:
+        state.accept_answer_if_in_condition(position)
+    dealt = state.deal()
+    assert dealt.to_game_info()["answer_as_position_in_sequence"] == []
+    assert replay(dealt, positions).encode() == state.encode()
+    assert replay(state.deal(), positions[:3]).pending == 0
+
+
+def test_snapshot_due_when_moves_pass_a_multiple() -> None:
+    assert snapshot_due(64, 64, 64)
+    assert snapshot_due(60, 70, 64)
+    assert not snapshot_due(65, 127, 64)
+    assert not snapshot_due(1, 1000, 0)
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+from typing import List
+
+from app.api.profiling import ProfilingMiddleware
+from app.core.profiling import (
+    RouteMetrics,
+    StackSampler,
+    current_profile,
+    phase,
+    start_profile,
+    stop_profile,
+)
+
+
+def test_phase_without_profile_is_a_no_op() -> None:
+    assert current_profile() is None
+    with phase("auth"):
+        pass
+    assert current_profile() is None
+
+
+def test_phases_and_statements_add_up() -> None:
+    profile, token = start_profile()
+    try:
+        with phase("auth"):
+            time.sleep(0.001)
+        with phase("auth"):
+            pass
+        profile.statement(0.5)
+        profile.statement(0.25)
+        profile.begin("commit")
+        profile.end("commit")
+        profile.end("commit")
+    finally:
+        stop_profile(token)
+    assert current_profile() is None
+    assert profile.phases["auth"] >= 0.001
+    assert profile.phases["db"] == 0.75
+    assert profile.statements == 2
+    assert "commit" in profile.phases
+
+
+def test_route_metrics_prometheus() -> None:
+    metrics = RouteMetrics()
+    for status in (200, 200, 404):
+        profile, token = start_profile()
+        stop_profile(token)
+        profile.route = "/api/v1/games/{id}"
+        profile.statement(0.002)
+        metrics.record("GET", status, profile, 0.003)
+    unrouted, token = start_profile()
+    stop_profile(token)
+    metrics.record("GET", 404, unrouted, 0.001)
+
+    lines = metrics.prometheus()
+    labels = 'method="GET",route="/api/v1/games/{id}"'
+    assert f'http_requests_total{{{labels},status="200"}} 2' in lines
+    assert f'http_requests_total{{{labels},status="404"}} 1' in lines
+    assert 'http_requests_total{method="GET",route="other",status="404"} 1' in lines
+    assert f'http_request_duration_seconds_bucket{{{labels},le="0.005"}} 3' in lines
+    assert f"http_request_duration_seconds_count{{{labels}}} 3" in lines
+    assert f'http_request_phase_seconds_count{{{labels},phase="db"}} 3' in lines
+    assert f'http_request_db_statements_bucket{{{labels},le="1"}} 3' in lines
+    # Phases no request went through are left out
+    assert not any('phase="commit"' in line for line in lines)
+
+
+def busy_loop(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(100))
+
+
+def test_stack_sampler_folds_busy_threads() -> None:
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,))
+    worker.start()
+    try:
+        with StackSampler(interval=0.001) as sampler:
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        worker.join()
+    folded = sampler.folded()
+    assert "busy_loop (test_profiling.py:" in folded
+    for line in folded.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0
+        # The sampler thread itself is left out
+        assert "StackSampler" not in stack and "_run (profiling.py" not in stack
+
+
+def test_sampled_streaming_response_is_passed_through() -> None:
+    async def stream(scope, receive, send) -> None:  # type: ignore
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/event-stream")],
+            }
+        )
+        for data in (b"data: 1\n\n", b"data: 2\n\n"):
+            await send({"type": "http.response.body", "body": data, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    sent: List[dict] = []
+
+    async def send(message: dict) -> None:
+        sent.append(message)
+
+    middleware = ProfilingMiddleware(stream, sampler_token="token")
+    scope = {"type": "http", "method": "GET", "headers": [(b"x-profile", b"token")]}
+    asyncio.run(middleware(scope, None, send))  # type: ignore
+    assert sent[0]["status"] == 200
+    assert [message.get("body") for message in sent[1:]] == [
+        b"data: 1\n\n",
+        b"data: 2\n\n",
+        b"",
+    ]
@@ -0,0 +1,72 @@
+import random
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from app import models, schemas
+from app.core import serialize
+from app.core.game_session import GameSession
+from app.core.game_state import GameState
+from app.core.leaderboard import RankedEntry
+from app.core.shuffle import shuffled_deck
+
+
+def render(model: Any, obj: Any) -> bytes:
+    """
+    The body FastAPI sends for `obj` returned by a route of `response_model`.
+    """
+    return JSONResponse(jsonable_encoder(model.validate(obj))).body
+
+
+def test_card_game_matches_response_model() -> None:
+    rng = random.Random(7)
+    for size in (1, 6, 60):
+        deck = shuffled_deck(size, rng)
+        session = GameSession(
+            id=3,
+            owner_id=2,
+            pair_count=size,
+            state=GameState.from_displays(str(card) for card in deck),
+            open_count=0,
+            version=1,
+        )
+        for _ in range(size * 3):
+            delta = session.open_card(rng.randrange(size * 2))
+            assert serialize.card_game_delta(delta) == render(
+                schemas.CardGameDelta, delta
+            )
+            card_game = models.CardGame(
+                id=session.id,
+                owner_id=session.owner_id,
+                state=session.state.encode(),
+                pair_count=size,
+                open_count=session.open_count,
+                version=session.version,
+            )
+            assert serialize.card_game(card_game, session.state) == render(
+                schemas.CardGame, card_game
+            )
+            assert serialize.card_game(session, session.state) == render(
+                schemas.CardGame, session.as_card_game()
+            )
+        assert (
+            serialize.card_games([card_game, card_game])
+            == JSONResponse(
+                jsonable_encoder([schemas.CardGame.validate(card_game)] * 2)
+            ).body
+        )
+
+
+def test_ranked_best_scores_match_response_model() -> None:
+    entries = [RankedEntry(rank, 12 + rank // 2, rank * 3, rank * 5) for rank in (1, 2)]
+    assert serialize.ranked_best_score(entries[0]) == render(
+        schemas.RankedBestScore, entries[0]
+    )
+    assert (
+        serialize.ranked_best_scores(entries)
+        == JSONResponse(
+            jsonable_encoder([schemas.RankedBestScore.validate(e) for e in entries])
+        ).body
+    )
+    assert serialize.ranked_best_scores([]) == b"[]"
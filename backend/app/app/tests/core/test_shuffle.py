@@ -0,0 +1,34 @@
+import random
+from collections import Counter
+
+import pytest
+
+from app.core.shuffle import get_rng, shuffled_deck
+from app.schemas.game import GameInfoInDB
+
+
+def test_seeded_rng_replays_decks() -> None:
+    assert shuffled_deck(50, get_rng(7)) == shuffled_deck(50, get_rng(7))
+    assert shuffled_deck(50, get_rng(7)) != shuffled_deck(50, get_rng(8))
+    assert isinstance(get_rng(), random.SystemRandom)
+
+
+def test_deck_holds_each_pair_once() -> None:
+    deck = shuffled_deck(5000, get_rng())
+    assert sorted(deck) == sorted(list(range(1, 5001)) * 2)
+    with pytest.raises(ValueError):
+        shuffled_deck(0, get_rng())
+
+
+def test_arrangements_are_equally_likely() -> None:
+    rng = get_rng(1)
+    counts = Counter(tuple(shuffled_deck(2, rng)) for _ in range(6000))
+    # 4!/(2!2!) = 6 distinct arrangements of 1, 1, 2, 2
+    assert len(counts) == 6
+    assert all(800 < count < 1200 for count in counts.values())
+
+
+def test_build_random_game_uses_given_rng() -> None:
+    first = GameInfoInDB.build_random_game(get_rng(3))
+    second = GameInfoInDB.build_random_game(get_rng(3))
+    assert first.display_by_position == second.display_by_position
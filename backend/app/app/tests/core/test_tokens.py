@@ -0,0 +1,70 @@
+import time
+from typing import Optional
+
+from app.core.cache import MemoryCache
+from app.core.tokens import TokenClaims, TokenDenylist, VerifiedTokenCache, token_digest
+
+
+def claims(
+    *, sub: int = 1, exp: Optional[float] = None, iat: Optional[float] = None
+) -> TokenClaims:
+    if exp is None:
+        exp = time.time() + 60
+    return TokenClaims(sub, exp, iat, None, None)
+
+
+def test_verified_token_cache_evicts_least_recently_used() -> None:
+    cache = VerifiedTokenCache(max_size=2)
+    a, b, c = token_digest("a"), token_digest("b"), token_digest("c")
+    claims_a, claims_c = claims(sub=1), claims(sub=3)
+    cache.put(a, claims_a)
+    cache.put(b, claims(sub=2))
+    assert cache.get(a) == claims_a
+    cache.put(c, claims_c)
+    assert cache.get(b) is None
+    assert cache.get(a) == claims_a
+    assert cache.get(c) == claims_c
+    assert len(cache) == 2
+
+
+def test_verified_token_cache_drops_expired_tokens() -> None:
+    cache = VerifiedTokenCache(max_size=10)
+    expiring, lasting = token_digest("expiring"), token_digest("lasting")
+    cache.put(expiring, claims(exp=time.time() + 0.01))
+    cache.put(lasting, claims())
+    time.sleep(0.02)
+    assert cache.get(expiring) is None
+    assert cache.get(lasting) is not None
+    assert len(cache) == 1
+
+
+def test_verified_token_cache_skips_tokens_without_expiry() -> None:
+    cache = VerifiedTokenCache(max_size=10)
+    cache.put(token_digest("a"), TokenClaims(1, None, None, None, None))
+    assert cache.get(token_digest("a")) is None
+    disabled = VerifiedTokenCache(max_size=0)
+    disabled.put(token_digest("a"), claims())
+    assert disabled.get(token_digest("a")) is None
+
+
+def test_denylist_revokes_a_token() -> None:
+    denylist = TokenDenylist(MemoryCache(ttl=60, max_size=10), token_lifetime=60)
+    revoked, kept = token_digest("revoked"), token_digest("kept")
+    denylist.revoke(revoked, claims())
+    assert denylist.is_revoked(revoked, claims())
+    assert not denylist.is_revoked(kept, claims())
+    # Nothing is kept for an expired token
+    denylist.revoke(kept, claims(exp=time.time() - 1))
+    assert len(denylist.cache) == 1
+
+
+def test_denylist_revokes_tokens_issued_before_user_revocation() -> None:
+    denylist = TokenDenylist(MemoryCache(ttl=60, max_size=10), token_lifetime=60)
+    digest = token_digest("token")
+    before = time.time()
+    denylist.revoke_user(1)
+    after = time.time() + 1
+    assert denylist.is_revoked(digest, claims(sub=1, iat=before))
+    assert denylist.is_revoked(digest, claims(sub=1))
+    assert not denylist.is_revoked(digest, claims(sub=1, iat=after))
+    assert not denylist.is_revoked(digest, claims(sub=2, iat=before))
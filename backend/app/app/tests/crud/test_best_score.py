@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.leaderboard import bucket_start
+from app.models.card_game import BestScore, PeriodBestScore
+from app.schemas import CardGameCreate
+from app.tests.utils.user import create_random_user
+
+
+def test_record_upserts_the_best_score(db: Session) -> None:
+    user = create_random_user(db)
+    first = crud.best_score.record(db, user_id=user.id, open_count=10)
+    assert first is not None and first.min_open_count == 10
+    assert crud.best_score.record(db, user_id=user.id, open_count=12) is None
+    better = crud.best_score.record(db, user_id=user.id, open_count=8)
+    assert better is not None
+    assert (better.id, better.min_open_count) == (first.id, 8)
+    db.commit()
+    assert db.query(BestScore).filter(BestScore.user_id == user.id).count() == 1
+
+
+def test_record_game_end_updates_every_period(db: Session) -> None:
+    user = create_random_user(db)
+    finished_at = datetime.utcnow()
+    updates = crud.best_score.record_game_end(
+        db, user_id=user.id, open_count=10, finished_at=finished_at
+    )
+    assert sorted((update.period, update.bucket) for update in updates) == [
+        ("all", None),
+        ("day", bucket_start("day", finished_at)),
+        ("week", bucket_start("week", finished_at)),
+    ]
+    assert {update.entry.min_open_count for update in updates} == {10}
+    assert (
+        crud.best_score.record_game_end(
+            db, user_id=user.id, open_count=12, finished_at=finished_at
+        )
+        == []
+    )
+    # A new day starts a new daily bucket, the all-time score stands
+    next_day = finished_at + timedelta(days=1)
+    updates = crud.best_score.record_game_end(
+        db, user_id=user.id, open_count=11, finished_at=next_day
+    )
+    periods = {update.period: update.bucket for update in updates}
+    assert "all" not in periods
+    assert periods["day"] == bucket_start("day", next_day)
+    db.commit()
+
+
+def test_drop_expired_buckets(db: Session) -> None:
+    user = create_random_user(db)
+    now = datetime.utcnow()
+    expired = now - timedelta(days=settings.LEADERBOARD_RETENTION_DAYS + 8)
+    for finished_at in (expired, now):
+        crud.best_score.record_game_end(
+            db, user_id=user.id, open_count=10, finished_at=finished_at
+        )
+    db.commit()
+    assert crud.best_score.drop_expired_buckets(db) >= 2
+    buckets = (
+        db.query(PeriodBestScore.period, PeriodBestScore.bucket_start)
+        .filter(PeriodBestScore.user_id == user.id)
+        .all()
+    )
+    assert sorted(buckets) == [
+        ("day", bucket_start("day", now)),
+        ("week", bucket_start("week", now)),
+    ]
+
+
+def test_recompute_rebuilds_scores_from_games(db: Session) -> None:
+    player = create_random_user(db)
+    game = crud.game.create_with_owner(
+        db, obj_in=CardGameCreate(pair_count=1), owner_id=player.id
+    )
+    for position in (0, 1):
+        game = crud.game.open_card(db, db_obj=game, position=position)
+    # Moves after the end don't count
+    game = crud.game.open_card(db, db_obj=game, position=0)
+    assert (game.open_count, game.end_open_count) == (3, 2)
+    crud.best_score.get_by_user(db, user_id=player.id).min_open_count = 40
+    idle = create_random_user(db)
+    crud.best_score.record(db, user_id=idle.id, open_count=5)
+    db.commit()
+
+    crud.best_score.recompute(db)
+    db.expire_all()
+    assert crud.best_score.get_by_user(db, user_id=player.id).min_open_count == 2
+    assert crud.best_score.get_by_user(db, user_id=idle.id) is None
+    assert (
+        db.query(PeriodBestScore.min_open_count)
+        .filter(PeriodBestScore.user_id == player.id)
+        .filter(PeriodBestScore.period == "day")
+        .scalar()
+        == 2
+    )
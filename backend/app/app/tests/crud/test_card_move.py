@@ -0,0 +1,28 @@
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.game_state import MOVE_FIRST
+from app.schemas.game import CardGameCreate
+from app.tests.utils.user import create_random_user
+
+
+def test_open_card_logs_moves_and_replays_any_move(db: Session) -> None:
+    user = create_random_user(db)
+    game = crud.game.create_with_owner(
+        db, obj_in=CardGameCreate(pair_count=50), owner_id=user.id
+    )
+    states = [game.state]
+    for position in range(settings.GAME_SNAPSHOT_MOVES + 10):
+        game = crud.game.open_card(db, db_obj=game, position=position % 100)
+        states.append(game.state)
+
+    moves = crud.card_move.get_multi_by_game(db, game_id=game.id, limit=3)
+    assert [move.seq for move in moves] == [1, 2, 3]
+    assert moves[0].position == 0
+    assert moves[0].result == MOVE_FIRST
+    moves = crud.card_move.get_multi_by_game(db, game_id=game.id, after_seq=3)
+    assert len(moves) == len(states) - 4
+    for seq in (0, 1, settings.GAME_SNAPSHOT_MOVES, len(states) - 1):
+        state = crud.card_move.get_state_at(db, game=game, seq=seq)
+        assert state.encode() == states[seq]
@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from app import crud
+from app.db.session import SessionLocal
+from app.schemas.game import CardGameCreate, CardGameUpdate
+from app.tests.utils.user import create_random_user
+
+
+def test_open_card_bumps_version(db: Session) -> None:
+    user = create_random_user(db)
+    game = crud.game.create_with_owner(db, obj_in=CardGameCreate(), owner_id=user.id)
+    assert game.version == 1
+    game = crud.game.open_card(db, db_obj=game, position=0)
+    assert game.version == 2
+    assert game.open_count == 1
+
+
+def test_concurrent_open_card_raises_conflict(db: Session) -> None:
+    user = create_random_user(db)
+    game = crud.game.create_with_owner(db, obj_in=CardGameCreate(), owner_id=user.id)
+    other_db = SessionLocal()
+    try:
+        stale_game = crud.game.get(other_db, id=game.id)
+        crud.game.open_card(db, db_obj=game, position=0)
+        with pytest.raises(StaleDataError):
+            crud.game.open_card(other_db, db_obj=stale_game, position=1)
+        other_db.rollback()
+    finally:
+        other_db.close()
+    game = crud.game.get(db, id=game.id)
+    assert game.open_count == 1
+
+
+def test_update_of_a_stale_game_raises_conflict(db: Session) -> None:
+    user = create_random_user(db)
+    game = crud.game.create_with_owner(db, obj_in=CardGameCreate(), owner_id=user.id)
+    crud.game.open_card(db, db_obj=game, position=0)
+    with pytest.raises(StaleDataError):
+        crud.game.update(db, db_obj=game, obj_in={"open_count": 0})
+    game = crud.game.get(db, id=game.id)
+    assert game.open_count == 1
+    version = game.version
+    updated = crud.game.update(db, db_obj=game, obj_in={"open_count": 0})
+    assert updated.version == version + 1
+
+
+def test_update_game(db: Session) -> None:
+    user = create_random_user(db)
+    game = crud.game.create_with_owner(db, obj_in=CardGameCreate(), owner_id=user.id)
+    state = game.state
+    updated = crud.game.update(db, db_obj=game, obj_in=CardGameUpdate(open_count=3))
+    assert updated.open_count == 3
+    assert updated.version == 2
+    assert updated.state == state
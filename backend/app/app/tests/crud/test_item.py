@@ -46,6 +46,15 @@ def test_update_item(db: Session) -> None:
     assert item.owner_id == item2.owner_id
 
 
+def test_update_deleted_item(db: Session) -> None:
+    item_in = ItemCreate(title=random_lower_string())
+    user = create_random_user(db)
+    item = crud.item.create_with_owner(db=db, obj_in=item_in, owner_id=user.id)
+    crud.item.remove(db=db, id=item.id)
+    item_update = ItemUpdate(description=random_lower_string())
+    assert crud.item.update(db=db, db_obj=item, obj_in=item_update) is None
+
+
 def test_delete_item(db: Session) -> None:
     title = random_lower_string()
     description = random_lower_string()
@@ -59,3 +68,40 @@ def test_delete_item(db: Session) -> None:
     assert item2.title == title
     assert item2.description == description
     assert item2.owner_id == user.id
+
+
+def test_page_through_items_by_owner(db: Session) -> None:
+    user = create_random_user(db)
+    ids = [
+        crud.item.create_with_owner(
+            db=db, obj_in=ItemCreate(title=random_lower_string()), owner_id=user.id
+        ).id
+        for _ in range(5)
+    ]
+    first = crud.item.get_multi_by_owner(db=db, owner_id=user.id, limit=2)
+    assert [item.id for item in first.items] == ids[:2]
+    assert first.prev_cursor is None
+    second = crud.item.get_multi_by_owner(
+        db=db,
+        owner_id=user.id,
+        cursor=crud.item.decode_cursor(first.next_cursor),
+        limit=2,
+    )
+    assert [item.id for item in second.items] == ids[2:4]
+    last = crud.item.get_multi_by_owner(
+        db=db,
+        owner_id=user.id,
+        cursor=crud.item.decode_cursor(second.next_cursor),
+        limit=2,
+    )
+    assert [item.id for item in last.items] == ids[4:]
+    assert last.next_cursor is None
+    back = crud.item.get_multi_by_owner(
+        db=db,
+        owner_id=user.id,
+        cursor=crud.item.decode_cursor(second.prev_cursor),
+        limit=2,
+    )
+    assert [item.id for item in back.items] == ids[:2]
+    assert back.prev_cursor is None
+    assert back.next_cursor is not None
@@ -2,6 +2,8 @@ from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 
 from app import crud
+from app.core.config import settings
+from app.core.hashing import PasswordHasher
 from app.core.security import verify_password
 from app.schemas.user import UserCreate, UserUpdate
 from app.tests.utils.utils import random_email, random_lower_string
@@ -92,3 +94,29 @@ def test_update_user(db: Session) -> None:
     assert user_2
     assert user.email == user_2.email
     assert verify_password(new_password, user_2.hashed_password)
+
+
+def test_get_principal_is_invalidated_on_update(db: Session) -> None:
+    user_in = UserCreate(email=random_email(), password=random_lower_string())
+    user = crud.user.create(db, obj_in=user_in)
+    principal = crud.user.get_principal(db, id=user.id)
+    assert principal == (user.id, True, False)
+    crud.user.update(db, db_obj=user, obj_in={"is_active": False})
+    principal = crud.user.get_principal(db, id=user.id)
+    assert principal
+    assert not crud.user.is_active(principal)
+
+
+def test_authenticate_upgrades_outdated_hash(db: Session) -> None:
+    email = random_email()
+    password = random_lower_string()
+    user = crud.user.create(db, obj_in=UserCreate(email=email, password=password))
+    user.hashed_password = PasswordHasher(rounds=4, workers=0, queue_depth=1).hash(
+        password
+    )
+    db.commit()
+    authenticated_user = crud.user.authenticate(db, email=email, password=password)
+    assert authenticated_user
+    rounds = int(authenticated_user.hashed_password.split("$")[2])
+    assert rounds == settings.BCRYPT_ROUNDS
+    assert verify_password(password, authenticated_user.hashed_password)
@@ -0,0 +1,30 @@
+from sqlalchemy import create_engine
+
+from app.core.config import settings
+from app.db.pool import InstrumentedQueuePool, instrument_engine, stats
+
+
+def test_idle_ping_only_pings_idle_connections() -> None:
+    engine = create_engine(
+        settings.SQLALCHEMY_DATABASE_URI, poolclass=InstrumentedQueuePool
+    )
+    instrument_engine(engine, pre_ping="idle", idle_seconds=3600)
+    pings = stats.pings
+    for _ in range(3):
+        with engine.connect() as connection:
+            connection.execute("SELECT 1")
+    assert stats.pings == pings
+    engine.dispose()
+
+
+def test_idle_ping_pings_after_idle_threshold() -> None:
+    engine = create_engine(
+        settings.SQLALCHEMY_DATABASE_URI, poolclass=InstrumentedQueuePool
+    )
+    instrument_engine(engine, pre_ping="idle", idle_seconds=0)
+    pings = stats.pings
+    for _ in range(3):
+        with engine.connect() as connection:
+            connection.execute("SELECT 1")
+    assert stats.pings == pings + 3
+    engine.dispose()
@@ -0,0 +1,106 @@
+"""
+Save benchmark reports as baselines and compare later runs against them.
+
+Baselines are JSON files in `benchmarks/baselines/`, named after the commit
+they were measured on unless a name is given.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--save",
+        nargs="?",
+        const="",
+        metavar="NAME",
+        help="save the report as a baseline, named after the commit by default",
+    )
+    parser.add_argument(
+        "--compare", metavar="NAME", help="compare the report with a baseline"
+    )
+
+
+def _path(bench: str, name: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{bench}-{name}.json")
+
+
+def save(bench: str, report: Dict[str, Any], name: Optional[str] = None) -> str:
+    commit = current_commit()
+    path = _path(bench, name or commit)
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "bench": bench,
+                "commit": commit,
+                "created_at": datetime.utcnow().isoformat(),
+                "report": report,
+            },
+            f,
+            indent=2,
+        )
+    return path
+
+
+def load(bench: str, name: str) -> Dict[str, Any]:
+    with open(_path(bench, name)) as f:
+        return json.load(f)
+
+
+def _flatten(report: Any, prefix: str = "") -> Dict[str, float]:
+    if isinstance(report, dict):
+        flat: Dict[str, float] = {}
+        for key, value in report.items():
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        return flat
+    if isinstance(report, (int, float)) and not isinstance(report, bool):
+        return {prefix[:-1]: report}
+    return {}
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Every number of `report` next to the baseline's, with the change in
+    percent.
+    """
+    before = _flatten(baseline["report"])
+    changes = {}
+    for key, value in _flatten(report).items():
+        if key not in before:
+            continue
+        change = (
+            round((value - before[key]) / before[key] * 100, 1) if before[key] else None
+        )
+        changes[key] = {"baseline": before[key], "current": value, "change_%": change}
+    return {"baseline_commit": baseline["commit"], "metrics": changes}
+
+
+def handle(bench: str, report: Dict[str, Any], args: argparse.Namespace) -> None:
+    """
+    Print `report`, then save or compare it as `add_arguments` options ask.
+    """
+    print(json.dumps(report, indent=2))
+    if args.compare:
+        print(json.dumps(compare(report, load(bench, args.compare)), indent=2))
+    if args.save is not None:
+        print(f"Saved baseline {save(bench, report, args.save or None)}")
@@ -0,0 +1,73 @@
+"""
+Requests/sec of the sync (threadpool + SessionLocal) and async (databases)
+game endpoints under many concurrent keep-alive clients.
+
+    python -m benchmarks.bench_db_paths --clients 1000 --duration 20
+"""
+
+import argparse
+import asyncio
+import json
+
+import requests
+
+from app.core.config import settings
+from benchmarks.http_load import Request, run_load
+from benchmarks.server import BenchmarkServer
+
+
+def run_mode(
+    async_db: bool, *, clients: int, duration: float, timeout: float, port: int
+) -> dict:
+    env = {"ASYNC_DB_ENABLED": "1" if async_db else "0"}
+    with BenchmarkServer(port=port, env=env) as server:
+        headers = server.superuser_headers()
+        game = requests.post(
+            f"{server.url}{settings.API_V1_STR}/games/", headers=headers, json={}
+        ).json()
+        paths = [
+            f"{settings.API_V1_STR}/games/{game['id']}",
+            f"{settings.API_V1_STR}/best_scores/?limit=10",
+        ]
+
+        def next_request(sequence: int) -> Request:
+            return "GET", paths[sequence % len(paths)], None
+
+        result = asyncio.run(
+            run_load(
+                "127.0.0.1",
+                port,
+                next_request,
+                clients=clients,
+                duration=duration,
+                timeout=timeout,
+                headers=headers,
+            )
+        )
+    summary = result.summary()
+    summary["statuses"] = result.statuses
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    report = {
+        mode: run_mode(
+            mode == "async",
+            clients=args.clients,
+            duration=args.duration,
+            timeout=args.timeout,
+            port=args.port,
+        )
+        for mode in ("sync", "async")
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Logins/sec of `/login/access-token` with passwords hashed inline in the
+threadpool (PASSWORD_HASH_WORKERS=0) and in the bcrypt process pool.
+
+    python -m benchmarks.bench_login --clients 64 --duration 20 --rounds 12
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import uuid
+from urllib.parse import urlencode
+
+import requests
+
+from app.core.config import settings
+from benchmarks.http_load import Request, run_load
+from benchmarks.server import BenchmarkServer
+
+
+def run_mode(
+    workers: int, *, rounds: int, clients: int, duration: float, port: int
+) -> dict:
+    env = {"BCRYPT_ROUNDS": str(rounds), "PASSWORD_HASH_WORKERS": str(workers)}
+    with BenchmarkServer(port=port, env=env) as server:
+        # A fresh user, so its hash is made with `rounds`
+        email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+        password = uuid.uuid4().hex
+        requests.post(
+            f"{server.url}{settings.API_V1_STR}/users/",
+            headers=server.superuser_headers(),
+            json={"email": email, "password": password},
+        ).raise_for_status()
+        body = urlencode({"username": email, "password": password}).encode()
+        path = f"{settings.API_V1_STR}/login/access-token"
+
+        def next_request(sequence: int) -> Request:
+            return "POST", path, body
+
+        result = asyncio.run(
+            run_load(
+                "127.0.0.1",
+                port,
+                next_request,
+                clients=clients,
+                duration=duration,
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+            )
+        )
+    summary = result.summary()
+    summary["statuses"] = result.statuses
+    ok = result.statuses.get(200, 0) / result.duration
+    summary["logins_per_sec"] = round(ok, 1)
+    summary["logins_per_sec_per_core"] = round(ok / (os.cpu_count() or 1), 1)
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--rounds", type=int, default=settings.BCRYPT_ROUNDS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    report = {
+        f"workers={workers}": run_mode(
+            workers,
+            rounds=args.rounds,
+            clients=args.clients,
+            duration=args.duration,
+            port=args.port,
+        )
+        for workers in (0, args.workers)
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
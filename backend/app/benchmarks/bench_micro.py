@@ -0,0 +1,185 @@
+"""
+Operations/sec of the hot paths behind a request, without the database:
+game state moves and encoding, `GameInfoInDB` building and parsing, the
+deck shuffle, JWT encode/decode, the auth of a request and response
+serialization, across game sizes. Each `serialize.*` operation runs through
+`response_model` validation and its `*_fast` twin through
+`app.core.serialize`.
+
+`auth.decode_every_request` is the auth of a request before the verified
+token cache: the token decoded, then the principal read from a primed
+`principal_cache`. `auth.principal` is the same through the cache, and
+`auth.principal_embedded` takes the principal from the token's claims.
+
+    python -m benchmarks.bench_micro --sizes 6 60 600 --save
+    python -m benchmarks.bench_micro --compare <commit>
+"""
+
+import argparse
+import json
+import random
+import timeit
+from typing import Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+
+from app import crud, models, schemas
+from app.api import deps
+from app.core import security, serialize
+from app.core.config import settings
+from app.core.game_state import GameState
+from app.core.leaderboard import RankedEntry
+from app.core.shuffle import get_rng, shuffled_deck
+from app.crud.crud_user import principal_cache
+from benchmarks import baseline
+
+
+def ops_per_sec(operation: Callable[[], object], *, min_time: float) -> float:
+    timer = timeit.Timer(operation)
+    number, elapsed = timer.autorange()
+    while elapsed < min_time:
+        number *= 2
+        elapsed = timer.timeit(number)
+    return number / elapsed
+
+
+def pair_order(state: GameState) -> List[int]:
+    """
+    Positions in perfect play order, both cards of each pair in a row.
+    """
+    first_positions: Dict[int, int] = {}
+    order = []
+    for position, display in enumerate(state.layout):
+        first = first_positions.pop(display, None)
+        if first is None:
+            first_positions[display] = position
+        else:
+            order += [first, position]
+    return order
+
+
+def play(state: GameState, order: List[int]) -> None:
+    for position in order:
+        state.accept_answer_if_in_condition(position)
+
+
+def half_played(size: int, rng: random.Random) -> GameState:
+    state = GameState.from_displays(str(card) for card in shuffled_deck(size, rng))
+    play(state, pair_order(state)[: size // 2 * 2])
+    return state
+
+
+def respond(model: type, obj: object) -> str:
+    """
+    What FastAPI does with an endpoint's return value and `response_model`.
+    """
+    return json.dumps(jsonable_encoder(model.validate(obj)))
+
+
+def size_operations(size: int) -> Dict[str, Callable[[], object]]:
+    system = get_rng()
+    state = half_played(size, system)
+    order = pair_order(state)
+    encoded = state.encode()
+    game_info = state.to_game_info()
+    card_game = models.CardGame(
+        id=1, owner_id=1, state=encoded, pair_count=size, open_count=size, version=2
+    )
+    delta = {
+        "id": 1,
+        "version": 2,
+        "open_count": 1,
+        "revealed": {0: "1"},
+        "hidden": [],
+        "is_game_end": False,
+    }
+
+    def build_random_game() -> object:
+        settings.GAME_SIZE = size
+        return schemas.GameInfoInDB.build_random_game(system)
+
+    return {
+        "shuffle": lambda: shuffled_deck(size, system),
+        "game_info_in_db.build_random_game": build_random_game,
+        "game_info_in_db.parse": lambda: schemas.GameInfoInDB(**game_info),
+        "game_state.play_game": lambda: play(state.deal(), order),
+        "game_state.encode": state.encode,
+        "game_state.decode": lambda: GameState.decode(encoded),
+        "game_state.to_game_info": state.to_game_info,
+        "serialize.card_game": lambda: respond(schemas.CardGame, card_game),
+        "serialize.card_game_fast": lambda: serialize.card_game(
+            card_game, card_game.game_state
+        ),
+        "serialize.card_game_delta": lambda: respond(schemas.CardGameDelta, delta),
+        "serialize.card_game_delta_fast": lambda: serialize.card_game_delta(delta),
+    }
+
+
+def fixed_operations() -> Dict[str, Callable[[], object]]:
+    token = security.create_access_token(1)
+    principal_cache.set("1", [1, True, False])
+    best_scores = [RankedEntry(id, 12 + id // 10, id, id) for id in range(1, 101)]
+    return {
+        "jwt.encode": lambda: security.create_access_token(1),
+        "jwt.decode": lambda: deps.decode_token(token),
+        "auth.decode_every_request": lambda: crud.user.get_principal(
+            None, id=deps.decode_token(token).sub
+        ),
+        "auth.principal": lambda: deps.get_current_principal(None, token),
+        "serialize.best_scores_100": lambda: json.dumps(
+            jsonable_encoder(
+                [schemas.RankedBestScore.validate(entry) for entry in best_scores]
+            )
+        ),
+        "serialize.best_scores_100_fast": lambda: serialize.ranked_best_scores(
+            best_scores
+        ),
+    }
+
+
+def embedded_principal_operations() -> Dict[str, Callable[[], object]]:
+    """
+    Timed with `ACCESS_TOKEN_EMBED_PRINCIPAL` on.
+    """
+    token = security.create_access_token(1, is_active=True, is_superuser=False)
+    return {"auth.principal_embedded": lambda: deps.get_current_principal(None, token)}
+
+
+def measure(
+    operations: Dict[str, Callable[[], object]], *, min_time: float
+) -> Dict[str, float]:
+    return {
+        name: round(ops_per_sec(operation, min_time=min_time), 1)
+        for name, operation in operations.items()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[6, 60, 600])
+    parser.add_argument("--min-time", type=float, default=0.5)
+    baseline.add_arguments(parser)
+    args = parser.parse_args()
+    game_size = settings.GAME_SIZE
+    report: Dict[str, Dict[str, float]] = {}
+    try:
+        for size in args.sizes:
+            report[f"size={size}"] = measure(
+                size_operations(size), min_time=args.min_time
+            )
+    finally:
+        settings.GAME_SIZE = game_size
+    report["fixed"] = measure(fixed_operations(), min_time=args.min_time)
+    embed_principal = settings.ACCESS_TOKEN_EMBED_PRINCIPAL
+    settings.ACCESS_TOKEN_EMBED_PRINCIPAL = True
+    try:
+        report["fixed"].update(
+            measure(embedded_principal_operations(), min_time=args.min_time)
+        )
+    finally:
+        settings.ACCESS_TOKEN_EMBED_PRINCIPAL = embed_principal
+    baseline.handle("bench_micro", report, args)
+
+
+if __name__ == "__main__":
+    main()
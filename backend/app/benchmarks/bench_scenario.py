@@ -0,0 +1,284 @@
+"""
+End-to-end game scenario: `--players` concurrent players each create games
+and play them to the end through the real routers, then read the game and
+the leaderboard, for `--duration` seconds.
+
+Reports games/sec, requests/sec and latency percentiles per endpoint, and
+the SQL statements each request ran. The API runs in this process, in a
+uvicorn thread, so the statements of the sync engine can be counted per
+request; with `ASYNC_DB_ENABLED` they are not. Other settings come from the
+environment as usual, e.g.
+
+    python -m benchmarks.bench_scenario --players 50 --pair-count 6 --save
+    GAME_WRITE_BEHIND_ENABLED=1 python -m benchmarks.bench_scenario --compare <commit>
+"""
+
+import argparse
+import asyncio
+import contextvars
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import uvicorn
+from sqlalchemy import event
+
+from app import crud, schemas
+from app.api import deps
+from app.core import security
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
+from app.main import app
+from benchmarks import baseline
+from benchmarks.bench_micro import pair_order
+from benchmarks.http_load import LoadResult, Request, build_request, read_response
+
+PLAYER_EMAIL = "bench-player-{}@example.com"
+
+# Statement count of the request being handled, the middleware sets it and
+# the threadpool inherits it with the context
+_statements: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar(
+    "statements", default=None
+)
+
+
+def _count_statement(*args: Any) -> None:
+    counter = _statements.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+class StatementCounter:
+    """
+    ASGI middleware recording the statements of each request under its
+    `X-Bench-Request` header.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+        self.counts: Dict[str, int] = {}
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        request_id = dict(scope.get("headers") or []).get(b"x-bench-request")
+        if request_id is None:
+            await self.app(scope, receive, send)
+            return
+        counter = [0]
+        token = _statements.set(counter)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _statements.reset(token)
+            self.counts[request_id.decode()] = counter[0]
+
+
+class ThreadServer(uvicorn.Server):
+    def install_signal_handlers(self) -> None:
+        # Signals can only be handled in the main thread
+        pass
+
+
+class Scenario:
+    def __init__(self, *, host: str, port: int, pair_count: int, delta: bool) -> None:
+        self.host = host
+        self.port = port
+        self.pair_count = pair_count
+        self.move_headers = {"Accept": deps.DELTA_MEDIA_TYPE} if delta else {}
+        self.results: Dict[str, LoadResult] = {}
+        self.statements: Dict[str, List[int]] = {}
+        self.games = 0
+        self._sequence = 0
+
+    def result(self, endpoint: str) -> LoadResult:
+        if endpoint not in self.results:
+            self.results[endpoint] = LoadResult(0.0)
+            self.statements[endpoint] = []
+        return self.results[endpoint]
+
+    async def call(
+        self,
+        connection: Tuple[asyncio.StreamReader, asyncio.StreamWriter],
+        endpoint: str,
+        request: Request,
+        headers: Dict[str, str],
+        counter: StatementCounter,
+    ) -> bytes:
+        reader, writer = connection
+        self._sequence += 1
+        request_id = str(self._sequence)
+        payload = build_request(
+            self.host, request, {**headers, "X-Bench-Request": request_id}
+        )
+        start = time.perf_counter()
+        writer.write(payload)
+        await writer.drain()
+        status, body = await read_response(reader)
+        result = self.result(endpoint)
+        result.latencies.append(time.perf_counter() - start)
+        result.statuses[status] = result.statuses.get(status, 0) + 1
+        if status != 200:
+            result.errors += 1
+        self.statements[endpoint].append(counter.counts.pop(request_id, 0))
+        return body
+
+    async def player(
+        self, headers: Dict[str, str], deadline: float, counter: StatementCounter
+    ) -> None:
+        api = settings.API_V1_STR
+        loop = asyncio.get_running_loop()
+        connection = await asyncio.open_connection(self.host, self.port)
+        try:
+            while time.perf_counter() < deadline:
+                body = await self.call(
+                    connection,
+                    "create_game",
+                    (
+                        "POST",
+                        f"{api}/games/",
+                        f'{{"pair_count": {self.pair_count}}}'.encode(),
+                    ),
+                    headers,
+                    counter,
+                )
+                game = schemas.CardGame.parse_raw(body)
+                # The layout is hidden from players, read it from the database
+                order = await loop.run_in_executor(None, game_pair_order, game.id)
+                for position in order:
+                    await self.call(
+                        connection,
+                        "open_card",
+                        ("POST", f"{api}/games/{game.id}/open_card/{position}", b""),
+                        {**headers, **self.move_headers},
+                        counter,
+                    )
+                await self.call(
+                    connection,
+                    "read_game",
+                    ("GET", f"{api}/games/{game.id}", None),
+                    headers,
+                    counter,
+                )
+                await self.call(
+                    connection,
+                    "read_best_scores",
+                    ("GET", f"{api}/best_scores/?limit=10", None),
+                    headers,
+                    counter,
+                )
+                self.games += 1
+        finally:
+            connection[1].close()
+
+    def summary(self, duration: float, count_statements: bool) -> Dict[str, Any]:
+        report: Dict[str, Any] = {"games_per_sec": round(self.games / duration, 1)}
+        total = LoadResult(duration)
+        for endpoint, result in self.results.items():
+            result.duration = duration
+            total.latencies += result.latencies
+            total.errors += result.errors
+            endpoint_report: Dict[str, Any] = result.summary()
+            if count_statements and self.statements[endpoint]:
+                statements = self.statements[endpoint]
+                endpoint_report["statements_per_request"] = round(
+                    sum(statements) / len(statements), 2
+                )
+                endpoint_report["max_statements"] = max(statements)
+            report[endpoint] = endpoint_report
+        report["total"] = total.summary()
+        if count_statements:
+            statements = sum(map(sum, self.statements.values()))
+            report["total"]["statements_per_request"] = round(
+                statements / max(total.requests, 1), 2
+            )
+        return report
+
+
+def game_pair_order(game_id: int) -> List[int]:
+    db = SessionLocal()
+    try:
+        return pair_order(crud.game.get(db, id=game_id).game_state)
+    finally:
+        db.close()
+
+
+def player_headers(players: int) -> List[Dict[str, str]]:
+    """
+    Tokens of `players` bench users, created on the first run.
+    """
+    db = SessionLocal()
+    try:
+        headers = []
+        for index in range(players):
+            email = PLAYER_EMAIL.format(index)
+            user = crud.user.get_by_email(db, email=email) or crud.user.create(
+                db, obj_in=schemas.UserCreate(email=email, password=email)
+            )
+            if settings.ACCESS_TOKEN_EMBED_PRINCIPAL:
+                token = security.create_access_token(
+                    user.id, is_active=user.is_active, is_superuser=user.is_superuser
+                )
+            else:
+                token = security.create_access_token(user.id)
+            headers.append({"Authorization": f"Bearer {token}"})
+        return headers
+    finally:
+        db.close()
+
+
+async def run_players(
+    scenario: Scenario,
+    headers: List[Dict[str, str]],
+    duration: float,
+    counter: StatementCounter,
+) -> float:
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(
+        *(scenario.player(player, deadline, counter) for player in headers)
+    )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, default=50)
+    parser.add_argument("--pair-count", type=int, default=settings.GAME_SIZE)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument(
+        "--delta", action="store_true", help="play with delta move responses"
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    baseline.add_arguments(parser)
+    args = parser.parse_args()
+
+    counter = StatementCounter(app)
+    event.listen(engine, "before_cursor_execute", _count_statement)
+    server = ThreadServer(
+        uvicorn.Config(counter, port=args.port, log_level="critical", backlog=4096)
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.1)
+    try:
+        headers = player_headers(args.players)
+        scenario = Scenario(
+            host="127.0.0.1",
+            port=args.port,
+            pair_count=args.pair_count,
+            delta=args.delta,
+        )
+        duration = asyncio.run(run_players(scenario, headers, args.duration, counter))
+    finally:
+        server.should_exit = True
+        thread.join()
+    report = {
+        "players": args.players,
+        "pair_count": args.pair_count,
+        **scenario.summary(duration, not settings.ASYNC_DB_ENABLED),
+    }
+    baseline.handle("bench_scenario", report, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Deals/sec of the previous `build_random_game` loop (random.choice + list.pop,
+O(n^2)) and of `app.core.shuffle.shuffled_deck` (Fisher-Yates, O(n)) with a
+seeded and a CSPRNG generator, across game sizes.
+
+    python -m benchmarks.bench_shuffle --sizes 6 60 600 6000
+"""
+
+import argparse
+import json
+import random
+import timeit
+from typing import Callable, Dict, List
+
+from app.core.shuffle import get_rng, shuffled_deck
+
+
+def legacy_deal(game_size: int) -> List[str]:
+    number_displays = [str(idx + 1) for idx in range(game_size)] * 2
+    solutions = []
+    for _ in [idx for idx in range(game_size)] * 2:
+        card_display_index = random.choice(range(len(number_displays)))
+        solutions.append(number_displays.pop(card_display_index))
+    return solutions
+
+
+def deals_per_sec(deal: Callable[[], object], *, min_time: float) -> float:
+    timer = timeit.Timer(deal)
+    number, elapsed = timer.autorange()
+    while elapsed < min_time:
+        number *= 2
+        elapsed = timer.timeit(number)
+    return number / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[6, 60, 600, 6000])
+    parser.add_argument("--min-time", type=float, default=0.5)
+    args = parser.parse_args()
+    seeded, system = get_rng(0), get_rng()
+    report: Dict[int, Dict[str, float]] = {}
+    for size in args.sizes:
+        engines = {
+            "legacy": lambda: legacy_deal(size),
+            "fisher_yates_seeded": lambda: shuffled_deck(size, seeded),
+            "fisher_yates_system": lambda: shuffled_deck(size, system),
+        }
+        report[size] = {
+            name: round(deals_per_sec(deal, min_time=args.min_time), 1)
+            for name, deal in engines.items()
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Minimal asyncio HTTP/1.1 load driver.
+
+Every simulated client keeps one keep-alive connection open and sends requests
+back to back, so `clients` is the number of concurrent in-flight requests.
+"""
+
+import asyncio
+import statistics
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+Request = Tuple[str, str, Optional[bytes]]  # method, path, body
+
+
+class LoadResult:
+    def __init__(self, duration: float) -> None:
+        self.duration = duration
+        self.latencies: List[float] = []
+        self.statuses: Dict[int, int] = {}
+        self.errors = 0
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def rps(self) -> float:
+        return self.requests / self.duration if self.duration else 0.0
+
+    def percentile(self, percent: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "rps": round(self.rps, 1),
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p90_ms": round(self.percentile(90) * 1000, 2),
+            "p99_ms": round(self.percentile(99) * 1000, 2),
+            "mean_ms": (
+                round(statistics.mean(self.latencies) * 1000, 2)
+                if self.latencies
+                else 0.0
+            ),
+        }
+
+
+async def read_response(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    length = 0
+    chunked = False
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value:
+            chunked = True
+    if not chunked:
+        return status, await reader.readexactly(length)
+    body = b""
+    while True:
+        size = int((await reader.readuntil(b"\r\n")).strip(), 16)
+        if size == 0:
+            await reader.readuntil(b"\r\n")
+            return status, body
+        body += await reader.readexactly(size)
+        await reader.readexactly(2)
+
+
+def build_request(
+    host: str, request: Request, headers: Optional[Dict[str, str]] = None
+) -> bytes:
+    method, path, body = request
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host}"]
+    for name, value in (headers or {}).items():
+        lines.append(f"{name}: {value}")
+    if body is not None:
+        if "Content-Type" not in (headers or {}):
+            lines.append("Content-Type: application/json")
+        lines.append(f"Content-Length: {len(body)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b"")
+
+
+async def _client(
+    host: str,
+    port: int,
+    next_request: Callable[[int], Request],
+    headers: Dict[str, str],
+    deadline: float,
+    timeout: float,
+    result: LoadResult,
+) -> None:
+    sequence = 0
+    while time.perf_counter() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            result.errors += 1
+            await asyncio.sleep(0.1)
+            continue
+        try:
+            while time.perf_counter() < deadline:
+                payload = build_request(host, next_request(sequence), headers)
+                sequence += 1
+                start = time.perf_counter()
+                writer.write(payload)
+                await writer.drain()
+                status, _ = await asyncio.wait_for(read_response(reader), timeout)
+                result.latencies.append(time.perf_counter() - start)
+                result.statuses[status] = result.statuses.get(status, 0) + 1
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+            # Timed out or dropped requests are counted and the client reconnects
+            result.errors += 1
+        finally:
+            writer.close()
+
+
+async def run_load(
+    host: str,
+    port: int,
+    next_request: Callable[[int], Request],
+    *,
+    clients: int,
+    duration: float,
+    timeout: float = 10.0,
+    headers: Optional[Dict[str, str]] = None,
+) -> LoadResult:
+    """
+    Run `clients` concurrent connections for `duration` seconds.
+
+    `next_request(n)` returns the n-th request of a client. Requests without
+    a response after `timeout` seconds count as errors.
+    """
+    start = time.perf_counter()
+    deadline = start + duration
+    result = LoadResult(duration)
+    await asyncio.gather(
+        *(
+            _client(host, port, next_request, headers or {}, deadline, timeout, result)
+            for _ in range(clients)
+        )
+    )
+    result.duration = time.perf_counter() - start
+    return result
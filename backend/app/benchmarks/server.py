@@ -0,0 +1,77 @@
+"""
+Run the API in a uvicorn subprocess for end-to-end benchmarks.
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict, Optional
+
+import requests
+
+from app.core.config import settings
+
+
+class BenchmarkServer:
+    def __init__(
+        self, *, port: int = 8765, env: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.port = port
+        self.env = {**os.environ, **(env or {})}
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "BenchmarkServer":
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "app.main:app",
+                "--port",
+                str(self.port),
+                "--log-level",
+                "critical",
+                "--backlog",
+                "4096",
+            ],
+            env=self.env,
+            # Own process group, so a kill also reaches the hashing pool workers
+            start_new_session=True,
+        )
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                requests.get(f"{self.url}{settings.API_V1_STR}/openapi.json")
+                return self
+            except requests.ConnectionError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError("Benchmark server did not start")
+
+    def __exit__(self, *args: object) -> None:
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                # Requests stuck behind an exhausted pool block a graceful exit
+                os.killpg(self.process.pid, signal.SIGKILL)
+                self.process.wait()
+            self.process = None
+
+    def superuser_headers(self) -> Dict[str, str]:
+        r = requests.post(
+            f"{self.url}{settings.API_V1_STR}/login/access-token",
+            data={
+                "username": settings.FIRST_SUPERUSER,
+                "password": settings.FIRST_SUPERUSER_PASSWORD,
+            },
+        )
+        r.raise_for_status()
+        return {"Authorization": f"Bearer {r.json()['access_token']}"}